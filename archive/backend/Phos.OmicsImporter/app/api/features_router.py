@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import io
+import json
+import logging
+import numpy as np
+from ..db.database import get_async_db
+from ..db.models import OmicsFeatureSet
+from ..schemas.schemas import FeatureSetInfo
+from ..services.features import build_feature_matrix, feature_matrix_query, load_feature_set
+from ..utils.profiling import run_in_threadpool
+from .import_router import parse_names
+from .query_router import parse_file_ids
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter(prefix="/features")
+
+
+def feature_set_info(row: OmicsFeatureSet, current: str) -> FeatureSetInfo:
+    return FeatureSetInfo(
+        feature_set=row.feature_set,
+        source_layer=row.source_layer,
+        panels=json.loads(row.panels),
+        feature_names=json.loads(row.feature_names),
+        current=row.feature_set == current,
+        created_at=row.created_at
+    )
+
+
+@router.get("/sets", response_model=List[FeatureSetInfo])
+async def list_feature_sets(db: AsyncSession = Depends(get_async_db)):
+    """
+    List the feature definitions vectors have been stored for. current marks
+    the one new imports are extracted with.
+    """
+    current = load_feature_set().id
+    rows = (await db.scalars(select(OmicsFeatureSet).order_by(OmicsFeatureSet.created_at))).all()
+    return [feature_set_info(row, current) for row in rows]
+
+
+@router.get("/matrix")
+async def get_feature_matrix(
+    feature_set: Optional[str] = Query(None, description="Feature set id; the current one if omitted"),
+    patients: Optional[str] = Query(None, description="Comma-separated patient ids"),
+    file_ids: Optional[str] = Query(None, description="Comma-separated file ids"),
+    latest: bool = Query(True, description="Keep only each patient's most recent import"),
+    format: str = Query("npz", pattern="^(npz|json)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Return stored patient feature vectors as one patient x feature matrix,
+    ordered by patient. With format=npz (the default) the response holds
+    float32 matrix, patient_ids, file_ids and feature_names arrays and loads
+    with numpy.load(..., allow_pickle=False). Missing features are NaN.
+    """
+    feature_set = feature_set or load_feature_set().id
+    definition = await db.get(OmicsFeatureSet, feature_set)
+    if definition is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Feature set {feature_set} not found")
+    feature_names = json.loads(definition.feature_names)
+
+    query = feature_matrix_query(feature_set, parse_names(patients), parse_file_ids(file_ids), latest)
+    rows = (await db.execute(query)).all()
+    result = await run_in_threadpool(build_feature_matrix, feature_set, feature_names, rows)
+
+    if format == "json":
+        return {
+            "feature_set": result.feature_set,
+            "feature_names": result.feature_names,
+            "patient_ids": result.patient_ids,
+            "file_ids": result.file_ids,
+            "values": [[None if np.isnan(v) else float(v) for v in row] for row in result.matrix.tolist()],
+        }
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        matrix=result.matrix,
+        patient_ids=np.array(result.patient_ids, dtype=str),
+        file_ids=np.array(result.file_ids, dtype=np.int64),
+        feature_names=np.array(result.feature_names, dtype=str),
+    )
+    return Response(
+        content=buffer.getvalue(),
+        media_type="application/octet-stream",
+        headers={
+            "Content-Disposition": f'attachment; filename="omics_features_{feature_set}.npz"',
+            "X-Feature-Set": feature_set
+        }
+    )
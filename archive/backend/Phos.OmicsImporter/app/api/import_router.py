@@ -1,12 +1,31 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
-from sqlalchemy.orm import Session
-import csv
-import json
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from typing import Optional
+from datetime import datetime
+import base64
+import binascii
 import io
+import os
+import hashlib
 import logging
-from ..db.database import get_db
-from ..db.models import OmicsRaw
-from ..schemas.schemas import OmicsDataRow, ImportResponse, OmicsFileCreate
+import numpy as np
+from ..db.database import get_async_db
+from ..db.models import OmicsRaw, OmicsImportKey, OmicsFileStats, OmicsGeneStats, OmicsSampleStats, PROCESSED, IMPORT_KEY_IDEMPOTENCY, IMPORT_KEY_SHA256
+from ..schemas.schemas import ImportResponse, OmicsFile, OmicsFileCreate, OmicsFileList, ImportStats, FileStats, GeneStats, SampleStats, NormalizationRequest, NormalizationLayers
+from ..utils.compression import STORAGE_CODEC, compress, iter_decompressed
+from ..utils.file_utils import split_file_name, SUPPORTED_FILE_TYPES
+from ..utils.inspector import inspect_bytes, inspect_text
+from ..utils.timing import StageTimer
+from ..utils.parallel_validation import PARALLEL_VALIDATION_MIN_SIZE, PARALLEL_VALIDATION_WORKERS, validate_parallel
+from ..utils.profiling import run_in_threadpool
+from ..services.matrix_store import MatrixBuilder, open_matrix
+from ..services.normalization import GENE_LENGTHS_FILE, STEPS, NormalizationError, layer_name, list_layers, normalize_matrix, parse_layer
+from ..services.parquet_store import iter_parquet_bytes
+from ..services.pipeline import run_import_pipeline
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -14,149 +33,269 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter(prefix="/import")
 
-async def validate_csv_structure(file_content: str) -> tuple[bool, str, int, int]:
+# Uploads are read and hashed in chunks of this size
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Largest matrix slice served by a single request
+MATRIX_MAX_CELLS = int(os.getenv("MATRIX_MAX_CELLS", "1000000"))
+
+# Columns served by the listing and status endpoints; never the payload
+OMICS_FILE_COLUMNS = (
+    OmicsRaw.id,
+    OmicsRaw.file_name,
+    OmicsRaw.file_type,
+    OmicsRaw.content_codec,
+    OmicsRaw.raw_size,
+    OmicsRaw.stored_size,
+    OmicsRaw.content_sha256,
+    OmicsRaw.sample_count,
+    OmicsRaw.gene_count,
+    OmicsRaw.created_at,
+    OmicsRaw.processed,
+    OmicsRaw.parquet_path,
+    OmicsRaw.archived_at,
+)
+
+async def find_existing_import(db: AsyncSession, content_sha256: str, idempotency_key: Optional[str]) -> Optional[OmicsRaw]:
+    """
+    Look up a previous import by idempotency key or payload hash, through
+    the omics_import_keys registry. Only metadata columns are loaded, never
+    the payload.
+    """
+    query = select(OmicsRaw).join(OmicsImportKey, OmicsImportKey.file_id == OmicsRaw.id).options(
+        load_only(OmicsRaw.id, OmicsRaw.file_name, OmicsRaw.sample_count, OmicsRaw.gene_count)
+    )
+    if idempotency_key:
+        result = await db.execute(query.where(
+            OmicsImportKey.kind == IMPORT_KEY_IDEMPOTENCY, OmicsImportKey.key == idempotency_key
+        ))
+        existing = result.scalars().first()
+        if existing:
+            return existing
+    result = await db.execute(query.where(
+        OmicsImportKey.kind == IMPORT_KEY_SHA256, OmicsImportKey.key == content_sha256
+    ))
+    return result.scalars().first()
+
+def duplicate_response(existing: OmicsRaw) -> ImportResponse:
+    """Build the response for an upload that was already imported."""
+    return ImportResponse(
+        success=True,
+        file_id=existing.id,
+        file_name=existing.file_name,
+        rows_count=(existing.sample_count or 0) * (existing.gene_count or 0),
+        duplicate=True,
+        message=f"File already imported as {existing.id}"
+    )
+
+def validate_csv_structure(file_content: str) -> tuple[bool, str, int, int]:
     """
     Validate the CSV file structure.
     Returns (is_valid, error_message, sample_count, gene_count)
     """
-    try:
-        reader = csv.DictReader(io.StringIO(file_content))
-        headers = reader.fieldnames
-        
-        # Check required headers
-        required_headers = {"sample_id", "gene", "value"}
-        if not required_headers.issubset(set(headers)):
-            missing = required_headers - set(headers)
-            return False, f"Missing required columns: {', '.join(missing)}", 0, 0
-        
-        # Validate data rows
-        sample_ids = set()
-        genes = set()
-        row_count = 0
-        
-        for row in reader:
-            try:
-                # Create a model instance to validate data types
-                OmicsDataRow(
-                    sample_id=row["sample_id"],
-                    gene=row["gene"],
-                    value=float(row["value"])
-                )
-                sample_ids.add(row["sample_id"])
-                genes.add(row["gene"])
-                row_count += 1
-            except ValueError as e:
-                return False, f"Row {row_count+1}: {str(e)}", 0, 0
-        
-        if row_count == 0:
-            return False, "File contains no data rows", 0, 0
-            
-        return True, "", len(sample_ids), len(genes)
-        
-    except Exception as e:
-        return False, f"Error parsing CSV: {str(e)}", 0, 0
+    return inspect_text(file_content, "csv", max_malformed=1).validation_result()
 
-async def validate_json_structure(file_content: str) -> tuple[bool, str, int, int]:
+def validate_json_structure(file_content: str) -> tuple[bool, str, int, int]:
     """
     Validate the JSON file structure.
     Returns (is_valid, error_message, sample_count, gene_count)
     """
+    return inspect_text(file_content, "json", max_malformed=1).validation_result()
+
+def decompress_upload(file_content: bytes, upload_codec: str, hasher) -> bytes:
+    """
+    Decompress a compressed upload, feeding the payload to the hasher.
+    Raises HTTPException for corrupt data.
+    """
+    raw_chunks = []
     try:
-        data = json.loads(file_content)
-        
-        if not isinstance(data, list):
-            return False, "JSON file must contain a list of data objects", 0, 0
-            
-        if len(data) == 0:
-            return False, "File contains no data rows", 0, 0
-            
-        sample_ids = set()
-        genes = set()
-        
-        for i, item in enumerate(data):
-            try:
-                # Create a model instance to validate data
-                row = OmicsDataRow(**item)
-                sample_ids.add(row.sample_id)
-                genes.add(row.gene)
-            except Exception as e:
-                return False, f"Row {i+1}: {str(e)}", 0, 0
-                
-        return True, "", len(sample_ids), len(genes)
-        
-    except json.JSONDecodeError as e:
-        return False, f"Invalid JSON format: {str(e)}", 0, 0
-    except Exception as e:
-        return False, f"Error parsing JSON: {str(e)}", 0, 0
+        for chunk in iter_decompressed(file_content, upload_codec, READ_CHUNK_SIZE):
+            hasher.update(chunk)
+            raw_chunks.append(chunk)
+    except (OSError, EOFError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File is not valid gzip data"
+        )
+    return b"".join(raw_chunks)
+
+def validate_content(file_type: str, raw_content: bytes) -> tuple[tuple[bool, str, int, int], Optional[MatrixBuilder]]:
+    """
+    Validate a payload of the given type in a single parse, collecting its
+    rows into a MatrixBuilder for the import pipeline. Large payloads are
+    inspected in byte ranges across the process pool.
+    Returns ((is_valid, error_message, sample_count, gene_count), builder).
+    """
+    if PARALLEL_VALIDATION_WORKERS > 1 and len(raw_content) >= PARALLEL_VALIDATION_MIN_SIZE:
+        result = validate_parallel(file_type, raw_content, row_builder=MatrixBuilder)
+        if result is not None:
+            return result
+    builder = MatrixBuilder()
+    inspection = inspect_bytes(raw_content, file_type, on_row=builder.add, max_malformed=1)
+    return inspection.validation_result(), builder
+
+async def save_import(
+    db: AsyncSession,
+    file_name: str,
+    file_type: str,
+    stored_content: bytes,
+    content_codec: str,
+    raw_size: int,
+    content_sha256: str,
+    idempotency_key: Optional[str],
+    sample_count: int,
+    gene_count: int
+) -> ImportResponse:
+    """
+    Persist a validated payload to omics_raw and register its dedupe keys in
+    the same transaction, then build the import response.
+    """
+    # Create database record
+    omics_file = OmicsFileCreate(
+        file_name=file_name,
+        file_type=file_type,
+        file_content=stored_content,
+        content_codec=content_codec,
+        raw_size=raw_size,
+        stored_size=len(stored_content),
+        content_sha256=content_sha256,
+        idempotency_key=idempotency_key,
+        sample_count=sample_count,
+        gene_count=gene_count
+    )
+    
+    # Save to database
+    db_file = OmicsRaw(
+        file_name=omics_file.file_name,
+        file_type=omics_file.file_type,
+        file_content=omics_file.file_content,
+        content_codec=omics_file.content_codec,
+        raw_size=omics_file.raw_size,
+        stored_size=omics_file.stored_size,
+        content_sha256=omics_file.content_sha256,
+        idempotency_key=omics_file.idempotency_key,
+        sample_count=omics_file.sample_count,
+        gene_count=omics_file.gene_count
+    )
+    
+    db.add(db_file)
+    try:
+        await db.flush()
+        db.add(OmicsImportKey(kind=IMPORT_KEY_SHA256, key=content_sha256, file_id=db_file.id))
+        if idempotency_key:
+            db.add(OmicsImportKey(kind=IMPORT_KEY_IDEMPOTENCY, key=idempotency_key, file_id=db_file.id))
+        await db.commit()
+    except IntegrityError:
+        # A concurrent upload of the same payload or key won the race
+        await db.rollback()
+        existing = await find_existing_import(db, content_sha256, idempotency_key)
+        if existing is None:
+            raise
+        return duplicate_response(existing)
+    
+    # Return success response
+    return ImportResponse(
+        success=True,
+        file_id=db_file.id,
+        file_name=db_file.file_name,
+        rows_count=sample_count * gene_count,
+        message=f"Successfully imported file with {sample_count} samples and {gene_count} genes"
+    )
 
 @router.post("", response_model=ImportResponse)
 async def import_omics_file(
+    background_tasks: BackgroundTasks,
+    response: Response,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Import an omics data file (CSV or JSON)
+    Import an omics data file (CSV, JSON or NDJSON).
+    Re-uploads of an already imported payload, or retries carrying the same
+    Idempotency-Key header, return the existing file_id without re-importing.
+    The time spent reading, decoding, validating, compressing and persisting
+    the upload is reported in the Server-Timing header.
     """
+    timer = StageTimer()
     try:
-        # Check file extension
-        file_extension = file.filename.split(".")[-1].lower()
-        if file_extension not in ["csv", "json"]:
+        # Check file extension, allowing gzip-compressed uploads (.csv.gz, .json.gz, .ndjson.gz)
+        file_extension, upload_codec = split_file_name(file.filename)
+        if file_extension not in SUPPORTED_FILE_TYPES:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Only CSV and JSON files are supported"
+                detail="Only CSV, JSON and NDJSON files are supported"
             )
             
-        # Read file content
-        file_content = await file.read()
-        content_str = file_content.decode("utf-8")
+        # Read the upload in chunks, hashing the decompressed payload as it arrives.
+        # CPU-bound work (hashing, decompression, validation, compression) runs
+        # in the threadpool so the event loop keeps serving other requests.
+        hasher = hashlib.sha256()
+        chunks = []
+        with timer.stage("read"):
+            while True:
+                chunk = await file.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                if not upload_codec:
+                    await run_in_threadpool(hasher.update, chunk)
+            file_content = b"".join(chunks)
         
-        # Validate file structure based on type
-        is_valid = False
-        error_message = ""
-        sample_count = 0
-        gene_count = 0
+        if upload_codec:
+            # Compressed uploads are stored exactly as received, only decompressed for validation
+            with timer.stage("decode"):
+                raw_content = await run_in_threadpool(decompress_upload, file_content, upload_codec, hasher)
+            stored_content = file_content
+            content_codec = upload_codec
+        else:
+            raw_content = file_content
+            content_codec = STORAGE_CODEC
+            stored_content = None  # compressed after validation
+        content_sha256 = hasher.hexdigest()
         
-        if file_extension == "csv":
-            is_valid, error_message, sample_count, gene_count = await validate_csv_structure(content_str)
-        else:  # JSON
-            is_valid, error_message, sample_count, gene_count = await validate_json_structure(content_str)
+        # Skip validation and storage entirely for payloads we already have
+        with timer.stage("lookup"):
+            existing = await find_existing_import(db, content_sha256, idempotency_key)
+        if existing:
+            response.headers["Server-Timing"] = timer.header()
+            return duplicate_response(existing)
+            
+        # Validate file structure based on type, keeping the parsed rows for the pipeline
+        with timer.stage("validate"):
+            (is_valid, error_message, sample_count, gene_count), builder = await run_in_threadpool(
+                validate_content, file_extension, raw_content
+            )
             
         if not is_valid:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid file structure: {error_message}"
+                detail=f"Invalid file structure: {error_message}",
+                headers={"Server-Timing": timer.header()}
             )
             
-        # Create database record
-        omics_file = OmicsFileCreate(
-            file_name=file.filename,
-            file_type=file_extension,
-            file_content=content_str,
-            sample_count=sample_count,
-            gene_count=gene_count
-        )
-        
-        # Save to database
-        db_file = OmicsRaw(
-            file_name=omics_file.file_name,
-            file_type=omics_file.file_type,
-            file_content=omics_file.file_content,
-            sample_count=omics_file.sample_count,
-            gene_count=omics_file.gene_count
-        )
-        
-        db.add(db_file)
-        db.commit()
-        db.refresh(db_file)
-        
-        # Return success response
-        return ImportResponse(
-            success=True,
-            file_id=db_file.id,
-            file_name=db_file.file_name,
-            rows_count=sample_count * gene_count,
-            message=f"Successfully imported file with {sample_count} samples and {gene_count} genes"
-        )
+        if stored_content is None:
+            with timer.stage("compress"):
+                stored_content = await run_in_threadpool(compress, raw_content, content_codec)
+            
+        with timer.stage("persist"):
+            result = await save_import(
+                db,
+                file_name=file.filename,
+                file_type=file_extension,
+                stored_content=stored_content,
+                content_codec=content_codec,
+                raw_size=len(raw_content),
+                content_sha256=content_sha256,
+                idempotency_key=idempotency_key,
+                sample_count=sample_count,
+                gene_count=gene_count
+            )
+        if not result.duplicate:
+            # Build derived artifacts from the already parsed rows after responding
+            background_tasks.add_task(run_import_pipeline, result.file_id, builder=builder)
+        response.headers["Server-Timing"] = timer.header()
+        return result
             
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -166,4 +305,235 @@ async def import_omics_file(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing file: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+def encode_cursor(created_at: datetime, file_id: int) -> str:
+    """Encode the (created_at, id) keyset position of the last listed row."""
+    raw = f"{created_at.isoformat()}|{file_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, file_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(file_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+@router.get("", response_model=OmicsFileList)
+async def list_omics_files(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    processed: Optional[int] = Query(None, ge=0, le=3),
+    file_type: Optional[str] = Query(None),
+    created_after: Optional[datetime] = Query(None),
+    created_before: Optional[datetime] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    List imported files, newest first, with keyset pagination on (created_at, id).
+    Only metadata columns are read; payloads are never loaded.
+    """
+    query = select(*OMICS_FILE_COLUMNS)
+    if processed is not None:
+        query = query.where(OmicsRaw.processed == processed)
+    if file_type is not None:
+        query = query.where(OmicsRaw.file_type == file_type.lower())
+    if created_after is not None:
+        query = query.where(OmicsRaw.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(OmicsRaw.created_at < created_before)
+    if cursor is not None:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        # The plain bound lets PostgreSQL prune newer partitions; the row comparison alone does not
+        query = query.where(
+            OmicsRaw.created_at <= cursor_created_at,
+            tuple_(OmicsRaw.created_at, OmicsRaw.id) < tuple_(cursor_created_at, cursor_id)
+        )
+    query = query.order_by(OmicsRaw.created_at.desc(), OmicsRaw.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(query)).all()
+    items = [OmicsFile(**row._mapping) for row in rows[:limit]]
+    next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if len(rows) > limit else None
+    return OmicsFileList(items=items, next_cursor=next_cursor)
+
+@router.get("/{file_id}", response_model=OmicsFile)
+async def get_omics_file(file_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Return the metadata and processing status of an imported file.
+    """
+    row = (await db.execute(select(*OMICS_FILE_COLUMNS).where(OmicsRaw.id == file_id))).first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"File {file_id} not found")
+    return OmicsFile(**row._mapping)
+
+def parse_names(value: Optional[str]) -> Optional[list]:
+    """Split a comma-separated query parameter."""
+    if value is None:
+        return None
+    return [name for name in value.split(",") if name]
+
+@router.get("/{file_id}/matrix")
+async def get_omics_matrix(
+    file_id: int,
+    row_start: int = Query(0, ge=0, description="First sample row"),
+    row_stop: Optional[int] = Query(None, ge=0, description="Sample row to stop before"),
+    col_start: int = Query(0, ge=0, description="First gene column"),
+    col_stop: Optional[int] = Query(None, ge=0, description="Gene column to stop before"),
+    samples: Optional[str] = Query(None, description="Comma-separated sample ids, instead of a row range"),
+    genes: Optional[str] = Query(None, description="Comma-separated genes, instead of a column range"),
+    format: str = Query("json", pattern="^(json|npy)$"),
+    layer: Optional[str] = Query(None, description="Normalization layer, e.g. cpm+log1p or cpm log1p; raw values if omitted"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Read a slice of the sample x gene matrix built for an imported file, or
+    of one of its normalization layers. The matrix is memory-mapped, so only
+    the requested cells are read. With format=npy the slice is returned as a
+    float32 .npy array.
+    """
+    if layer is not None:
+        try:
+            layer = layer_name(parse_layer(layer))
+        except NormalizationError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    result = await db.execute(select(OmicsRaw.processed).where(OmicsRaw.id == file_id))
+    processed = result.scalar_one_or_none()
+    if processed is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"File {file_id} not found")
+    if processed != PROCESSED or await run_in_threadpool(open_matrix, file_id) is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Matrix for file {file_id} is not ready")
+    matrix = await run_in_threadpool(open_matrix, file_id, layer)
+    if matrix is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Layer {layer} not found for file {file_id}")
+
+    n_samples, n_genes = matrix.shape
+    try:
+        sample_names = parse_names(samples)
+        gene_names = parse_names(genes)
+        rows = matrix.sample_positions(sample_names) if sample_names is not None else \
+            list(range(min(row_start, n_samples), min(row_stop if row_stop is not None else n_samples, n_samples)))
+        cols = matrix.gene_positions(gene_names) if gene_names is not None else \
+            list(range(min(col_start, n_genes), min(col_stop if col_stop is not None else n_genes, n_genes)))
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e.args[0]))
+    if len(rows) * len(cols) > MATRIX_MAX_CELLS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Slice of {len(rows)}x{len(cols)} exceeds {MATRIX_MAX_CELLS} cells"
+        )
+
+    block = await run_in_threadpool(matrix.read, rows, cols)
+    if format == "npy":
+        buffer = io.BytesIO()
+        np.save(buffer, block)
+        return Response(
+            content=buffer.getvalue(),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="omics_{file_id}_matrix.npy"'}
+        )
+    return {
+        "file_id": file_id,
+        "format": matrix.format,
+        "layer": layer,
+        "shape": [n_samples, n_genes],
+        "samples": [matrix.samples[i] for i in rows],
+        "genes": [matrix.genes[i] for i in cols],
+        "values": [[None if np.isnan(v) else float(v) for v in row] for row in block.tolist()],
+    }
+
+async def ensure_processed(db: AsyncSession, file_id: int) -> None:
+    processed = await db.scalar(select(OmicsRaw.processed).where(OmicsRaw.id == file_id))
+    if processed is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"File {file_id} not found")
+    if processed != PROCESSED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Matrix for file {file_id} is not ready")
+
+@router.get("/{file_id}/normalizations", response_model=NormalizationLayers)
+async def get_normalization_layers(file_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    List the normalization layers stored for an imported file.
+    """
+    await ensure_processed(db, file_id)
+    layers = await run_in_threadpool(list_layers, file_id)
+    return NormalizationLayers(file_id=file_id, layers=layers, steps=list(STEPS))
+
+@router.post("/{file_id}/normalizations", status_code=status.HTTP_202_ACCEPTED, response_model=NormalizationLayers)
+async def create_normalization_layers(
+    file_id: int,
+    request: NormalizationRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Build additional normalization layers for an imported file in the
+    background. Poll GET /import/{file_id}/normalizations for completion.
+    """
+    try:
+        layers = [layer_name(parse_layer(layer)) for layer in request.layers]
+    except NormalizationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if any("tpm" in layer.split("+") for layer in layers) and not (request.gene_lengths or GENE_LENGTHS_FILE):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="TPM needs gene_lengths")
+    await ensure_processed(db, file_id)
+    background_tasks.add_task(normalize_matrix, file_id, layers, request.gene_lengths)
+    return NormalizationLayers(file_id=file_id, layers=layers, steps=list(STEPS))
+
+@router.get("/{file_id}/parquet")
+async def download_omics_parquet(file_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Download the Parquet partition built for an imported file: sample_id and
+    gene as dictionary-encoded columns, value as float32.
+    """
+    result = await db.execute(select(OmicsRaw.processed, OmicsRaw.parquet_path).where(OmicsRaw.id == file_id))
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"File {file_id} not found")
+    if row.processed != PROCESSED or row.parquet_path is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Parquet data for file {file_id} is not ready")
+    return StreamingResponse(
+        iter_parquet_bytes(row.parquet_path),
+        media_type="application/vnd.apache.parquet",
+        headers={"Content-Disposition": f'attachment; filename="omics_{file_id}.parquet"'}
+    )
+
+@router.get("/{file_id}/stats", response_model=ImportStats)
+async def get_omics_stats(
+    file_id: int,
+    genes: Optional[str] = Query(None, description="Comma-separated genes to return statistics for"),
+    gene_limit: int = Query(1000, ge=1, le=10000),
+    gene_after: Optional[str] = Query(None, description="next_gene from the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Return the summary statistics computed when the file was imported:
+    whole-file, per-sample and per-gene count, mean, variance, min, max and
+    missing rate. Never reads the raw payload.
+    """
+    file_stats = await db.get(OmicsFileStats, file_id)
+    if file_stats is None:
+        exists = await db.scalar(select(OmicsRaw.id).where(OmicsRaw.id == file_id))
+        if exists is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"File {file_id} not found")
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Statistics for file {file_id} are not ready")
+
+    samples = (await db.scalars(
+        select(OmicsSampleStats).where(OmicsSampleStats.file_id == file_id).order_by(OmicsSampleStats.sample_id)
+    )).all()
+
+    gene_query = select(OmicsGeneStats).where(OmicsGeneStats.file_id == file_id)
+    gene_names = parse_names(genes)
+    if gene_names is not None:
+        gene_query = gene_query.where(OmicsGeneStats.gene.in_(gene_names))
+    if gene_after is not None:
+        gene_query = gene_query.where(OmicsGeneStats.gene > gene_after)
+    gene_rows = (await db.scalars(gene_query.order_by(OmicsGeneStats.gene).limit(gene_limit + 1))).all()
+    next_gene = gene_rows[gene_limit - 1].gene if len(gene_rows) > gene_limit else None
+
+    return ImportStats(
+        file_id=file_id,
+        file=FileStats.model_validate(file_stats, from_attributes=True),
+        samples=[SampleStats.model_validate(row, from_attributes=True) for row in samples],
+        genes=[GeneStats.model_validate(row, from_attributes=True) for row in gene_rows[:gene_limit]],
+        next_gene=next_gene
+    )
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from typing import List, Optional
+import logging
+from ..schemas.schemas import ProfileInfo
+from ..utils.profiling import store
+from ..utils.sampling import PROFILING_ENABLED, PROFILING_TOKEN, token_valid
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter(prefix="/debug/profiles")
+
+
+def require_profile_token(x_profile_token: Optional[str] = Header(None)) -> None:
+    """Profiles expose code paths and request labels: only served with PROFILING_TOKEN."""
+    if not PROFILING_ENABLED or not PROFILING_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is not enabled")
+    if not token_valid(x_profile_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or missing X-Profile-Token")
+
+
+@router.get("", response_model=List[ProfileInfo], dependencies=[Depends(require_profile_token)])
+async def list_profiles():
+    """List the stored request profiles, newest first."""
+    return await run_in_threadpool(store.list)
+
+
+@router.get("/{profile_id}", dependencies=[Depends(require_profile_token)])
+async def download_profile(profile_id: str):
+    """
+    Download a profile as folded stacks ("frame;frame;frame count" per
+    line), e.g. for flamegraph.pl or speedscope.
+    """
+    path = store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Profile {profile_id} not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.collapsed")
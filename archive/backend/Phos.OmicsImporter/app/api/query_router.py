@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional
+import json
+import os
+import logging
+from ..db.database import AsyncSessionLocal, get_async_db
+from ..db.models import OmicsValue
+from ..schemas.schemas import GeneValuesQuery
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter()
+
+# Rows fetched from the database cursor and written to the response at a time
+STREAM_BATCH_SIZE = int(os.getenv("QUERY_STREAM_BATCH_SIZE", "2000"))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def parse_file_ids(value: Optional[str]) -> Optional[List[int]]:
+    """Split a comma-separated list of file ids."""
+    if value is None:
+        return None
+    try:
+        return [int(file_id) for file_id in value.split(",") if file_id]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="file_ids must be a comma-separated list of integers"
+        )
+
+
+def value_query(file_ids: Optional[List[int]]):
+    query = select(OmicsValue.gene, OmicsValue.file_id, OmicsValue.sample_id, OmicsValue.value)
+    if file_ids is not None:
+        query = query.where(OmicsValue.file_id.in_(file_ids))
+    return query
+
+
+async def stream_values(query) -> AsyncIterator[bytes]:
+    """
+    Stream query rows as NDJSON. Uses its own session so the database cursor
+    stays open for as long as the response is being written.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield "".join(
+                json.dumps({"gene": gene, "file_id": file_id, "sample_id": sample_id, "value": value}) + "\n"
+                for gene, file_id, sample_id, value in rows
+            ).encode()
+
+
+async def ensure_exists(db: AsyncSession, condition, detail: str) -> None:
+    found = await db.scalar(select(OmicsValue.file_id).where(condition).limit(1))
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+
+
+@router.get("/genes/{gene}/values")
+async def get_gene_values(
+    gene: str,
+    file_ids: Optional[str] = Query(None, description="Comma-separated file ids to restrict the lookup to"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stream every measurement of a gene across all processed imports as NDJSON,
+    ordered by file and sample.
+    """
+    ids = parse_file_ids(file_ids)
+    await ensure_exists(db, OmicsValue.gene == gene, f"Gene {gene} not found in any imported file")
+    query = value_query(ids).where(OmicsValue.gene == gene).order_by(OmicsValue.file_id, OmicsValue.sample_id)
+    return StreamingResponse(stream_values(query), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.post("/genes/values")
+async def get_genes_values(request: GeneValuesQuery):
+    """
+    Stream the measurements of many genes in one request as NDJSON, grouped
+    by gene. Genes with no measurements are omitted.
+    """
+    query = (
+        value_query(request.file_ids)
+        .where(OmicsValue.gene.in_(set(request.genes)))
+        .order_by(OmicsValue.gene, OmicsValue.file_id, OmicsValue.sample_id)
+    )
+    return StreamingResponse(stream_values(query), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.get("/samples/{sample_id}/profile")
+async def get_sample_profile(
+    sample_id: str,
+    file_ids: Optional[str] = Query(None, description="Comma-separated file ids to restrict the lookup to"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stream every gene measured for a sample across all processed imports as
+    NDJSON, ordered by file and gene.
+    """
+    ids = parse_file_ids(file_ids)
+    await ensure_exists(db, OmicsValue.sample_id == sample_id, f"Sample {sample_id} not found in any imported file")
+    query = value_query(ids).where(OmicsValue.sample_id == sample_id).order_by(OmicsValue.file_id, OmicsValue.gene)
+    return StreamingResponse(stream_values(query), media_type=NDJSON_MEDIA_TYPE)
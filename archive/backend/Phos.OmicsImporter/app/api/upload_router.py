@@ -0,0 +1,347 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Optional, Dict
+import os
+import threading
+import time
+import uuid
+import logging
+from ..db.database import get_async_db
+from ..db.models import OmicsUploadSession, OmicsUploadChunk
+from ..schemas.schemas import ImportResponse, UploadSessionCreate, UploadSessionComplete, UploadSessionStatus
+from ..utils.compression import STORAGE_CODEC, compress_chunks
+from ..utils.file_utils import split_file_name, SUPPORTED_FILE_TYPES
+from ..utils.inspector import UploadStream
+from ..services.matrix_store import MatrixBuilder
+from ..services.pipeline import run_import_pipeline
+from ..utils.upload_spool import ChunkTooLargeError, write_chunk, read_chunk, iter_chunks, remove_upload
+from ..utils.profiling import run_in_threadpool
+from .import_router import find_existing_import, duplicate_response, save_import
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter(prefix="/import/uploads")
+
+# Validation state of an upload idle this long is dropped from memory; it is rebuilt from the spool if the upload resumes
+UPLOAD_STATE_IDLE_SECONDS = int(os.getenv("UPLOAD_STATE_IDLE_SECONDS", "900"))
+
+
+class PrefixState:
+    """
+    Incremental validation state for the contiguous prefix of an upload that
+    has been received so far. Kept in process memory until the upload ends
+    or sits idle for UPLOAD_STATE_IDLE_SECONDS; a worker without state for
+    an upload rebuilds it from the spooled chunks.
+    """
+
+    def __init__(self, upload: OmicsUploadSession):
+        # Rows are collected as they are validated, so the pipeline never re-parses them
+        self.builder = MatrixBuilder()
+        self.stream = UploadStream(upload.file_type, upload.upload_codec, on_row=self.builder.add, max_malformed=1)
+        self.next_chunk = 0
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+_prefix_states: Dict[str, PrefixState] = {}
+_prefix_states_lock = threading.Lock()
+
+
+def get_prefix_state(upload: OmicsUploadSession) -> PrefixState:
+    with _prefix_states_lock:
+        evict_idle_prefix_states()
+        state = _prefix_states.get(upload.id)
+        if state is None:
+            state = _prefix_states[upload.id] = PrefixState(upload)
+        state.last_used = time.monotonic()
+        return state
+
+
+def evict_idle_prefix_states() -> None:
+    """
+    Drop the state, and the parsed rows it holds, of uploads abandoned
+    without being completed or deleted. Called with _prefix_states_lock held.
+    """
+    cutoff = time.monotonic() - UPLOAD_STATE_IDLE_SECONDS
+    for upload_id, state in list(_prefix_states.items()):
+        if state.last_used < cutoff and not state.lock.locked():
+            del _prefix_states[upload_id]
+            logger.info(f"Dropped validation state of idle upload {upload_id}")
+
+
+def drop_prefix_state(upload_id: str) -> None:
+    with _prefix_states_lock:
+        _prefix_states.pop(upload_id, None)
+
+
+def feed_prefix(state: PrefixState, upload_id: str, received: set) -> None:
+    """Feed every newly contiguous chunk into the validator. Blocking."""
+    with state.lock:
+        while state.next_chunk in received and not state.stream.failed:
+            state.stream.feed(read_chunk(upload_id, state.next_chunk))
+            state.next_chunk += 1
+
+
+async def advance_prefix(upload: OmicsUploadSession) -> PrefixState:
+    """
+    Validate the contiguous prefix received so far, so that validation runs
+    while later chunks are still in flight.
+    """
+    state = get_prefix_state(upload)
+    received = {chunk.chunk_index for chunk in upload.chunks}
+    await run_in_threadpool(feed_prefix, state, upload.id, received)
+    state.last_used = time.monotonic()
+    upload.validated_chunks = state.next_chunk
+    if state.stream.failed:
+        upload.status = "failed"
+        upload.error = state.stream.error
+    return state
+
+
+def finish_prefix(state: PrefixState) -> tuple[bool, str, int, int]:
+    """Flush the validator once every chunk has been fed. Blocking."""
+    with state.lock:
+        return state.stream.finish().validation_result()
+
+
+def build_stored_content(upload: OmicsUploadSession) -> tuple[bytes, str]:
+    """Assemble the spooled chunks into the stored payload. Blocking."""
+    chunks = iter_chunks(upload.id, upload.total_chunks)
+    if upload.upload_codec:
+        # Compressed uploads are stored exactly as received
+        return b"".join(chunks), upload.upload_codec
+    return compress_chunks(chunks, STORAGE_CODEC), STORAGE_CODEC
+
+
+async def get_upload(db: AsyncSession, upload_id: str) -> OmicsUploadSession:
+    result = await db.execute(
+        select(OmicsUploadSession)
+        .where(OmicsUploadSession.id == upload_id)
+        .options(selectinload(OmicsUploadSession.chunks))
+        .execution_options(populate_existing=True)
+    )
+    upload = result.scalars().first()
+    if upload is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Upload {upload_id} not found"
+        )
+    return upload
+
+
+def upload_status(upload: OmicsUploadSession) -> UploadSessionStatus:
+    received = sorted(chunk.chunk_index for chunk in upload.chunks)
+    missing = None
+    if upload.total_chunks is not None:
+        received_set = set(received)
+        missing = [i for i in range(upload.total_chunks) if i not in received_set]
+    return UploadSessionStatus(
+        upload_id=upload.id,
+        file_name=upload.file_name,
+        status=upload.status,
+        total_chunks=upload.total_chunks,
+        received_chunks=received,
+        missing_chunks=missing,
+        validated_chunks=upload.validated_chunks or 0,
+        received_bytes=sum(chunk.size for chunk in upload.chunks),
+        error=upload.error,
+        file_id=upload.file_id
+    )
+
+
+@router.post("", response_model=UploadSessionStatus, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    request: UploadSessionCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Start a chunked, resumable upload of an omics data file (CSV, JSON or
+    NDJSON, optionally gzip-compressed).
+    """
+    file_type, upload_codec = split_file_name(request.file_name)
+    if file_type not in SUPPORTED_FILE_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only CSV, JSON and NDJSON files are supported"
+        )
+    upload = OmicsUploadSession(
+        id=str(uuid.uuid4()),
+        file_name=request.file_name,
+        file_type=file_type,
+        upload_codec=upload_codec,
+        idempotency_key=idempotency_key,
+        total_chunks=request.total_chunks,
+        validated_chunks=0,
+        status="open"
+    )
+    db.add(upload)
+    await db.commit()
+    return upload_status(await get_upload(db, upload.id))
+
+
+@router.get("/{upload_id}", response_model=UploadSessionStatus)
+async def get_upload_status(upload_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Report which chunks of an upload have been received and validated.
+    """
+    return upload_status(await get_upload(db, upload_id))
+
+
+@router.put("/{upload_id}/chunks/{chunk_index}", response_model=UploadSessionStatus)
+async def put_chunk(
+    upload_id: str,
+    chunk_index: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Upload one numbered chunk (0-based) as the raw request body. Chunks may
+    arrive in any order and in parallel; re-sending a chunk replaces it.
+    """
+    upload = await get_upload(db, upload_id)
+    if upload.status != "open":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload is {upload.status}" + (f": {upload.error}" if upload.error else "")
+        )
+    if chunk_index < 0 or (upload.total_chunks is not None and chunk_index >= upload.total_chunks):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Chunk index {chunk_index} is out of range"
+        )
+    if chunk_index < (upload.validated_chunks or 0):
+        # Already consumed by the prefix validator; the first copy wins
+        return upload_status(upload)
+
+    try:
+        size = await write_chunk(upload_id, chunk_index, request.stream())
+    except ChunkTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+
+    await db.merge(OmicsUploadChunk(upload_id=upload_id, chunk_index=chunk_index, size=size))
+    await db.commit()
+    upload = await get_upload(db, upload_id)
+
+    await advance_prefix(upload)
+    await db.commit()
+    if upload.status == "failed":
+        # The prefix is already invalid, so the spooled data is of no further use
+        drop_prefix_state(upload_id)
+        await run_in_threadpool(remove_upload, upload_id)
+    return upload_status(upload)
+
+
+@router.post("/{upload_id}/complete", response_model=ImportResponse)
+async def complete_upload(
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    request: Optional[UploadSessionComplete] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Finish validating a fully received upload and import it.
+    """
+    upload = await get_upload(db, upload_id)
+    if upload.status == "completed":
+        # Completing twice is a retry; report the original import
+        return ImportResponse(
+            success=True,
+            file_id=upload.file_id,
+            file_name=upload.file_name,
+            duplicate=True,
+            message=f"Upload already completed as {upload.file_id}"
+        )
+    if upload.status == "failed":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid file structure: {upload.error}"
+        )
+
+    if request is not None and request.total_chunks is not None:
+        upload.total_chunks = request.total_chunks
+    if upload.total_chunks is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="total_chunks must be given when the upload is created or completed"
+        )
+    status_info = upload_status(upload)
+    if status_info.missing_chunks:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Upload is missing chunks", "missing_chunks": status_info.missing_chunks}
+        )
+    if max(status_info.received_chunks) >= upload.total_chunks:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload has chunks beyond total_chunks"
+        )
+
+    try:
+        state = await advance_prefix(upload)
+        is_valid, error_message, sample_count, gene_count = await run_in_threadpool(finish_prefix, state)
+        drop_prefix_state(upload_id)
+        if not is_valid:
+            upload.status = "failed"
+            upload.error = error_message
+            await db.commit()
+            await run_in_threadpool(remove_upload, upload_id)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid file structure: {error_message}"
+            )
+
+        existing = await find_existing_import(db, state.stream.sha256, upload.idempotency_key)
+        if existing:
+            response = duplicate_response(existing)
+        else:
+            stored_content, content_codec = await run_in_threadpool(build_stored_content, upload)
+            response = await save_import(
+                db,
+                file_name=upload.file_name,
+                file_type=upload.file_type,
+                stored_content=stored_content,
+                content_codec=content_codec,
+                raw_size=state.stream.raw_size,
+                content_sha256=state.stream.sha256,
+                idempotency_key=upload.idempotency_key,
+                sample_count=sample_count,
+                gene_count=gene_count
+            )
+
+        upload.status = "completed"
+        upload.file_id = response.file_id
+        await db.commit()
+        await run_in_threadpool(remove_upload, upload_id)
+        if not response.duplicate:
+            background_tasks.add_task(run_import_pipeline, response.file_id, builder=state.builder)
+        return response
+
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        logger.exception("Error completing chunked upload")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing file: {str(e)}"
+        )
+
+
+@router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(upload_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Abort an upload and discard its spooled chunks.
+    """
+    upload = await get_upload(db, upload_id)
+    drop_prefix_state(upload_id)
+    await run_in_threadpool(remove_upload, upload_id)
+    await db.delete(upload)
+    await db.commit()
@@ -1,21 +1,222 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, func
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Text, LargeBinary, DateTime, ForeignKey, Index, func
+from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
+from ..utils.compression import CODEC_IDENTITY, open_text, iter_decompressed
+from ..utils.cold_storage import read_payload
+
+# Values of OmicsRaw.processed
+PROCESSING_PENDING = 0
+PROCESSING = 1
+PROCESSED = 2
+PROCESSING_FAILED = 3
 
 class OmicsRaw(Base):
     """
-    Model for storing raw omics data files.
+    Model for storing raw omics data files. On PostgreSQL the table is
+    range-partitioned by month of created_at (see app.db.partitions); the
+    primary key there is (id, created_at), and ids stay unique through the
+    shared sequence. Uniqueness of payload hashes and idempotency keys is
+    enforced by omics_import_keys, since a partitioned table cannot.
     """
     __tablename__ = "omics_raw"
 
     id = Column(Integer, primary_key=True, index=True)
     file_name = Column(String(255), nullable=False)
     file_type = Column(String(50), nullable=False)  # CSV or JSON
-    file_content = Column(Text, nullable=False)
+    file_content = Column(LargeBinary, nullable=True)  # compressed with content_codec; NULL once archived
+    content_codec = Column(String(16), nullable=False, default=CODEC_IDENTITY)  # identity, gzip or zstd
+    raw_size = Column(BigInteger, nullable=True)  # decompressed size in bytes
+    stored_size = Column(BigInteger, nullable=True)  # size of file_content in bytes
+    content_sha256 = Column(String(64), nullable=True, index=True)  # SHA-256 of the decompressed payload
+    idempotency_key = Column(String(255), nullable=True, index=True)  # client supplied Idempotency-Key
     sample_count = Column(Integer, nullable=True)
     gene_count = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # partition key on PostgreSQL
+    processed = Column(Integer, default=PROCESSING_PENDING)  # 0=not processed, 1=processing, 2=processed, 3=failed
+    parquet_path = Column(String(1024), nullable=True)  # Parquet partition, relative to PARQUET_STORE_URI
+    payload_uri = Column(String(1024), nullable=True)  # archived payload, relative to COLD_STORAGE_URI
+    archived_at = Column(DateTime, nullable=True)
+
+    # Composite indexes backing keyset pagination of the listing API
+    __table_args__ = (
+        Index("ix_omics_raw_created_at_id", "created_at", "id"),
+        Index("ix_omics_raw_processed_created_at_id", "processed", "created_at", "id"),
+        Index("ix_omics_raw_file_type_created_at_id", "file_type", "created_at", "id"),
+    )
+
+    def stored_payload(self) -> bytes:
+        """Return the compressed payload, fetching it from cold storage if it was archived."""
+        if self.file_content is None and self.payload_uri is not None:
+            return read_payload(self.payload_uri)
+        return self.file_content
+
+    def open_content(self):
+        """Open the payload as a text stream, decompressing as it is read."""
+        return open_text(self.stored_payload(), self.content_codec)
+
+    def iter_content(self, chunk_size: int = 1024 * 1024):
+        """Yield the decompressed payload in byte chunks."""
+        return iter_decompressed(self.stored_payload(), self.content_codec, chunk_size)
+
+    def __repr__(self):
+        return f"<OmicsRaw(id={self.id}, file_name='{self.file_name}', file_type='{self.file_type}')>"
+
+# Values of OmicsImportKey.kind
+IMPORT_KEY_SHA256 = "sha256"
+IMPORT_KEY_IDEMPOTENCY = "idempotency"
+
+class OmicsImportKey(Base):
+    """
+    Model for the keys an import is deduplicated by: the payload hash and the
+    client's Idempotency-Key. The primary key makes each key unique across
+    every omics_raw partition.
+    """
+    __tablename__ = "omics_import_keys"
+
+    kind = Column(String(16), primary_key=True)  # sha256 or idempotency
+    key = Column(String(255), primary_key=True)
+    file_id = Column(Integer, nullable=False)  # omics_raw.id
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_omics_import_keys_file_id", "file_id"),
+    )
+
+class OmicsUploadSession(Base):
+    """
+    Model for a chunked, resumable upload. Chunk bodies are spooled on disk
+    until the upload is completed and stored as an OmicsRaw row.
+    """
+    __tablename__ = "omics_upload_sessions"
+
+    id = Column(String(36), primary_key=True)  # uuid4
+    file_name = Column(String(255), nullable=False)
+    file_type = Column(String(50), nullable=False)
+    upload_codec = Column(String(16), nullable=True)  # set for gzip uploads
+    idempotency_key = Column(String(255), nullable=True)
+    total_chunks = Column(Integer, nullable=True)  # may be supplied on completion
+    validated_chunks = Column(Integer, default=0)  # contiguous prefix already validated
+    status = Column(String(20), nullable=False, default="open")  # open, failed, completed
+    error = Column(Text, nullable=True)
+    file_id = Column(Integer, nullable=True)  # omics_raw.id once completed
     created_at = Column(DateTime, default=datetime.utcnow)
-    processed = Column(Integer, default=0)  # 0=not processed, 1=processing, 2=processed
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    chunks = relationship("OmicsUploadChunk", cascade="all, delete-orphan", lazy="selectin")
 
     def __repr__(self):
-        return f"<OmicsRaw(id={self.id}, file_name='{self.file_name}', file_type='{self.file_type}')>" 
\ No newline at end of file
+        return f"<OmicsUploadSession(id='{self.id}', file_name='{self.file_name}', status='{self.status}')>"
+
+class OmicsUploadChunk(Base):
+    """
+    Model for a received chunk of a resumable upload.
+    """
+    __tablename__ = "omics_upload_chunks"
+
+    upload_id = Column(String(36), ForeignKey("omics_upload_sessions.id", ondelete="CASCADE"), primary_key=True)
+    chunk_index = Column(Integer, primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    received_at = Column(DateTime, default=datetime.utcnow)
+
+class OmicsValue(Base):
+    """
+    Model for one measurement of an imported file, indexed by gene and by
+    sample so lookups across all imports never touch the raw payloads.
+    Populated by the import pipeline.
+    """
+    __tablename__ = "omics_values"
+
+    gene = Column(String(255), primary_key=True)
+    file_id = Column(Integer, primary_key=True)  # omics_raw.id
+    sample_id = Column(String(255), primary_key=True)
+    value = Column(Float, nullable=False)
+
+    # The primary key serves gene lookups; these serve sample lookups and reindexing
+    __table_args__ = (
+        Index("ix_omics_values_sample_id_file_id_gene", "sample_id", "file_id", "gene"),
+        Index("ix_omics_values_file_id", "file_id"),
+    )
+
+    def __repr__(self):
+        return f"<OmicsValue(gene='{self.gene}', file_id={self.file_id}, sample_id='{self.sample_id}')>"
+
+class OmicsFileStats(Base):
+    """
+    Model for whole-file summary statistics of an import, computed by the
+    import pipeline.
+    """
+    __tablename__ = "omics_file_stats"
+
+    file_id = Column(Integer, primary_key=True)  # omics_raw.id
+    sample_count = Column(Integer, nullable=False)
+    gene_count = Column(Integer, nullable=False)
+    value_count = Column(BigInteger, nullable=False)  # non-missing cells
+    missing_rate = Column(Float, nullable=True)  # share of sample x gene cells without a value
+    mean = Column(Float, nullable=True)
+    variance = Column(Float, nullable=True)  # sample variance
+    min = Column(Float, nullable=True)
+    max = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class OmicsGeneStats(Base):
+    """
+    Model for the summary statistics of one gene across the samples of an import.
+    """
+    __tablename__ = "omics_gene_stats"
+
+    file_id = Column(Integer, primary_key=True)  # omics_raw.id
+    gene = Column(String(255), primary_key=True)
+    count = Column(Integer, nullable=False)
+    missing_rate = Column(Float, nullable=False)  # share of samples without a value
+    mean = Column(Float, nullable=True)
+    variance = Column(Float, nullable=True)  # sample variance
+    min = Column(Float, nullable=True)
+    max = Column(Float, nullable=True)
+
+class OmicsSampleStats(Base):
+    """
+    Model for the summary statistics of one sample across the genes of an import.
+    """
+    __tablename__ = "omics_sample_stats"
+
+    file_id = Column(Integer, primary_key=True)  # omics_raw.id
+    sample_id = Column(String(255), primary_key=True)
+    count = Column(Integer, nullable=False)
+    missing_rate = Column(Float, nullable=False)  # share of genes without a value
+    total = Column(Float, nullable=False)
+    mean = Column(Float, nullable=True)
+    variance = Column(Float, nullable=True)  # sample variance
+    min = Column(Float, nullable=True)
+    max = Column(Float, nullable=True)
+
+class OmicsFeatureSet(Base):
+    """
+    Model for a versioned omics feature definition: the marker-gene panels,
+    the normalization layer they are scored on and the resulting feature names.
+    """
+    __tablename__ = "omics_feature_sets"
+
+    feature_set = Column(String(64), primary_key=True)  # hash of the definition
+    source_layer = Column(String(255), nullable=False)
+    panels = Column(Text, nullable=False)  # JSON {panel: [genes]}
+    feature_names = Column(Text, nullable=False)  # JSON list, in vector order
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class OmicsPatientFeatures(Base):
+    """
+    Model for the feature vector of one patient in one import, computed by
+    the import pipeline. Scoring jobs read these instead of the omics data.
+    """
+    __tablename__ = "omics_patient_features"
+
+    feature_set = Column(String(64), primary_key=True)  # omics_feature_sets.feature_set
+    patient_id = Column(String(255), primary_key=True)
+    file_id = Column(Integer, primary_key=True)  # omics_raw.id
+    sample_count = Column(Integer, nullable=False)  # samples averaged into the vector
+    features = Column(LargeBinary, nullable=False)  # little-endian float32, NaN if missing
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_omics_patient_features_file_id", "file_id"),
+    )
@@ -0,0 +1,99 @@
+import os
+import logging
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+# On PostgreSQL omics_raw is range-partitioned by month of created_at
+PARTITIONED_TABLE = "omics_raw"
+DEFAULT_PARTITION = f"{PARTITIONED_TABLE}_default"
+
+# Monthly partitions kept ready ahead of the current month
+PARTITION_MONTHS_AHEAD = int(os.getenv("OMICS_RAW_PARTITION_MONTHS_AHEAD", "3"))
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITIONED_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    """True when omics_raw is a partitioned PostgreSQL table."""
+    if conn.dialect.name != "postgresql":
+        return False
+    kind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :name AND relnamespace = 'public'::regnamespace"),
+        {"name": PARTITIONED_TABLE},
+    ).scalar()
+    return kind == "p"
+
+
+def existing_partitions(conn: Connection) -> List[str]:
+    return list(conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :name ORDER BY c.relname"
+    ), {"name": PARTITIONED_TABLE}).scalars())
+
+
+def create_partition(conn: Connection, month: date) -> str:
+    """
+    Create the partition for one month. Rows of that month already sitting in
+    the default partition are moved into it, since PostgreSQL refuses to add
+    a partition whose range overlaps rows in the default one.
+    """
+    name = partition_name(month)
+    bounds = {"start": datetime.combine(month, datetime.min.time()),
+              "end": datetime.combine(add_months(month, 1), datetime.min.time())}
+    stray = conn.execute(
+        text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end"), bounds
+    ).scalar()
+    if stray:
+        conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {PARTITIONED_TABLE} "
+        f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    ))
+    if stray:
+        conn.execute(text(
+            f"INSERT INTO {PARTITIONED_TABLE} SELECT * FROM {DEFAULT_PARTITION} "
+            f"WHERE created_at >= :start AND created_at < :end"
+        ), bounds)
+        conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end"), bounds)
+        conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+        logger.info(f"Moved {stray} rows from {DEFAULT_PARTITION} into {name}")
+    logger.info(f"Created partition {name}")
+    return name
+
+
+def ensure_partitions(conn: Connection, start: Optional[date] = None,
+                      months_ahead: int = PARTITION_MONTHS_AHEAD) -> Tuple[str, ...]:
+    """
+    Make sure monthly partitions exist from start (default: this month) to
+    months_ahead months from now. No-op unless omics_raw is partitioned.
+    Returns the partitions created.
+    """
+    if not is_partitioned(conn):
+        return ()
+    today = month_start(date.today())
+    month = month_start(start) if start else today
+    last = add_months(today, months_ahead)
+    existing = set(existing_partitions(conn))
+    created = []
+    while month <= last:
+        if partition_name(month) not in existing:
+            created.append(create_partition(conn, month))
+        month = add_months(month, 1)
+    return tuple(created)
@@ -1,8 +1,15 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 from .api.import_router import router as import_router
-from .db.database import engine, Base, get_db
+from .api.upload_router import router as upload_router
+from .api.query_router import router as query_router
+from .api.features_router import router as features_router
+from .api.profiles_router import router as profiles_router
+from .db.database import engine, async_engine, Base, pool_metrics
+from .db.partitions import ensure_partitions
+from .utils.parallel_validation import shutdown_process_pool
+from .utils.profiling import ProfilingMiddleware
 
 # Set up logging
 logging.basicConfig(
@@ -27,8 +34,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in sampling profiler (PROFILING_ENABLED); a no-op pass-through otherwise
+app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(import_router, tags=["Import"])
+app.include_router(upload_router, tags=["Uploads"])
+app.include_router(query_router, tags=["Query"])
+app.include_router(features_router, tags=["Features"])
+app.include_router(profiles_router, tags=["Profiling"])
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -38,6 +52,26 @@ async def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "service": "omics-importer"}
 
+@app.get("/health/db-pool", tags=["Health"])
+async def db_pool_metrics():
+    """Connection pool metrics for the async database engine."""
+    return pool_metrics.snapshot()
+
+@app.on_event("startup")
+def create_raw_partitions():
+    """Keep monthly omics_raw partitions ready ahead of time (PostgreSQL only)."""
+    try:
+        with engine.begin() as conn:
+            ensure_partitions(conn)
+    except Exception as e:
+        logger.warning(f"Could not create omics_raw partitions: {e}")
+
+@app.on_event("shutdown")
+async def dispose_engines():
+    """Close pooled database connections and validation workers on shutdown."""
+    await async_engine.dispose()
+    shutdown_process_pool()
+
 @app.get("/", tags=["Root"])
 async def root():
     """Root endpoint with service information."""
@@ -47,6 +81,12 @@ async def root():
         "status": "running",
         "endpoints": {
             "health": "/health",
+            "db_pool": "/health/db-pool",
             "import": "/import",
+            "uploads": "/import/uploads",
+            "genes": "/genes/{gene}/values",
+            "samples": "/samples/{sample_id}/profile",
+            "features": "/features/matrix",
+            "profiles": "/debug/profiles",
         }
     } 
\ No newline at end of file
@@ -17,21 +17,39 @@ class OmicsFile(BaseModel):
     id: int
     file_name: str
     file_type: str
+    content_codec: str
+    raw_size: Optional[int] = None
+    stored_size: Optional[int] = None
+    content_sha256: Optional[str] = None
     sample_count: Optional[int] = None
     gene_count: Optional[int] = None
     created_at: datetime
     processed: int
+    parquet_path: Optional[str] = None
+    archived_at: Optional[datetime] = None  # raw payload moved to cold storage
     
     class Config:
         orm_mode = True
 
+class OmicsFileList(BaseModel):
+    """
+    Schema for a page of stored omics files.
+    """
+    items: List[OmicsFile]
+    next_cursor: Optional[str] = None
+
 class OmicsFileCreate(BaseModel):
     """
     Schema for creating a new omics file record.
     """
     file_name: str
     file_type: str
-    file_content: str
+    file_content: bytes
+    content_codec: str
+    raw_size: int
+    stored_size: int
+    content_sha256: str
+    idempotency_key: Optional[str] = None
     sample_count: Optional[int] = None
     gene_count: Optional[int] = None
 
@@ -43,4 +61,134 @@ class ImportResponse(BaseModel):
     file_id: Optional[int] = None
     file_name: Optional[str] = None
     rows_count: Optional[int] = None
-    message: str 
\ No newline at end of file
+    duplicate: bool = False
+    message: str 
+
+class UploadSessionCreate(BaseModel):
+    """
+    Schema for starting a chunked upload.
+    """
+    file_name: str
+    total_chunks: Optional[int] = Field(None, ge=1)
+
+class UploadSessionComplete(BaseModel):
+    """
+    Schema for completing a chunked upload.
+    """
+    total_chunks: Optional[int] = Field(None, ge=1)
+
+class UploadSessionStatus(BaseModel):
+    """
+    Schema for the state of a chunked upload.
+    """
+    upload_id: str
+    file_name: str
+    status: str
+    total_chunks: Optional[int] = None
+    received_chunks: List[int]
+    missing_chunks: Optional[List[int]] = None
+    validated_chunks: int
+    received_bytes: int
+    error: Optional[str] = None
+    file_id: Optional[int] = None
+
+class GeneValuesQuery(BaseModel):
+    """
+    Schema for a batch lookup of gene measurements across imported files.
+    """
+    genes: List[str] = Field(..., min_length=1, max_length=1000)
+    file_ids: Optional[List[int]] = None
+
+class FileStats(BaseModel):
+    """
+    Schema for whole-file summary statistics.
+    """
+    sample_count: int
+    gene_count: int
+    value_count: int
+    missing_rate: Optional[float] = None
+    mean: Optional[float] = None
+    variance: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class GeneStats(BaseModel):
+    """
+    Schema for the summary statistics of one gene.
+    """
+    gene: str
+    count: int
+    missing_rate: float
+    mean: Optional[float] = None
+    variance: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class SampleStats(BaseModel):
+    """
+    Schema for the summary statistics of one sample.
+    """
+    sample_id: str
+    count: int
+    missing_rate: float
+    total: float
+    mean: Optional[float] = None
+    variance: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class ImportStats(BaseModel):
+    """
+    Schema for the precomputed statistics of an import. Gene statistics are
+    paged by gene name; pass next_gene back as gene_after for the next page.
+    """
+    file_id: int
+    file: FileStats
+    samples: List[SampleStats]
+    genes: List[GeneStats]
+    next_gene: Optional[str] = None
+
+class NormalizationRequest(BaseModel):
+    """
+    Schema for building normalization layers on demand. A layer is a chain
+    of steps joined by "+", e.g. "cpm+log1p" or "quantile". gene_lengths (in
+    bases) is needed for TPM unless GENE_LENGTHS_FILE is configured.
+    """
+    layers: List[str] = Field(..., min_length=1, max_length=20)
+    gene_lengths: Optional[Dict[str, float]] = None
+
+class NormalizationLayers(BaseModel):
+    """
+    Schema for the normalization layers stored for an import.
+    """
+    file_id: int
+    layers: List[str]
+    steps: List[str]
+
+class FeatureSetInfo(BaseModel):
+    """
+    Schema for an omics feature definition and the names of its features, in vector order.
+    """
+    feature_set: str
+    source_layer: str
+    panels: Dict[str, List[str]]
+    feature_names: List[str]
+    current: bool = False
+    created_at: Optional[datetime] = None
+
+class ProfileInfo(BaseModel):
+    """
+    Schema for a stored request profile. dropped_samples were left out to
+    keep the file under PROFILING_MAX_PROFILE_BYTES; truncated profiles hit
+    PROFILING_MAX_SECONDS.
+    """
+    id: str
+    request_id: str
+    label: str
+    trigger: str
+    status: Optional[int] = None
+    started_at: datetime
+    duration_ms: float
+    samples: int
+    dropped_samples: int = 0
+    truncated: bool = False
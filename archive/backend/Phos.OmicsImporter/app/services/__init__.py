@@ -0,0 +1 @@
+# Phos.OmicsImporter.services package
\ No newline at end of file
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import re
+import logging
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import delete, insert, select, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..db.models import OmicsFeatureSet, OmicsPatientFeatures
+from .matrix_store import MatrixArtifact, open_matrix
+from .normalization import layer_name, normalize_matrix, parse_layer
+
+logger = logging.getLogger(__name__)
+
+# Optional JSON file of {"panel": ["GENE", ...]} replacing the default panels
+OMICS_FEATURE_PANELS_FILE = os.getenv("OMICS_FEATURE_PANELS_FILE")
+
+# Normalization layer the panel scores are computed from
+FEATURE_SOURCE_LAYER = os.getenv("FEATURE_SOURCE_LAYER", "cpm+log1p")
+
+# Regex whose first group (or group "patient") is the patient id within a sample id;
+# by default each sample id is the patient id
+OMICS_PATIENT_ID_PATTERN = os.getenv("OMICS_PATIENT_ID_PATTERN")
+
+# Samples read from the source layer per step
+FEATURE_CHUNK_ROWS = int(os.getenv("FEATURE_CHUNK_ROWS", "4096"))
+
+# Marker-gene panels summarised for every patient
+DEFAULT_PANELS: Dict[str, List[str]] = {
+    "inflammation": ["IL6", "TNF", "IL1B", "CXCL8", "CRP", "PTGS2"],
+    "interferon": ["ISG15", "IFI6", "IFI27", "MX1", "OAS1", "RSAD2", "IFIT1"],
+    "proliferation": ["MKI67", "TOP2A", "PCNA", "MCM2", "CCNB1", "BUB1"],
+    "hypoxia": ["VEGFA", "SLC2A1", "PGK1", "LDHA", "CA9", "BNIP3"],
+    "glucocorticoid": ["FKBP5", "NR3C1", "TSC22D3", "PER1", "DDIT4"],
+}
+
+# Features computed per panel, in order
+PANEL_FEATURES = ("score", "coverage")
+
+
+class FeatureSet(NamedTuple):
+    """A versioned feature definition; the id changes whenever the panels or source layer do."""
+    id: str
+    source_layer: str
+    panels: Dict[str, List[str]]
+    feature_names: List[str]
+
+
+class FeatureMatrix(NamedTuple):
+    """Contiguous float32 patient x feature matrix, ready for batch scoring."""
+    feature_set: str
+    feature_names: List[str]
+    patient_ids: List[str]
+    file_ids: List[int]
+    matrix: np.ndarray
+
+
+def load_feature_set(panels: Optional[Dict[str, List[str]]] = None, source_layer: Optional[str] = None) -> FeatureSet:
+    if panels is None:
+        if OMICS_FEATURE_PANELS_FILE:
+            with open(OMICS_FEATURE_PANELS_FILE) as f:
+                panels = json.load(f)
+        else:
+            panels = DEFAULT_PANELS
+    panels = {name: list(dict.fromkeys(genes)) for name, genes in sorted(panels.items())}
+    source_layer = layer_name(parse_layer(source_layer or FEATURE_SOURCE_LAYER))
+    definition = json.dumps({"layer": source_layer, "panels": panels}, sort_keys=True)
+    feature_set_id = "panels-" + hashlib.sha256(definition.encode()).hexdigest()[:16]
+    feature_names = [f"{panel}_{feature}" for panel in panels for feature in PANEL_FEATURES]
+    return FeatureSet(feature_set_id, source_layer, panels, feature_names)
+
+
+def patient_id_for(sample_id: str, pattern: Optional[re.Pattern]) -> str:
+    if pattern is None:
+        return sample_id
+    match = pattern.search(sample_id)
+    if match is None:
+        return sample_id
+    return match.group("patient") if "patient" in pattern.groupindex else match.group(1)
+
+
+def panel_features(matrix: MatrixArtifact, feature_set: FeatureSet) -> np.ndarray:
+    """
+    Return the sample x feature matrix: for each panel, the mean source-layer
+    value of its measured genes (score) and the share of its genes that were
+    measured (coverage). Only panel columns are read from the layer.
+    """
+    n_samples = matrix.shape[0]
+    gene_lookup = {gene: i for i, gene in enumerate(matrix.genes)}
+    panel_cols = [[gene_lookup[gene] for gene in genes if gene in gene_lookup] for genes in feature_set.panels.values()]
+    cols = sorted({col for panel in panel_cols for col in panel})
+    col_position = {col: i for i, col in enumerate(cols)}
+    panel_positions = [np.array([col_position[col] for col in panel], dtype=np.int64) for panel in panel_cols]
+    panel_sizes = [len(genes) for genes in feature_set.panels.values()]
+
+    features = np.full((n_samples, len(feature_set.feature_names)), np.nan, dtype=np.float32)
+    for start in range(0, n_samples, FEATURE_CHUNK_ROWS):
+        rows = range(start, min(start + FEATURE_CHUNK_ROWS, n_samples))
+        block = matrix.read(rows, cols).astype(np.float64) if cols else np.empty((len(rows), 0))
+        for p, (positions, size) in enumerate(zip(panel_positions, panel_sizes)):
+            values = block[:, positions]
+            measured = (~np.isnan(values)).sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                features[start:rows.stop, 2 * p] = np.where(measured > 0, np.nansum(values, axis=1) / measured, np.nan)
+            features[start:rows.stop, 2 * p + 1] = measured / size if size else 0.0
+    return features
+
+
+def extract_features(db: Session, file_id: int, feature_set: Optional[FeatureSet] = None) -> int:
+    """
+    Compute and store the per-patient feature vectors of an imported file.
+    Samples of the same patient are averaged. Builds the source layer if it
+    is missing. The caller commits. Returns the number of patients stored.
+    """
+    feature_set = feature_set or load_feature_set()
+    matrix = open_matrix(file_id, feature_set.source_layer)
+    if matrix is None:
+        normalize_matrix(file_id, [feature_set.source_layer])
+        matrix = MatrixArtifact(file_id, feature_set.source_layer)
+    features = panel_features(matrix, feature_set)
+
+    pattern = re.compile(OMICS_PATIENT_ID_PATTERN) if OMICS_PATIENT_ID_PATTERN else None
+    patient_index: Dict[str, int] = {}
+    patient_of_sample = np.array(
+        [patient_index.setdefault(patient_id_for(sample, pattern), len(patient_index)) for sample in matrix.samples],
+        dtype=np.int64,
+    )
+    n_patients = len(patient_index)
+    sample_counts = np.bincount(patient_of_sample, minlength=n_patients)
+    present = ~np.isnan(features)
+    totals = np.zeros((n_patients, features.shape[1]))
+    counts = np.zeros((n_patients, features.shape[1]))
+    np.add.at(totals, patient_of_sample, np.where(present, features, 0.0))
+    np.add.at(counts, patient_of_sample, present)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        by_patient = np.where(counts > 0, totals / counts, np.nan).astype("<f4")
+
+    ensure_feature_set(db, feature_set)
+    db.execute(delete(OmicsPatientFeatures).where(
+        OmicsPatientFeatures.file_id == file_id, OmicsPatientFeatures.feature_set == feature_set.id
+    ))
+    now = datetime.utcnow()
+    rows = [
+        {
+            "feature_set": feature_set.id,
+            "patient_id": patient_id,
+            "file_id": file_id,
+            "sample_count": int(sample_counts[i]),
+            "features": by_patient[i].tobytes(),
+            "created_at": now,
+        }
+        for patient_id, i in patient_index.items()
+    ]
+    if rows:
+        db.execute(insert(OmicsPatientFeatures), rows)
+    logger.info(f"Stored {len(feature_set.feature_names)} features for {n_patients} patients of file {file_id}")
+    return n_patients
+
+
+def ensure_feature_set(db: Session, feature_set: FeatureSet) -> None:
+    """Store the feature set's definition unless it is already stored."""
+    if db.get(OmicsFeatureSet, feature_set.id) is not None:
+        return
+    try:
+        # In a savepoint, so losing the insert race does not roll back the caller's work
+        with db.begin_nested():
+            db.add(OmicsFeatureSet(
+                feature_set=feature_set.id,
+                source_layer=feature_set.source_layer,
+                panels=json.dumps(feature_set.panels),
+                feature_names=json.dumps(feature_set.feature_names),
+            ))
+    except IntegrityError:
+        # A concurrent pipeline stored the same definition first
+        pass
+
+
+def feature_matrix_query(feature_set: str, patient_ids: Optional[Sequence[str]] = None,
+                         file_ids: Optional[Sequence[int]] = None, latest: bool = True):
+    """
+    Select the stored vectors of a feature set, ordered by patient then file.
+    With latest, only each patient's most recent import is kept.
+    """
+    query = select(
+        OmicsPatientFeatures.patient_id, OmicsPatientFeatures.file_id, OmicsPatientFeatures.features
+    ).where(OmicsPatientFeatures.feature_set == feature_set)
+    if patient_ids is not None:
+        query = query.where(OmicsPatientFeatures.patient_id.in_(patient_ids))
+    if file_ids is not None:
+        query = query.where(OmicsPatientFeatures.file_id.in_(file_ids))
+    if latest:
+        newest = select(
+            OmicsPatientFeatures.patient_id, func.max(OmicsPatientFeatures.file_id).label("file_id")
+        ).where(OmicsPatientFeatures.feature_set == feature_set)
+        if file_ids is not None:
+            newest = newest.where(OmicsPatientFeatures.file_id.in_(file_ids))
+        newest = newest.group_by(OmicsPatientFeatures.patient_id).subquery()
+        query = query.join(newest, (OmicsPatientFeatures.patient_id == newest.c.patient_id)
+                           & (OmicsPatientFeatures.file_id == newest.c.file_id))
+    return query.order_by(OmicsPatientFeatures.patient_id, OmicsPatientFeatures.file_id)
+
+
+def build_feature_matrix(feature_set: str, feature_names: List[str], rows) -> FeatureMatrix:
+    """Pack (patient_id, file_id, features) rows into one preallocated float32 matrix."""
+    rows = list(rows)
+    matrix = np.empty((len(rows), len(feature_names)), dtype=np.float32)
+    for i, row in enumerate(rows):
+        matrix[i] = np.frombuffer(row.features, dtype="<f4")
+    return FeatureMatrix(
+        feature_set, feature_names, [row.patient_id for row in rows], [row.file_id for row in rows], matrix
+    )
@@ -0,0 +1,260 @@
+import json
+import os
+import shutil
+import tempfile
+import logging
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Sample x gene matrices are written here, one directory per imported file
+MATRIX_STORE_DIR = os.getenv("MATRIX_STORE_DIR", os.path.join(tempfile.gettempdir(), "omics-matrices"))
+
+# Matrices at least this dense are stored as a dense float32 array, sparser ones as CSR
+DENSE_MIN_FILL = float(os.getenv("MATRIX_DENSE_MIN_FILL", "0.5"))
+
+FORMAT_DENSE = "dense"
+FORMAT_CSR = "csr"
+
+META_FILE = "meta.json"
+SAMPLES_FILE = "samples.txt"
+GENES_FILE = "genes.txt"
+DENSE_FILE = "matrix.npy"
+CSR_FILES = ("data.npy", "indices.npy", "indptr.npy")
+LAYERS_DIR = "layers"
+
+
+def matrix_dir(file_id: int) -> str:
+    return os.path.join(MATRIX_STORE_DIR, str(file_id))
+
+
+def layer_dir(file_id: int) -> str:
+    """Directory of a matrix's derived (e.g. normalized) dense layers."""
+    return os.path.join(matrix_dir(file_id), LAYERS_DIR)
+
+
+def layer_path(file_id: int, layer: str) -> str:
+    return os.path.join(layer_dir(file_id), f"{layer}.npy")
+
+
+class MatrixBuilder:
+    """
+    Accumulates long-format (sample_id, gene, value) rows into a compact
+    sample x gene matrix. Rows are kept as typed arrays, not Python objects.
+    Values stay float64 until they are written to a float32 artifact.
+    """
+
+    def __init__(self):
+        self.sample_index: Dict[str, int] = {}
+        self.gene_index: Dict[str, int] = {}
+        self._rows = array("i")
+        self._cols = array("i")
+        self._values = array("d")
+        self._sorted: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def add(self, sample_id: str, gene: str, value: float) -> None:
+        row = self.sample_index.setdefault(sample_id, len(self.sample_index))
+        col = self.gene_index.setdefault(gene, len(self.gene_index))
+        self._rows.append(row)
+        self._cols.append(col)
+        self._values.append(value)
+        self._sorted = None
+
+    def add_rows(self, rows: Iterable[Tuple[str, str, float]]) -> "MatrixBuilder":
+        for sample_id, gene, value in rows:
+            self.add(sample_id, gene, value)
+        return self
+
+    def extend(self, other: "MatrixBuilder") -> "MatrixBuilder":
+        """Append the rows of another builder, e.g. one filled from a later byte range."""
+        sample_map = np.array(
+            [self.sample_index.setdefault(name, len(self.sample_index)) for name in other.sample_index], dtype=np.int32
+        )
+        gene_map = np.array(
+            [self.gene_index.setdefault(name, len(self.gene_index)) for name in other.gene_index], dtype=np.int32
+        )
+        if len(other._values):
+            self._rows.frombytes(sample_map[np.frombuffer(other._rows, dtype=np.int32)].tobytes())
+            self._cols.frombytes(gene_map[np.frombuffer(other._cols, dtype=np.int32)].tobytes())
+            self._values.extend(other._values)
+            self._sorted = None
+        return self
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.sample_index), len(self.gene_index)
+
+    def coordinates(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Return row-major sorted (row, col, value) arrays; a repeated cell keeps
+        its last value. Computed once and shared by every artifact writer.
+        """
+        if self._sorted is None:
+            self._sorted = self._sort_coordinates()
+        return self._sorted
+
+    def _sort_coordinates(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows = np.frombuffer(self._rows, dtype=np.int32)
+        cols = np.frombuffer(self._cols, dtype=np.int32)
+        values = np.frombuffer(self._values, dtype=np.float64)
+        order = np.lexsort((cols, rows))
+        rows, cols, values = rows[order], cols[order], values[order]
+        if len(rows):
+            last = np.ones(len(rows), dtype=bool)
+            last[:-1] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+            rows, cols, values = rows[last], cols[last], values[last]
+        return rows, cols, values
+
+    def iter_cells(self) -> Iterator[Tuple[str, str, float]]:
+        """Yield the deduplicated (sample_id, gene, value) cells in row-major order."""
+        samples = list(self.sample_index)
+        genes = list(self.gene_index)
+        rows, cols, values = self.coordinates()
+        for row, col, value in zip(rows.tolist(), cols.tolist(), values.tolist()):
+            yield samples[row], genes[col], value
+
+    def write(self, file_id: int) -> dict:
+        """
+        Write the matrix and its index files, replacing any previous artifact.
+        Dense matrices use NaN for missing cells.
+        """
+        n_samples, n_genes = self.shape
+        rows, cols, values = self.coordinates()
+        nnz = len(values)
+        cells = n_samples * n_genes
+        fmt = FORMAT_DENSE if cells and nnz / cells >= DENSE_MIN_FILL else FORMAT_CSR
+
+        os.makedirs(MATRIX_STORE_DIR, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=MATRIX_STORE_DIR, prefix=f".{file_id}-")
+        try:
+            if fmt == FORMAT_DENSE:
+                matrix = np.lib.format.open_memmap(
+                    os.path.join(staging, DENSE_FILE), mode="w+", dtype=np.float32, shape=(n_samples, n_genes)
+                )
+                matrix[:] = np.nan
+                matrix[rows, cols] = values
+                matrix.flush()
+                del matrix
+            else:
+                indptr = np.zeros(n_samples + 1, dtype=np.int64)
+                np.cumsum(np.bincount(rows, minlength=n_samples), out=indptr[1:])
+                np.save(os.path.join(staging, "data.npy"), values.astype(np.float32))
+                np.save(os.path.join(staging, "indices.npy"), cols)
+                np.save(os.path.join(staging, "indptr.npy"), indptr)
+
+            _write_names(os.path.join(staging, SAMPLES_FILE), self.sample_index)
+            _write_names(os.path.join(staging, GENES_FILE), self.gene_index)
+            meta = {"format": fmt, "shape": [n_samples, n_genes], "nnz": int(nnz), "dtype": "float32"}
+            with open(os.path.join(staging, META_FILE), "w") as f:
+                json.dump(meta, f)
+
+            target = matrix_dir(file_id)
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        logger.info(f"Wrote {fmt} matrix {n_samples}x{n_genes} (nnz={nnz}) for file {file_id}")
+        return meta
+
+
+def _write_names(path: str, index: Dict[str, int]) -> None:
+    # Dict insertion order matches the assigned indices. newline="\n" here and in
+    # _read_names, so a "\r" inside a name is kept rather than read as a line break
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for name in index:
+            f.write(name.replace("\n", " ") + "\n")
+
+
+def _read_names(path: str) -> List[str]:
+    with open(path, encoding="utf-8", newline="\n") as f:
+        return f.read().split("\n")[:-1]
+
+
+class MatrixArtifact:
+    """
+    Read-only, memory-mapped view of a stored sample x gene matrix, or of
+    one of its dense layers. Slicing touches only the pages that back the
+    requested cells.
+    """
+
+    def __init__(self, file_id: int, layer: Optional[str] = None):
+        directory = matrix_dir(file_id)
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.file_id = file_id
+        self.layer = layer
+        self.format = FORMAT_DENSE if layer else self.meta["format"]
+        self.shape = tuple(self.meta["shape"])
+        self.samples = _read_names(os.path.join(directory, SAMPLES_FILE))
+        self.genes = _read_names(os.path.join(directory, GENES_FILE))
+        if layer:
+            self._matrix = np.load(layer_path(file_id, layer), mmap_mode="r")
+        elif self.format == FORMAT_DENSE:
+            self._matrix = np.load(os.path.join(directory, DENSE_FILE), mmap_mode="r")
+        else:
+            self._data, self._indices, self._indptr = (
+                np.load(os.path.join(directory, name), mmap_mode="r") for name in CSR_FILES
+            )
+
+    @classmethod
+    def exists(cls, file_id: int, layer: Optional[str] = None) -> bool:
+        if layer and not os.path.exists(layer_path(file_id, layer)):
+            return False
+        return os.path.exists(os.path.join(matrix_dir(file_id), META_FILE))
+
+    def sample_positions(self, names: Sequence[str]) -> List[int]:
+        return _positions(self.samples, names, "sample")
+
+    def gene_positions(self, names: Sequence[str]) -> List[int]:
+        return _positions(self.genes, names, "gene")
+
+    def read(self, rows: Sequence[int], cols: Sequence[int]) -> np.ndarray:
+        """
+        Return the float32 block for the given row and column positions.
+        Missing cells are NaN.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        if self.format == FORMAT_DENSE:
+            if len(rows) and len(cols) and _is_range(rows) and _is_range(cols):
+                # Contiguous blocks are sliced straight from the memory map
+                return np.array(self._matrix[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1])
+            return np.array(self._matrix[np.ix_(rows, cols)])
+
+        block = np.full((len(rows), len(cols)), np.nan, dtype=np.float32)
+        col_lookup = np.full(self.shape[1], -1, dtype=np.int64)
+        col_lookup[cols] = np.arange(len(cols))
+        for out_row, row in enumerate(rows):
+            start, end = self._indptr[row], self._indptr[row + 1]
+            row_cols = col_lookup[self._indices[start:end]]
+            keep = row_cols >= 0
+            block[out_row, row_cols[keep]] = self._data[start:end][keep]
+        return block
+
+
+def _positions(index: List[str], names: Sequence[str], kind: str) -> List[int]:
+    lookup = {name: i for i, name in enumerate(index)}
+    missing = [name for name in names if name not in lookup]
+    if missing:
+        raise KeyError(f"Unknown {kind}(s): {', '.join(missing[:10])}")
+    return [lookup[name] for name in names]
+
+
+def _is_range(positions: np.ndarray) -> bool:
+    return bool(np.all(np.diff(positions) == 1))
+
+
+def build_matrix(file_id: int, rows: Iterable[Tuple[str, str, float]]) -> dict:
+    """Build and store the matrix artifact for an imported file."""
+    return MatrixBuilder().add_rows(rows).write(file_id)
+
+
+def open_matrix(file_id: int, layer: Optional[str] = None) -> Optional[MatrixArtifact]:
+    """Open a stored matrix or one of its layers, or return None if it has not been built."""
+    if not MatrixArtifact.exists(file_id, layer):
+        return None
+    return MatrixArtifact(file_id, layer)
@@ -0,0 +1,253 @@
+import csv
+import os
+import re
+import shutil
+import tempfile
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .matrix_store import MatrixArtifact, layer_dir, layer_path
+
+logger = logging.getLogger(__name__)
+
+# Normalization layers built for every import, e.g. "cpm+log1p,quantile"
+OMICS_NORMALIZATIONS = os.getenv("OMICS_NORMALIZATIONS", "cpm+log1p")
+
+# Upper bound on working memory per normalization pass, in bytes
+NORMALIZATION_MEMORY_BUDGET = int(os.getenv("NORMALIZATION_MEMORY_BUDGET", str(256 * 1024 * 1024)))
+
+# Optional "gene,length" CSV (lengths in bases) used by TPM
+GENE_LENGTHS_FILE = os.getenv("GENE_LENGTHS_FILE")
+
+# Working bytes per matrix cell: float32 input, float64 work arrays and int64 ranks
+BYTES_PER_CELL = 32
+
+ROW_STEPS = ("cpm", "tpm", "log1p")
+FITTED_STEPS = ("zscore", "quantile")
+STEPS = ROW_STEPS + FITTED_STEPS
+
+
+class NormalizationError(ValueError):
+    """Raised for an unknown step or a step whose inputs are missing."""
+
+
+def parse_layer(layer: str) -> List[str]:
+    """
+    Split a layer name such as "cpm+log1p" into its steps, in order. Steps
+    may also be separated by whitespace, since an unescaped "+" in a query
+    string decodes to a space.
+    """
+    steps = [step.lower() for step in re.split(r"[+\s]+", layer) if step]
+    if not steps:
+        raise NormalizationError("Empty normalization layer")
+    unknown = [step for step in steps if step not in STEPS]
+    if unknown:
+        raise NormalizationError(f"Unknown normalization step(s): {', '.join(unknown)}")
+    return steps
+
+
+def layer_name(steps: Sequence[str]) -> str:
+    return "+".join(steps)
+
+
+def load_gene_lengths(path: str) -> Dict[str, float]:
+    """Read a "gene,length" CSV of gene lengths in bases."""
+    lengths = {}
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 2:
+                continue
+            try:
+                lengths[row[0]] = float(row[1])
+            except ValueError:
+                continue  # header or malformed line
+    return lengths
+
+
+def rows_per_chunk(n_genes: int) -> int:
+    return max(1, NORMALIZATION_MEMORY_BUDGET // max(1, n_genes * BYTES_PER_CELL))
+
+
+def iter_chunks(matrix: MatrixArtifact, transform: Callable[[np.ndarray], np.ndarray]):
+    """Yield (row_start, transformed float64 block) over the matrix in bounded row chunks."""
+    n_samples, n_genes = matrix.shape
+    step = rows_per_chunk(n_genes)
+    cols = range(n_genes)
+    for start in range(0, n_samples, step):
+        block = matrix.read(range(start, min(start + step, n_samples)), cols).astype(np.float64)
+        yield start, transform(block)
+
+
+def _per_million(block: np.ndarray) -> np.ndarray:
+    totals = np.nansum(block, axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(totals > 0, block / totals * 1e6, np.nan)
+
+
+class ColumnMoments:
+    """Per-gene mean and standard deviation, merged chunk by chunk (Chan et al.)."""
+
+    def __init__(self, n_genes: int):
+        self.count = np.zeros(n_genes)
+        self.mean = np.zeros(n_genes)
+        self.m2 = np.zeros(n_genes)
+
+    def update(self, block: np.ndarray) -> None:
+        present = ~np.isnan(block)
+        chunk_count = present.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            chunk_mean = np.where(chunk_count > 0, np.nansum(block, axis=0) / chunk_count, 0.0)
+        chunk_m2 = np.nansum((block - chunk_mean) ** 2, axis=0)
+        count = self.count + chunk_count
+        delta = chunk_mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(count > 0, chunk_count / count, 0.0)
+        self.mean += delta * weight
+        self.m2 += chunk_m2 + delta ** 2 * self.count * weight
+        self.count = count
+
+    def std(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.sqrt(np.where(self.count > 1, self.m2 / (self.count - 1), np.nan))
+
+
+def _quantile_grid(values: np.ndarray, size: int) -> np.ndarray:
+    """Resample sorted values onto a grid of size evenly spaced quantiles."""
+    if len(values) == size:
+        return values
+    return np.interp(np.linspace(0, 1, size), np.linspace(0, 1, len(values)), values)
+
+
+def _quantile_row(row: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """Map a sample's values onto the reference distribution; tied values share the mean of their ranks."""
+    out = np.full(row.shape, np.nan)
+    present = np.flatnonzero(~np.isnan(row))
+    if len(present) == 0:
+        return out
+    values = row[present]
+    order = np.argsort(values, kind="stable")
+    targets = _quantile_grid(reference, len(values))
+    _, inverse, counts = np.unique(values[order], return_inverse=True, return_counts=True)
+    tied_means = np.bincount(inverse, weights=targets) / counts
+    out[present[order]] = tied_means[inverse]
+    return out
+
+
+class Normalizer:
+    """
+    Applies a chain of steps to a stored matrix. Row steps (cpm, tpm, log1p)
+    work on each chunk of samples alone. Fitted steps need a pass over the
+    whole matrix first: zscore learns each gene's mean and standard
+    deviation, quantile learns the mean sorted distribution across samples.
+    A chain with k fitted steps reads the matrix k + 1 times, one bounded
+    chunk at a time.
+    """
+
+    def __init__(self, matrix: MatrixArtifact, steps: Sequence[str], gene_lengths: Optional[Dict[str, float]] = None):
+        self.matrix = matrix
+        self.steps = list(steps)
+        self._lengths_kb = None
+        if "tpm" in self.steps:
+            if not gene_lengths:
+                raise NormalizationError("TPM needs gene lengths")
+            self._lengths_kb = np.array([gene_lengths.get(gene, np.nan) for gene in matrix.genes]) / 1000.0
+        self._fitted: List[Tuple[str, object]] = []
+
+    def _apply(self, block: np.ndarray) -> np.ndarray:
+        for step, state in self._fitted:
+            if step == "cpm":
+                block = _per_million(block)
+            elif step == "tpm":
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    block = _per_million(block / self._lengths_kb)
+            elif step == "log1p":
+                with np.errstate(invalid="ignore"):
+                    block = np.log1p(block)
+            elif step == "zscore":
+                mean, std = state
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    block = np.where(std > 0, (block - mean) / std, 0.0)
+                    block[np.isnan(block - mean)] = np.nan
+            elif step == "quantile":
+                block = np.vstack([_quantile_row(row, state) for row in block]) if len(block) else block
+        return block
+
+    def _fit(self, step: str):
+        n_genes = self.matrix.shape[1]
+        if step == "zscore":
+            moments = ColumnMoments(n_genes)
+            for _, block in iter_chunks(self.matrix, self._apply):
+                moments.update(block)
+            return moments.mean, moments.std()
+        if step == "quantile":
+            total = np.zeros(n_genes)
+            rows = 0
+            for _, block in iter_chunks(self.matrix, self._apply):
+                for row in block:
+                    values = np.sort(row[~np.isnan(row)])
+                    if len(values):
+                        total += _quantile_grid(values, n_genes)
+                        rows += 1
+            return total / rows if rows else total
+        return None
+
+    def run(self, out: np.ndarray) -> None:
+        """Fit the chain, then write the normalized matrix into out (e.g. a memmap)."""
+        for step in self.steps:
+            self._fitted.append((step, self._fit(step)))
+        for start, block in iter_chunks(self.matrix, self._apply):
+            out[start:start + len(block)] = block
+        if hasattr(out, "flush"):
+            out.flush()
+
+
+def normalize_matrix(file_id: int, layers: Sequence[str], gene_lengths: Optional[Dict[str, float]] = None) -> List[str]:
+    """
+    Build the given normalization layers for a stored matrix, each as a
+    dense float32 .npy beside it; missing cells stay NaN. Returns the
+    layers written. TPM layers are skipped when no gene lengths are known.
+    """
+    if gene_lengths is None and GENE_LENGTHS_FILE:
+        gene_lengths = load_gene_lengths(GENE_LENGTHS_FILE)
+    matrix = MatrixArtifact(file_id)
+    os.makedirs(layer_dir(file_id), exist_ok=True)
+    written = []
+    for layer in layers:
+        steps = parse_layer(layer)
+        name = layer_name(steps)
+        if "tpm" in steps and not gene_lengths:
+            logger.warning(f"Skipping layer {name} for file {file_id}: no gene lengths configured")
+            continue
+        target = layer_path(file_id, name)
+        # A unique staging file, so concurrent builds of the same layer never share one
+        fd, staging = tempfile.mkstemp(dir=layer_dir(file_id), prefix=f".{name}-", suffix=".tmp")
+        os.close(fd)
+        try:
+            out = np.lib.format.open_memmap(staging, mode="w+", dtype=np.float32, shape=matrix.shape)
+            Normalizer(matrix, steps, gene_lengths).run(out)
+            del out
+            os.replace(staging, target)
+        except BaseException:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+        written.append(name)
+        logger.info(f"Wrote normalization layer {name} for file {file_id}")
+    return written
+
+
+def list_layers(file_id: int) -> List[str]:
+    directory = layer_dir(file_id)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[:-4] for name in os.listdir(directory) if name.endswith(".npy"))
+
+
+def configured_layers() -> List[str]:
+    return [layer for layer in OMICS_NORMALIZATIONS.split(",") if layer.strip()]
+
+
+def remove_layers(file_id: int) -> None:
+    shutil.rmtree(layer_dir(file_id), ignore_errors=True)
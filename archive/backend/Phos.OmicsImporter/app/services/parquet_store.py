@@ -0,0 +1,125 @@
+import os
+import tempfile
+import logging
+from typing import Iterator, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from .matrix_store import MatrixBuilder
+
+logger = logging.getLogger(__name__)
+
+# Root of the Parquet dataset: a local directory or a filesystem URI (file://, s3://, gs://)
+PARQUET_STORE_URI = os.getenv("PARQUET_STORE_URI", os.path.join(tempfile.gettempdir(), "omics-parquet"))
+
+# Rows per Parquet row group; row group statistics drive predicate pushdown
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "1000000"))
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
+
+PARQUET_FILE = "data.parquet"
+
+SCHEMA = pa.schema([
+    ("sample_id", pa.dictionary(pa.int32(), pa.string())),
+    ("gene", pa.dictionary(pa.int32(), pa.string())),
+    ("value", pa.float32()),
+])
+
+
+def get_filesystem() -> Tuple[pafs.FileSystem, str]:
+    """Resolve PARQUET_STORE_URI to a filesystem and the dataset root within it."""
+    if "://" in PARQUET_STORE_URI:
+        return pafs.FileSystem.from_uri(PARQUET_STORE_URI)
+    return pafs.LocalFileSystem(), os.path.abspath(PARQUET_STORE_URI)
+
+
+def parquet_path(file_id: int) -> str:
+    """Path of a file's partition, relative to the dataset root (Hive layout)."""
+    return f"file_id={file_id}/{PARQUET_FILE}"
+
+
+def build_table(builder: MatrixBuilder) -> pa.Table:
+    """
+    Convert the deduplicated cells of a matrix into a dictionary-encoded
+    table, sorted by sample_id then gene so row group statistics are tight.
+    """
+    rows, cols, values = builder.coordinates()
+    samples = np.array(list(builder.sample_index), dtype=object)
+    genes = np.array(list(builder.gene_index), dtype=object)
+
+    # Re-number the dictionaries in sorted order, then sort the cells by those codes
+    sample_order = np.argsort(samples, kind="stable")
+    gene_order = np.argsort(genes, kind="stable")
+    sample_codes = np.empty(len(samples), dtype=np.int32)
+    sample_codes[sample_order] = np.arange(len(samples), dtype=np.int32)
+    gene_codes = np.empty(len(genes), dtype=np.int32)
+    gene_codes[gene_order] = np.arange(len(genes), dtype=np.int32)
+    row_codes = sample_codes[rows]
+    col_codes = gene_codes[cols]
+    order = np.lexsort((col_codes, row_codes))
+
+    return pa.Table.from_arrays(
+        [
+            pa.DictionaryArray.from_arrays(row_codes[order], pa.array(samples[sample_order], pa.string())),
+            pa.DictionaryArray.from_arrays(col_codes[order], pa.array(genes[gene_order], pa.string())),
+            pa.array(values[order].astype(np.float32), pa.float32()),
+        ],
+        schema=SCHEMA,
+    )
+
+
+def write_parquet(file_id: int, builder: MatrixBuilder) -> str:
+    """
+    Write an imported file's partition of the dataset, replacing any previous
+    one. Returns the partition path relative to the dataset root.
+    """
+    table = build_table(builder)
+    filesystem, root = get_filesystem()
+    relative = parquet_path(file_id)
+    partition = f"{root}/file_id={file_id}"
+    target = f"{root}/{relative}"
+    # Dot-prefixed files are skipped by dataset discovery while being written
+    staging = f"{partition}/.{PARQUET_FILE}.{os.getpid()}.tmp"
+    filesystem.create_dir(partition, recursive=True)
+    try:
+        pq.write_table(
+            table,
+            staging,
+            filesystem=filesystem,
+            row_group_size=PARQUET_ROW_GROUP_SIZE,
+            compression=PARQUET_COMPRESSION,
+            use_dictionary=["sample_id", "gene"],
+            write_statistics=True,
+        )
+        filesystem.move(staging, target)
+    except BaseException:
+        try:
+            filesystem.delete_file(staging)
+        except (FileNotFoundError, OSError):
+            pass
+        raise
+    logger.info(f"Wrote Parquet partition {relative} ({table.num_rows} rows) for file {file_id}")
+    return relative
+
+
+def open_dataset() -> ds.Dataset:
+    """
+    Open the dataset of every processed import. file_id is a Hive partition
+    key, so filtering on it prunes whole files before any data is read.
+    """
+    filesystem, root = get_filesystem()
+    return ds.dataset(root, filesystem=filesystem, format="parquet", partitioning="hive")
+
+
+def iter_parquet_bytes(relative: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """Yield a stored partition file in byte chunks."""
+    filesystem, root = get_filesystem()
+    with filesystem.open_input_stream(f"{root}/{relative}") as stream:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
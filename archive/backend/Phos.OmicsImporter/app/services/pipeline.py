@@ -0,0 +1,86 @@
+import argparse
+import logging
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.orm import defer
+from ..db.database import SessionLocal
+from ..db.models import OmicsRaw, PROCESSING, PROCESSED, PROCESSING_FAILED
+from ..utils.file_utils import iter_omics_rows
+from ..utils.timing import StageTimer
+from .features import extract_features
+from .matrix_store import MatrixBuilder
+from .normalization import configured_layers, normalize_matrix
+from .parquet_store import write_parquet
+from .stats import compute_stats, write_stats
+from .value_index import index_values
+
+logger = logging.getLogger(__name__)
+
+
+def run_import_pipeline(file_id: int, force: bool = False, builder: Optional[MatrixBuilder] = None) -> None:
+    """
+    Build the derived artifacts for a newly imported file and mark it processed.
+    Runs after the import response is sent, in the threadpool, on the sync engine.
+    The importer passes the rows it collected while validating as builder; the
+    stored payload is parsed only when they are not available. With force, an
+    already processed file is rebuilt, including its OMICS_NORMALIZATIONS
+    layers; layers built on demand are dropped.
+    """
+    db = SessionLocal()
+    try:
+        # The payload is loaded only if it has to be parsed
+        db_file = db.get(OmicsRaw, file_id, options=[defer(OmicsRaw.file_content)])
+        if db_file is None or (db_file.processed == PROCESSED and not force):
+            return
+        db_file.processed = PROCESSING
+        db.commit()
+
+        timer = StageTimer()
+        if builder is None:
+            with timer.stage("parse"), db_file.open_content() as stream:
+                builder = MatrixBuilder().add_rows(iter_omics_rows(stream, db_file.file_type))
+        with timer.stage("matrix"):
+            builder.write(file_id)
+        with timer.stage("normalize"):
+            normalize_matrix(file_id, configured_layers())
+        with timer.stage("parquet"):
+            db_file.parquet_path = write_parquet(file_id, builder)
+        with timer.stage("index"):
+            index_values(db, file_id, builder.iter_cells())
+        with timer.stage("stats"):
+            write_stats(db, file_id, compute_stats(builder))
+        with timer.stage("features"):
+            extract_features(db, file_id)
+
+        db_file.processed = PROCESSED
+        with timer.stage("commit"):
+            db.commit()
+        logger.info(f"Processed file {file_id}: {timer.summary()}", extra={"file_id": file_id, "timings": dict(timer.stages)})
+    except Exception:
+        logger.exception(f"Error processing imported file {file_id}")
+        db.rollback()
+        db_file = db.get(OmicsRaw, file_id)
+        if db_file is not None:
+            db_file.processed = PROCESSING_FAILED
+            db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild derived artifacts for imported files")
+    parser.add_argument("file_ids", nargs="*", type=int, help="files to rebuild")
+    parser.add_argument("--all", action="store_true", help="rebuild every imported file")
+    args = parser.parse_args()
+
+    file_ids = args.file_ids
+    if args.all:
+        with SessionLocal() as db:
+            file_ids = db.scalars(select(OmicsRaw.id).order_by(OmicsRaw.id)).all()
+    for file_id in file_ids:
+        run_import_pipeline(file_id, force=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
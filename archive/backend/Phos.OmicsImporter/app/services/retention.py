@@ -0,0 +1,199 @@
+import argparse
+import os
+import shutil
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import pyarrow.fs as pafs
+from sqlalchemy import delete, exists, select, text
+from sqlalchemy.orm import Session, aliased
+
+from ..db.database import SessionLocal, engine
+from ..db.models import (
+    OmicsRaw, OmicsImportKey, OmicsValue, OmicsFileStats, OmicsGeneStats, OmicsSampleStats,
+    OmicsPatientFeatures, OmicsUploadSession, PROCESSED,
+)
+from ..db.partitions import ensure_partitions
+from ..utils.cold_storage import ColdStorageNotConfiguredError, payload_path, require_cold_storage, write_payload
+from ..utils.compression import CODEC_IDENTITY, STORAGE_CODEC, compress
+from ..utils.upload_spool import remove_upload
+from .features import load_feature_set
+from .matrix_store import MATRIX_STORE_DIR
+from .parquet_store import get_filesystem as get_parquet_filesystem
+
+logger = logging.getLogger(__name__)
+
+# Processed payloads older than this are moved to cold storage
+RAW_RETENTION_DAYS = int(os.getenv("OMICS_RAW_RETENTION_DAYS", "90"))
+
+# Payloads archived per run
+ARCHIVE_BATCH_SIZE = int(os.getenv("OMICS_ARCHIVE_BATCH_SIZE", "500"))
+
+# Finished or abandoned upload sessions older than this are removed with their spooled chunks
+UPLOAD_SESSION_RETENTION_DAYS = int(os.getenv("UPLOAD_SESSION_RETENTION_DAYS", "7"))
+
+# Tables whose rows are derived from an omics_raw row and keyed by its id
+DERIVED_TABLES = (OmicsValue, OmicsFileStats, OmicsGeneStats, OmicsSampleStats, OmicsPatientFeatures, OmicsImportKey)
+
+
+def archive_payloads(db: Session, older_than: datetime, limit: int = ARCHIVE_BATCH_SIZE, dry_run: bool = False) -> int:
+    """
+    Move the payloads of processed files created before older_than to cold
+    storage, oldest first, leaving the metadata row with a pointer.
+    Uncompressed payloads are compressed on the way. Each file is committed
+    on its own, so an interrupted run loses nothing. Refuses to run unless
+    COLD_STORAGE_URI is set, since the archive then holds the only copy.
+    """
+    require_cold_storage()
+    ids = db.scalars(
+        select(OmicsRaw.id)
+        .where(OmicsRaw.processed == PROCESSED, OmicsRaw.file_content.is_not(None), OmicsRaw.created_at < older_than)
+        .order_by(OmicsRaw.created_at, OmicsRaw.id)
+        .limit(limit)
+    ).all()
+    if dry_run:
+        logger.info(f"Would archive {len(ids)} payloads created before {older_than.isoformat()}")
+        return len(ids)
+
+    archived = 0
+    for file_id in ids:
+        db_file = db.get(OmicsRaw, file_id)
+        payload, codec = db_file.file_content, db_file.content_codec
+        if codec == CODEC_IDENTITY:
+            payload, codec = compress(payload, STORAGE_CODEC), STORAGE_CODEC
+        relative = payload_path(file_id, db_file.created_at.year, db_file.created_at.month, codec)
+        db_file.payload_uri = write_payload(relative, payload)
+        db_file.content_codec = codec
+        db_file.stored_size = len(payload)
+        db_file.file_content = None
+        db_file.archived_at = datetime.utcnow()
+        db.commit()
+        db.expunge(db_file)
+        archived += 1
+    logger.info(f"Archived {archived} payloads created before {older_than.isoformat()}")
+    return archived
+
+
+def compact_derived(db: Session, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Delete derived rows that no longer serve a purpose: rows of files that
+    are gone from omics_raw, and patient features superseded by a vector of
+    the current feature set for the same patient and file.
+    """
+    removed = {}
+    for model in DERIVED_TABLES:
+        orphaned = ~exists().where(OmicsRaw.id == model.file_id)
+        if dry_run:
+            removed[model.__tablename__] = db.scalar(select(text("count(*)")).select_from(model).where(orphaned))
+        else:
+            removed[model.__tablename__] = db.execute(
+                delete(model).where(orphaned).execution_options(synchronize_session=False)
+            ).rowcount
+
+    current = load_feature_set().id
+    newer = aliased(OmicsPatientFeatures)
+    superseded = (OmicsPatientFeatures.feature_set != current) & exists().where(
+        newer.feature_set == current,
+        newer.patient_id == OmicsPatientFeatures.patient_id,
+        newer.file_id == OmicsPatientFeatures.file_id,
+    )
+    if dry_run:
+        removed["superseded_features"] = db.scalar(
+            select(text("count(*)")).select_from(OmicsPatientFeatures).where(superseded)
+        )
+    else:
+        removed["superseded_features"] = db.execute(
+            delete(OmicsPatientFeatures).where(superseded).execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+    logger.info(f"Compaction {'would remove' if dry_run else 'removed'}: {removed}")
+    return removed
+
+
+def remove_orphaned_artifacts(db: Session, dry_run: bool = False) -> List[int]:
+    """Remove matrix directories and Parquet partitions of files that are gone from omics_raw."""
+    stored = set()
+    if os.path.isdir(MATRIX_STORE_DIR):
+        stored.update(int(name) for name in os.listdir(MATRIX_STORE_DIR) if name.isdigit())
+    filesystem, root = get_parquet_filesystem()
+    partitions = filesystem.get_file_info(pafs.FileSelector(root, allow_not_found=True))
+    stored.update(
+        int(info.base_name.split("=", 1)[1]) for info in partitions
+        if info.type == pafs.FileType.Directory and info.base_name.startswith("file_id=")
+    )
+    if not stored:
+        return []
+    known = set(db.scalars(select(OmicsRaw.id).where(OmicsRaw.id.in_(stored))).all())
+    orphaned = sorted(stored - known)
+    if not dry_run:
+        for file_id in orphaned:
+            shutil.rmtree(os.path.join(MATRIX_STORE_DIR, str(file_id)), ignore_errors=True)
+            try:
+                filesystem.delete_dir(f"{root}/file_id={file_id}")
+            except (FileNotFoundError, OSError):
+                pass
+    logger.info(f"{'Would remove' if dry_run else 'Removed'} {len(orphaned)} orphaned matrix artifacts")
+    return orphaned
+
+
+def expire_upload_sessions(db: Session, older_than: datetime, dry_run: bool = False) -> int:
+    """Delete upload sessions untouched since older_than, with their spooled chunks."""
+    upload_ids = db.scalars(select(OmicsUploadSession.id).where(OmicsUploadSession.updated_at < older_than)).all()
+    if not dry_run:
+        for upload_id in upload_ids:
+            remove_upload(upload_id)
+        if upload_ids:
+            db.execute(delete(OmicsUploadSession).where(OmicsUploadSession.id.in_(upload_ids)))
+            db.commit()
+    logger.info(f"{'Would expire' if dry_run else 'Expired'} {len(upload_ids)} upload sessions")
+    return len(upload_ids)
+
+
+def vacuum(tables: List[str]) -> None:
+    """Reclaim space freed by archiving and compaction. PostgreSQL only."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in tables:
+            conn.execute(text(f"VACUUM (ANALYZE) {table}"))
+    logger.info(f"Vacuumed {', '.join(tables)}")
+
+
+def run_retention(retention_days: int = RAW_RETENTION_DAYS, limit: int = ARCHIVE_BATCH_SIZE,
+                  dry_run: bool = False, run_vacuum: bool = False, now: Optional[datetime] = None) -> dict:
+    """Run every maintenance step: partitions, archiving, compaction and upload expiry."""
+    require_cold_storage()
+    now = now or datetime.utcnow()
+    with engine.begin() as conn:
+        created = [] if dry_run else list(ensure_partitions(conn))
+    with SessionLocal() as db:
+        summary = {
+            "partitions_created": created,
+            "archived": archive_payloads(db, now - timedelta(days=retention_days), limit, dry_run),
+            "compacted": compact_derived(db, dry_run),
+            "orphaned_artifacts": len(remove_orphaned_artifacts(db, dry_run)),
+            "expired_uploads": expire_upload_sessions(db, now - timedelta(days=UPLOAD_SESSION_RETENTION_DAYS), dry_run),
+        }
+    if run_vacuum and not dry_run:
+        vacuum([OmicsRaw.__tablename__] + [model.__tablename__ for model in DERIVED_TABLES])
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old raw payloads and compact derived tables")
+    parser.add_argument("--retention-days", type=int, default=RAW_RETENTION_DAYS,
+                        help="archive processed payloads older than this")
+    parser.add_argument("--limit", type=int, default=ARCHIVE_BATCH_SIZE, help="payloads archived per run")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM (ANALYZE) the tables afterwards (PostgreSQL)")
+    args = parser.parse_args()
+    try:
+        print(run_retention(args.retention_days, args.limit, args.dry_run, args.vacuum))
+    except ColdStorageNotConfiguredError as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,160 @@
+import os
+import logging
+from typing import NamedTuple
+import numpy as np
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+from ..db.models import OmicsFileStats, OmicsGeneStats, OmicsSampleStats
+from .matrix_store import MatrixBuilder
+
+logger = logging.getLogger(__name__)
+
+# Cells folded into the running statistics per step
+STATS_CHUNK_SIZE = int(os.getenv("STATS_CHUNK_SIZE", "1000000"))
+
+# Rows inserted per executemany batch
+STATS_BATCH_SIZE = 5000
+
+
+class RunningStats:
+    """
+    Per-group count, mean, M2, sum, min and max, updated a chunk at a time.
+    Each chunk's moments are merged into the running ones with the pairwise
+    form of Welford's algorithm (Chan et al.), which stays numerically stable
+    without a second pass over the data.
+    """
+
+    def __init__(self, groups: int):
+        self.count = np.zeros(groups, dtype=np.int64)
+        self.mean = np.zeros(groups, dtype=np.float64)
+        self.m2 = np.zeros(groups, dtype=np.float64)
+        self.total = np.zeros(groups, dtype=np.float64)
+        self.min = np.full(groups, np.inf, dtype=np.float64)
+        self.max = np.full(groups, -np.inf, dtype=np.float64)
+
+    def update(self, groups: np.ndarray, values: np.ndarray) -> None:
+        size = len(self.count)
+        values = values.astype(np.float64, copy=False)
+        chunk_count = np.bincount(groups, minlength=size)
+        chunk_total = np.bincount(groups, weights=values, minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            chunk_mean = np.where(chunk_count > 0, chunk_total / chunk_count, 0.0)
+        chunk_m2 = np.bincount(groups, weights=(values - chunk_mean[groups]) ** 2, minlength=size)
+
+        count = self.count + chunk_count
+        delta = chunk_mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(count > 0, chunk_count / count, 0.0)
+        self.mean += delta * weight
+        self.m2 += chunk_m2 + delta ** 2 * self.count * weight
+        self.count = count
+        self.total += chunk_total
+        np.minimum.at(self.min, groups, values)
+        np.maximum.at(self.max, groups, values)
+
+    def variance(self) -> np.ndarray:
+        """Sample variance (n - 1); NaN for groups with fewer than two values."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+
+class ImportStats(NamedTuple):
+    samples: list
+    genes: list
+    by_sample: RunningStats
+    by_gene: RunningStats
+    overall: RunningStats
+
+
+def compute_stats(builder: MatrixBuilder) -> ImportStats:
+    """
+    Compute per-gene, per-sample and whole-file statistics in one pass over
+    the deduplicated cells of an import, at the float64 precision they were
+    imported with (not the float32 of the matrix). NaN values count as missing.
+    """
+    n_samples, n_genes = builder.shape
+    rows, cols, values = builder.coordinates()
+    by_sample = RunningStats(n_samples)
+    by_gene = RunningStats(n_genes)
+    overall = RunningStats(1)
+    for start in range(0, len(values), STATS_CHUNK_SIZE):
+        chunk = slice(start, start + STATS_CHUNK_SIZE)
+        present = ~np.isnan(values[chunk])
+        chunk_rows, chunk_cols, chunk_values = rows[chunk][present], cols[chunk][present], values[chunk][present]
+        by_sample.update(chunk_rows, chunk_values)
+        by_gene.update(chunk_cols, chunk_values)
+        overall.update(np.zeros(len(chunk_values), dtype=np.int64), chunk_values)
+    return ImportStats(list(builder.sample_index), list(builder.gene_index), by_sample, by_gene, overall)
+
+
+def _value(array: np.ndarray, i: int):
+    value = float(array[i])
+    return value if np.isfinite(value) else None
+
+
+def _insert_batches(db: Session, model, rows) -> None:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= STATS_BATCH_SIZE:
+            db.execute(insert(model), batch)
+            batch = []
+    if batch:
+        db.execute(insert(model), batch)
+
+
+def write_stats(db: Session, file_id: int, stats: ImportStats) -> None:
+    """
+    Replace the stored statistics of an imported file. The caller commits,
+    so they become visible together with the file's processed state.
+    """
+    for model in (OmicsFileStats, OmicsGeneStats, OmicsSampleStats):
+        db.execute(delete(model).where(model.file_id == file_id))
+
+    n_samples, n_genes = len(stats.samples), len(stats.genes)
+    overall = stats.overall
+    overall_variance = overall.variance()
+    cells = n_samples * n_genes
+    db.add(OmicsFileStats(
+        file_id=file_id,
+        sample_count=n_samples,
+        gene_count=n_genes,
+        value_count=int(overall.count[0]),
+        missing_rate=1 - int(overall.count[0]) / cells if cells else None,
+        mean=_value(overall.mean, 0) if overall.count[0] else None,
+        variance=_value(overall_variance, 0),
+        min=_value(overall.min, 0),
+        max=_value(overall.max, 0)
+    ))
+
+    by_gene, gene_variance = stats.by_gene, stats.by_gene.variance()
+    _insert_batches(db, OmicsGeneStats, (
+        {
+            "file_id": file_id,
+            "gene": gene,
+            "count": int(by_gene.count[i]),
+            "missing_rate": 1 - int(by_gene.count[i]) / n_samples,
+            "mean": _value(by_gene.mean, i) if by_gene.count[i] else None,
+            "variance": _value(gene_variance, i),
+            "min": _value(by_gene.min, i),
+            "max": _value(by_gene.max, i),
+        }
+        for i, gene in enumerate(stats.genes)
+    ))
+
+    by_sample, sample_variance = stats.by_sample, stats.by_sample.variance()
+    _insert_batches(db, OmicsSampleStats, (
+        {
+            "file_id": file_id,
+            "sample_id": sample_id,
+            "count": int(by_sample.count[i]),
+            "missing_rate": 1 - int(by_sample.count[i]) / n_genes,
+            "total": float(by_sample.total[i]),
+            "mean": _value(by_sample.mean, i) if by_sample.count[i] else None,
+            "variance": _value(sample_variance, i),
+            "min": _value(by_sample.min, i),
+            "max": _value(by_sample.max, i),
+        }
+        for i, sample_id in enumerate(stats.samples)
+    ))
+    logger.info(f"Stored statistics for {n_genes} genes and {n_samples} samples of file {file_id}")
@@ -0,0 +1,36 @@
+import math
+import os
+import logging
+from itertools import islice
+from typing import Iterable, Tuple
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+from ..db.models import OmicsValue
+
+logger = logging.getLogger(__name__)
+
+# Rows inserted per executemany batch
+VALUE_INDEX_BATCH_SIZE = int(os.getenv("VALUE_INDEX_BATCH_SIZE", "5000"))
+
+
+def index_values(db: Session, file_id: int, cells: Iterable[Tuple[str, str, float]]) -> int:
+    """
+    Replace the gene/sample index rows of an imported file. Cells must be
+    unique per (sample_id, gene); NaN values are missing and not indexed.
+    The caller commits, so the rows become visible together with the file's
+    processed state.
+    """
+    db.execute(delete(OmicsValue).where(OmicsValue.file_id == file_id))
+    cells = (cell for cell in cells if not math.isnan(cell[2]))
+    count = 0
+    while True:
+        batch = [
+            {"gene": gene, "file_id": file_id, "sample_id": sample_id, "value": value}
+            for sample_id, gene, value in islice(cells, VALUE_INDEX_BATCH_SIZE)
+        ]
+        if not batch:
+            break
+        db.execute(insert(OmicsValue), batch)
+        count += len(batch)
+    logger.info(f"Indexed {count} values for file {file_id}")
+    return count
@@ -0,0 +1,80 @@
+import os
+import logging
+from typing import Tuple
+
+import pyarrow.fs as pafs
+
+logger = logging.getLogger(__name__)
+
+# Archived raw payloads: a local directory or a filesystem URI (file://, s3://, gs://). No default:
+# an archived payload exists only here, so this must be durable storage, never a temporary directory
+COLD_STORAGE_URI = os.getenv("COLD_STORAGE_URI")
+
+# Extensions of archived payloads, by content codec
+CODEC_EXTENSIONS = {"gzip": "gz", "zstd": "zst", "identity": "bin"}
+
+
+class ColdStorageNotConfiguredError(Exception):
+    """Raised when payloads would be archived or read without COLD_STORAGE_URI."""
+
+
+def require_cold_storage() -> str:
+    """Return COLD_STORAGE_URI, or raise if it is not set."""
+    if not COLD_STORAGE_URI:
+        raise ColdStorageNotConfiguredError(
+            "COLD_STORAGE_URI is not set; point it at durable storage before archiving payloads"
+        )
+    return COLD_STORAGE_URI
+
+
+def get_filesystem() -> Tuple[pafs.FileSystem, str]:
+    """Resolve COLD_STORAGE_URI to a filesystem and the archive root within it."""
+    require_cold_storage()
+    if "://" in COLD_STORAGE_URI:
+        return pafs.FileSystem.from_uri(COLD_STORAGE_URI)
+    return pafs.LocalFileSystem(), os.path.abspath(COLD_STORAGE_URI)
+
+
+def payload_path(file_id: int, created_year: int, created_month: int, codec: str) -> str:
+    """Path of an archived payload, relative to the archive root."""
+    return f"raw/{created_year:04d}/{created_month:02d}/{file_id}.{CODEC_EXTENSIONS.get(codec, 'bin')}"
+
+
+def write_payload(relative: str, data: bytes) -> str:
+    """
+    Write an archived payload and read back its size. Returns the path
+    recorded in OmicsRaw.payload_uri.
+    """
+    filesystem, root = get_filesystem()
+    target = f"{root}/{relative}"
+    directory, name = target.rsplit("/", 1)
+    staging = f"{directory}/.{name}.{os.getpid()}.tmp"
+    filesystem.create_dir(directory, recursive=True)
+    try:
+        with filesystem.open_output_stream(staging, compression=None) as stream:
+            stream.write(data)
+        filesystem.move(staging, target)
+    except BaseException:
+        try:
+            filesystem.delete_file(staging)
+        except (FileNotFoundError, OSError):
+            pass
+        raise
+    if filesystem.get_file_info(target).size != len(data):
+        raise IOError(f"Archived payload {relative} has the wrong size")
+    return relative
+
+
+def read_payload(relative: str) -> bytes:
+    # compression=None: payloads are returned as stored, whatever their extension
+    filesystem, root = get_filesystem()
+    with filesystem.open_input_stream(f"{root}/{relative}", compression=None) as stream:
+        return stream.read()
+
+
+def delete_payload(relative: str) -> None:
+    filesystem, root = get_filesystem()
+    try:
+        filesystem.delete_file(f"{root}/{relative}")
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,104 @@
+import gzip
+import io
+import os
+import zlib
+import logging
+from typing import BinaryIO, Iterable, Iterator, TextIO
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Codecs recorded in OmicsRaw.content_codec
+CODEC_IDENTITY = "identity"
+CODEC_GZIP = "gzip"
+CODEC_ZSTD = "zstd"
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def _default_codec() -> str:
+    codec = os.getenv("OMICS_STORAGE_CODEC", CODEC_ZSTD if zstandard else CODEC_GZIP).lower()
+    if codec == CODEC_ZSTD and zstandard is None:
+        logger.warning("zstandard is not installed, falling back to gzip for raw payloads")
+        return CODEC_GZIP
+    return codec
+
+
+# Codec used for uploads that arrive uncompressed
+STORAGE_CODEC = _default_codec()
+
+# Compression levels favour fast writes; raw payloads are read rarely
+GZIP_LEVEL = int(os.getenv("OMICS_GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.getenv("OMICS_ZSTD_LEVEL", "3"))
+
+
+def compress(data: bytes, codec: str = STORAGE_CODEC) -> bytes:
+    """Compress a raw payload with the given codec."""
+    if codec == CODEC_IDENTITY:
+        return data
+    if codec == CODEC_GZIP:
+        # mtime=0 keeps the output deterministic for identical payloads
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("zstd codec requested but zstandard is not installed")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    raise ValueError(f"Unsupported codec: {codec}")
+
+
+def compress_chunks(chunks: Iterable[bytes], codec: str = STORAGE_CODEC) -> bytes:
+    """Compress a payload that is produced in chunks without joining it first."""
+    if codec == CODEC_IDENTITY:
+        return b"".join(chunks)
+    if codec == CODEC_GZIP:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    elif codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("zstd codec requested but zstandard is not installed")
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    else:
+        raise ValueError(f"Unsupported codec: {codec}")
+    output = [compressor.compress(chunk) for chunk in chunks]
+    output.append(compressor.flush())
+    return b"".join(output)
+
+
+def open_decompressed(data: bytes, codec: str) -> BinaryIO:
+    """Return a binary stream that decompresses the stored payload lazily."""
+    buffer = io.BytesIO(data)
+    if codec == CODEC_IDENTITY:
+        return buffer
+    if codec == CODEC_GZIP:
+        return gzip.GzipFile(fileobj=buffer, mode="rb")
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("zstd codec requested but zstandard is not installed")
+        return zstandard.ZstdDecompressor().stream_reader(buffer)
+    raise ValueError(f"Unsupported codec: {codec}")
+
+
+def open_text(data: bytes, codec: str, encoding: str = "utf-8") -> TextIO:
+    """Return a text stream over the decompressed payload."""
+    return io.TextIOWrapper(open_decompressed(data, codec), encoding=encoding, newline="")
+
+
+def iter_decompressed(data: bytes, codec: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the decompressed payload in chunks of at most chunk_size bytes."""
+    with open_decompressed(data, codec) as stream:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    """Decompress a whole payload into memory."""
+    if codec == CODEC_IDENTITY:
+        return data
+    with open_decompressed(data, codec) as stream:
+        return stream.read()
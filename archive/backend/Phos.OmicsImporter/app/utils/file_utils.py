@@ -1,43 +1,75 @@
 import os
-import csv
-import json
-import io
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Iterator, TextIO, BinaryIO, Union
 import logging
+from .compression import CODEC_GZIP
+from .inspector import INSPECT_CHUNK_SIZE, UploadStream, create_inspector, inspect_text
 
 logger = logging.getLogger(__name__)
 
+SUPPORTED_FILE_TYPES = ["csv", "json", "ndjson"]
+
+# Compressed upload suffixes and the codec they are stored with
+COMPRESSED_EXTENSIONS = {"gz": CODEC_GZIP}
+
 def get_file_extension(filename: str) -> str:
     """Extract file extension from filename."""
     return filename.split(".")[-1].lower()
 
+def split_file_name(filename: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a filename into its data file type and upload compression codec.
+    e.g. "data.csv" -> ("csv", None), "data.csv.gz" -> ("csv", "gzip")
+    """
+    parts = filename.lower().split(".")
+    codec = COMPRESSED_EXTENSIONS.get(parts[-1]) if len(parts) > 2 else None
+    if codec:
+        parts = parts[:-1]
+    return parts[-1], codec
+
 def is_valid_file_type(filename: str) -> bool:
     """Check if file type is supported."""
-    extension = get_file_extension(filename)
-    return extension in ["csv", "json"]
+    file_type, _ = split_file_name(filename)
+    return file_type in SUPPORTED_FILE_TYPES
+
+def extract_sample_ids(content: str, file_type: str) -> Optional[List[str]]:
+    """
+    Extract unique sample IDs from CSV or JSON content in one pass. Every
+    row that has a sample_id counts, whether or not it is a valid data row.
+    Returns None if a CSV file has no sample_id column or the file cannot
+    be parsed.
+    """
+    result = inspect_text(content, file_type, max_malformed=None, sample_ids_only=True)
+    if result.error is not None:
+        logger.error(f"Error extracting sample IDs from {file_type.upper()}: {result.error}")
+        return None
+    return sorted(result.sample_ids)
 
 def extract_sample_ids_from_csv(content: str) -> Optional[List[str]]:
     """Extract unique sample IDs from CSV content."""
-    try:
-        reader = csv.DictReader(io.StringIO(content))
-        if "sample_id" not in reader.fieldnames:
-            return None
-        return list(set(row["sample_id"] for row in reader))
-    except Exception as e:
-        logger.error(f"Error extracting sample IDs from CSV: {e}")
-        return None
+    return extract_sample_ids(content, "csv")
 
 def extract_sample_ids_from_json(content: str) -> Optional[List[str]]:
     """Extract unique sample IDs from JSON content."""
-    try:
-        data = json.loads(content)
-        if not isinstance(data, list):
-            return None
-        sample_ids = set()
-        for item in data:
-            if "sample_id" in item:
-                sample_ids.add(item["sample_id"])
-        return list(sample_ids)
-    except Exception as e:
-        logger.error(f"Error extracting sample IDs from JSON: {e}")
-        return None 
\ No newline at end of file
+    return extract_sample_ids(content, "json")
+
+def iter_omics_rows(stream: Union[BinaryIO, TextIO], file_type: str, codec: Optional[str] = None) -> Iterator[Tuple[str, str, float]]:
+    """
+    Yield (sample_id, gene, value) from a CSV or JSON stream as it is parsed.
+    Binary streams may be gzip-compressed. Raises ValueError on a malformed row.
+    """
+    rows: List[Tuple[str, str, float]] = []
+    collect = lambda sample_id, gene, value: rows.append((sample_id, gene, value))
+    chunk = stream.read(INSPECT_CHUNK_SIZE)
+    if isinstance(chunk, str):
+        consumer = create_inspector(file_type, on_row=collect, max_malformed=1)
+    else:
+        consumer = UploadStream(file_type, codec, on_row=collect, max_malformed=1)
+    while chunk and not consumer.failed:
+        consumer.feed(chunk)
+        yield from rows
+        rows.clear()
+        chunk = stream.read(INSPECT_CHUNK_SIZE)
+    result = consumer.finish()
+    yield from rows
+    if not result.is_valid:
+        raise ValueError(result.error_message)
@@ -0,0 +1,589 @@
+import codecs
+import csv
+import hashlib
+import io
+import json
+import math
+import re
+import zlib
+import logging
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, TextIO, Tuple, Union
+from ..schemas.schemas import OmicsDataRow
+from .compression import CODEC_GZIP
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ("sample_id", "gene", "value")
+
+# Malformed rows recorded by a full inspection before it stops
+MAX_MALFORMED_ROWS = 100
+
+# Longest single element of a JSON array; a data object is far smaller, so anything longer is malformed
+MAX_JSON_ITEM_CHARS = 1024 * 1024
+
+# Bytes read from paths and streams at a time
+INSPECT_CHUNK_SIZE = 1024 * 1024
+
+# Called with (sample_id, gene, value) for every valid row, in file order
+RowSink = Callable[[str, str, float], None]
+
+
+class InspectionResult:
+    """
+    What one pass over an omics file found: headers, valid row count,
+    distinct samples and genes, value range and malformed row positions.
+    A structural problem (bad header, broken JSON, bad encoding) is in error.
+    """
+
+    def __init__(self):
+        self.headers: Optional[List[str]] = None
+        self.row_count = 0
+        self.sample_ids = set()
+        self.genes = set()
+        self.value_min: Optional[float] = None
+        self.value_max: Optional[float] = None
+        self.malformed_rows: List[Tuple[int, str]] = []  # (1-based data row, message)
+        self.error: Optional[str] = None
+
+    @property
+    def rows_seen(self) -> int:
+        return self.row_count + len(self.malformed_rows)
+
+    @property
+    def is_valid(self) -> bool:
+        return self.error is None and not self.malformed_rows and self.row_count > 0
+
+    @property
+    def error_message(self) -> str:
+        if self.error is not None:
+            return self.error
+        if self.malformed_rows:
+            row, message = self.malformed_rows[0]
+            return f"Row {row}: {message}"
+        if self.row_count == 0:
+            return "File contains no data rows"
+        return ""
+
+    def validation_result(self) -> tuple[bool, str, int, int]:
+        """Return (is_valid, error_message, sample_count, gene_count)."""
+        if not self.is_valid:
+            return False, self.error_message, 0, 0
+        return True, "", len(self.sample_ids), len(self.genes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "headers": self.headers,
+            "row_count": self.row_count,
+            "sample_count": len(self.sample_ids),
+            "gene_count": len(self.genes),
+            "value_min": self.value_min,
+            "value_max": self.value_max,
+            "malformed_rows": [{"row": row, "message": message} for row, message in self.malformed_rows],
+            "error": self.error,
+        }
+
+
+class OmicsInspector:
+    """
+    Incremental, single-pass inspector for an omics payload. feed() accepts
+    decoded text split anywhere; finish() returns the InspectionResult.
+    Every valid row is passed to on_row, so consumers such as the matrix
+    builder share the parse instead of re-reading the file. Inspection stops
+    after max_malformed malformed rows (None for never); validation uses 1
+    to fail fast. With sample_ids_only, rows are not validated and the
+    sample_id of every row that has one is collected.
+    """
+
+    def __init__(
+        self,
+        on_row: Optional[RowSink] = None,
+        max_malformed: Optional[int] = MAX_MALFORMED_ROWS,
+        sample_ids_only: bool = False
+    ):
+        self.result = InspectionResult()
+        self.on_row = on_row
+        self.max_malformed = max_malformed
+        self.sample_ids_only = sample_ids_only
+        self.fields = ("sample_id",) if sample_ids_only else REQUIRED_FIELDS
+
+    @property
+    def failed(self) -> bool:
+        return self.result.error is not None or (
+            self.max_malformed is not None and len(self.result.malformed_rows) >= self.max_malformed
+        )
+
+    @property
+    def error(self) -> Optional[str]:
+        return self.result.error_message if self.failed else None
+
+    def fail(self, message: str) -> None:
+        if self.result.error is None:
+            self.result.error = message
+
+    def feed(self, text: str) -> None:
+        raise NotImplementedError
+
+    def finish(self) -> InspectionResult:
+        raise NotImplementedError
+
+    def add_fields(self, sample_id: Any, gene: Any, value: Any) -> None:
+        """Validate and record one row given as separate fields."""
+        try:
+            row = OmicsDataRow(sample_id=sample_id, gene=gene, value=float(value))
+        except (TypeError, ValueError) as e:
+            self._malformed(str(e))
+            return
+        self._accept(row)
+
+    def add_item(self, item: Any) -> None:
+        """Validate and record one row given as a JSON object."""
+        if self.sample_ids_only:
+            sample_id = item.get("sample_id") if isinstance(item, dict) else None
+            if isinstance(sample_id, (str, int, float)):
+                self.result.sample_ids.add(str(sample_id))
+            return
+        try:
+            row = OmicsDataRow(**item)
+        except Exception as e:
+            self._malformed(str(e))
+            return
+        self._accept(row)
+
+    def _accept(self, row: OmicsDataRow) -> None:
+        result = self.result
+        result.row_count += 1
+        result.sample_ids.add(row.sample_id)
+        result.genes.add(row.gene)
+        value = row.value
+        if not math.isnan(value):
+            if result.value_min is None or value < result.value_min:
+                result.value_min = value
+            if result.value_max is None or value > result.value_max:
+                result.value_max = value
+        if self.on_row is not None:
+            self.on_row(row.sample_id, row.gene, value)
+
+    def _malformed(self, message: str) -> None:
+        self.result.malformed_rows.append((self.result.rows_seen + 1, message))
+
+
+class CsvInspector(OmicsInspector):
+    """
+    Inspects CSV rows as complete lines become available. headers may be
+    given for a payload that starts after the header row.
+    """
+
+    def __init__(self, headers: Optional[List[str]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._index: Dict[str, int] = {}
+        self._width = 0
+        self._pending = ""
+        if headers is not None:
+            self._set_headers(headers)
+
+    def feed(self, text: str) -> None:
+        if self.failed:
+            return
+        data = self._pending + text
+        end = data.rfind("\n") + 1
+        if data.count('"', 0, end) % 2:
+            # The last complete line ends inside a quoted field; hold it back
+            end = _unquoted_line_end(data, end)
+        self._pending = data[end:]
+        if end:
+            self._process(data[:end])
+
+    def finish(self) -> InspectionResult:
+        if not self.failed and self._pending:
+            self._process(self._pending)
+            self._pending = ""
+        if not self.failed and self.result.headers is None:
+            self.fail("Error parsing CSV: file is empty")
+        return self.result
+
+    def _set_headers(self, headers: List[str]) -> None:
+        self.result.headers = headers
+        missing = [name for name in self.fields if name not in headers]
+        if missing:
+            self.fail(f"Missing required columns: {', '.join(missing)}")
+            return
+        self._index = {name: headers.index(name) for name in self.fields}
+        self._width = max(self._index.values()) + 1
+
+    def _process(self, text: str) -> None:
+        try:
+            for row in csv.reader(io.StringIO(text, newline="")):
+                if not row:
+                    continue
+                if self.result.headers is None:
+                    self._set_headers(row)
+                elif len(row) < self._width:
+                    self._malformed("row has fewer columns than the header")
+                else:
+                    index = self._index
+                    if self.sample_ids_only:
+                        self.result.sample_ids.add(row[index["sample_id"]])
+                    else:
+                        self.add_fields(row[index["sample_id"]], row[index["gene"]], row[index["value"]])
+                if self.failed:
+                    return
+        except csv.Error as e:
+            self.fail(f"Error parsing CSV: {str(e)}")
+
+
+def _unquoted_line_end(data: str, end: int) -> int:
+    """Return the last line boundary before end that is outside a quoted CSV field."""
+    safe = 0
+    quoted = False
+    pos = 0
+    while pos < end:
+        newline = data.index("\n", pos) + 1
+        quoted ^= data.count('"', pos, newline) % 2 == 1
+        if not quoted:
+            safe = newline
+        pos = newline
+    return safe
+
+
+# Tokens the JSON element scanner stops at
+_JSON_NON_WHITESPACE = re.compile(r"[^ \t\r\n]")
+_JSON_STRUCTURE = re.compile(r'["\[\]{}]')
+_JSON_STRING_SPECIAL = re.compile(r'["\\]')
+_JSON_SCALAR_END = re.compile(r"[ \t\r\n,\]]")
+
+
+class JsonInspector(OmicsInspector):
+    """
+    Inspects the elements of a top-level JSON array as each one completes.
+    Elements are decoded straight from the fed text. One that fails to
+    decode is scanned for its closing bracket or quote: if it is complete it
+    is malformed and inspection fails at once, otherwise its text is kept
+    and only newly fed text is scanned until it ends. Each character is
+    scanned or decoded a bounded number of times, so the work is linear.
+    """
+
+    # What the next non-whitespace character must be
+    EXPECT_OPEN, EXPECT_FIRST, EXPECT_VALUE, EXPECT_SEPARATOR, EXPECT_END = range(5)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._decoder = json.JSONDecoder()
+        self._expect = self.EXPECT_OPEN
+        # State of the element being scanned; _parts holds its text from earlier feeds
+        self._in_item = False
+        self._parts: List[str] = []
+        self._item_size = 0
+        self._scalar = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text: str) -> None:
+        if self.failed:
+            return
+        self._consume(text)
+
+    def finish(self) -> InspectionResult:
+        if not self.failed and self._in_item and self._scalar:
+            # A bare value at the very end has no delimiter after it
+            self._decode_item("")
+        if not self.failed and self._expect != self.EXPECT_END:
+            self.fail("Invalid JSON format: unexpected end of data")
+        return self.result
+
+    def _consume(self, text: str) -> None:
+        pos = 0
+        length = len(text)
+        while True:
+            if self._in_item:
+                end = self._scan(text, pos)
+                if end < 0:
+                    self._item_size += length - pos
+                    if self._item_size > MAX_JSON_ITEM_CHARS:
+                        self.fail(f"Invalid JSON format: array element longer than {MAX_JSON_ITEM_CHARS} characters")
+                        return
+                    self._parts.append(text[pos:])
+                    return
+                self._decode_item(text[pos:end])
+                if self.failed:
+                    return
+                pos = end
+                continue
+
+            if pos >= length or text[pos] in " \t\r\n":
+                match = _JSON_NON_WHITESPACE.search(text, pos)
+                if match is None:
+                    return
+                pos = match.start()
+            char = text[pos]
+            if self._expect == self.EXPECT_END:
+                self.fail("Invalid JSON format: extra data after the top-level array")
+                return
+            if self._expect == self.EXPECT_OPEN:
+                if char != "[":
+                    self.fail("JSON file must contain a list of data objects")
+                    return
+                self._expect = self.EXPECT_FIRST
+                pos += 1
+            elif self._expect == self.EXPECT_SEPARATOR:
+                if char == ",":
+                    self._expect = self.EXPECT_VALUE
+                elif char == "]":
+                    self._expect = self.EXPECT_END
+                else:
+                    self.fail(f"Invalid JSON format: expected ',' or ']' after array element {self.result.rows_seen}")
+                    return
+                pos += 1
+            elif char == "]":
+                if self._expect == self.EXPECT_VALUE:
+                    self.fail("Invalid JSON format: trailing comma before ']'")
+                    return
+                self._expect = self.EXPECT_END
+                pos += 1
+            elif char == ",":
+                self.fail("Invalid JSON format: expected a value before ','")
+                return
+            else:
+                pos = self._decode_at(text, pos, char)
+                if self.failed:
+                    return
+
+    def _decode_at(self, text: str, pos: int, char: str) -> int:
+        """Decode the element starting at pos, returning the offset after it; start scanning it if it may be incomplete."""
+        try:
+            item, end = self._decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            pass
+        else:
+            # A number or literal is only complete once a delimiter follows; it may continue in the next feed
+            if char in "[{\"" or _JSON_SCALAR_END.match(text, end):
+                self._add_decoded(item)
+                return end
+        self._start_item(char)
+        return pos
+
+    def _start_item(self, char: str) -> None:
+        self._in_item = True
+        self._parts = []
+        self._item_size = 0
+        self._scalar = char not in "[{\""
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def _scan(self, text: str, pos: int) -> int:
+        """Return the offset just past the end of the current element in text, or -1 if it continues."""
+        if self._scalar:
+            match = _JSON_SCALAR_END.search(text, pos)
+            return match.start() if match else -1
+        length = len(text)
+        while True:
+            if self._escape:
+                if pos >= length:
+                    return -1
+                pos += 1
+                self._escape = False
+            if self._in_string:
+                match = _JSON_STRING_SPECIAL.search(text, pos)
+                if match is None:
+                    return -1
+                pos = match.end()
+                if match.group() == "\\":
+                    self._escape = True
+                    continue
+                self._in_string = False
+                if self._depth == 0:
+                    return pos
+                continue
+            match = _JSON_STRUCTURE.search(text, pos)
+            if match is None:
+                return -1
+            pos = match.end()
+            char = match.group()
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth <= 0:
+                    return pos
+
+    def _decode_item(self, tail: str) -> None:
+        self._parts.append(tail)
+        text = "".join(self._parts)
+        self._in_item = False
+        self._parts = []
+        try:
+            item = self._decoder.decode(text)
+        except json.JSONDecodeError as e:
+            self.fail(f"Invalid JSON format: {str(e)} in array element {self.result.rows_seen + 1}")
+            return
+        self._add_decoded(item)
+
+    def _add_decoded(self, item: Any) -> None:
+        self._expect = self.EXPECT_SEPARATOR
+        if self.result.headers is None and isinstance(item, dict):
+            self.result.headers = list(item)
+        self.add_item(item)
+
+
+class NdjsonInspector(OmicsInspector):
+    """
+    Inspects newline-delimited JSON, one object per line. A line that is not
+    valid JSON is a malformed row rather than a broken file.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._pending = ""
+
+    def feed(self, text: str) -> None:
+        if self.failed:
+            return
+        data = self._pending + text
+        end = data.rfind("\n") + 1
+        self._pending = data[end:]
+        if end:
+            self._process(data[:end])
+
+    def finish(self) -> InspectionResult:
+        if not self.failed and self._pending:
+            self._process(self._pending)
+            self._pending = ""
+        return self.result
+
+    def _process(self, text: str) -> None:
+        for line in text.split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                self._malformed(f"Invalid JSON: {str(e)}")
+            else:
+                if self.result.headers is None and isinstance(item, dict):
+                    self.result.headers = list(item)
+                self.add_item(item)
+            if self.failed:
+                return
+
+
+def create_inspector(file_type: str, **kwargs) -> OmicsInspector:
+    """Return the inspector for a supported file type."""
+    if file_type == "csv":
+        return CsvInspector(**kwargs)
+    if file_type == "json":
+        return JsonInspector(**kwargs)
+    if file_type == "ndjson":
+        return NdjsonInspector(**kwargs)
+    raise ValueError(f"Unsupported file type: {file_type}")
+
+
+class UploadStream:
+    """
+    Consumes a payload in order as raw bytes, decompressing, hashing and
+    inspecting it incrementally. Used for whole uploads, for the received
+    prefix of a chunked upload, and for files on disk.
+    """
+
+    def __init__(self, file_type: str, upload_codec: Optional[str] = None, **kwargs):
+        self.inspector = create_inspector(file_type, **kwargs)
+        self.upload_codec = upload_codec
+        self.raw_size = 0
+        self._hasher = hashlib.sha256()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if upload_codec == CODEC_GZIP else None
+
+    @property
+    def failed(self) -> bool:
+        return self.inspector.failed
+
+    @property
+    def error(self) -> Optional[str]:
+        return self.inspector.error
+
+    @property
+    def sha256(self) -> str:
+        return self._hasher.hexdigest()
+
+    def feed(self, data: bytes) -> None:
+        if self.failed:
+            return
+        if self._decompressor is not None:
+            try:
+                data = self._decompressor.decompress(data)
+            except zlib.error:
+                self.inspector.fail("File is not valid gzip data")
+                return
+        self._consume(data, final=False)
+
+    def finish(self) -> InspectionResult:
+        if self._decompressor is not None and not self.failed:
+            if not self._decompressor.eof:
+                self.inspector.fail("File is not valid gzip data")
+            else:
+                self._consume(self._decompressor.flush(), final=True)
+        elif not self.failed:
+            self._consume(b"", final=True)
+        return self.inspector.finish()
+
+    def _consume(self, data: bytes, final: bool) -> None:
+        self._hasher.update(data)
+        self.raw_size += len(data)
+        try:
+            text = self._text_decoder.decode(data, final=final)
+        except UnicodeDecodeError as e:
+            self.inspector.fail(f"File is not valid UTF-8: {str(e)}")
+            return
+        self.inspector.feed(text)
+
+
+def inspect_text(content: str, file_type: str, **kwargs) -> InspectionResult:
+    """Inspect an in-memory text payload."""
+    inspector = create_inspector(file_type, **kwargs)
+    inspector.feed(content)
+    return inspector.finish()
+
+
+def inspect_bytes(data: bytes, file_type: str, codec: Optional[str] = None, **kwargs) -> InspectionResult:
+    """Inspect an in-memory payload, optionally gzip-compressed."""
+    stream = UploadStream(file_type, codec, **kwargs)
+    for start in range(0, len(data), INSPECT_CHUNK_SIZE):
+        stream.feed(data[start:start + INSPECT_CHUNK_SIZE])
+        if stream.failed:
+            break
+    return stream.finish()
+
+
+def inspect_stream(
+    stream: Union[BinaryIO, TextIO],
+    file_type: str,
+    codec: Optional[str] = None,
+    **kwargs
+) -> InspectionResult:
+    """Inspect a binary (optionally gzip-compressed) or text stream, reading it in chunks."""
+    first = stream.read(INSPECT_CHUNK_SIZE)
+    if isinstance(first, str):
+        inspector = create_inspector(file_type, **kwargs)
+        chunk = first
+        while chunk and not inspector.failed:
+            inspector.feed(chunk)
+            chunk = stream.read(INSPECT_CHUNK_SIZE)
+        return inspector.finish()
+    upload = UploadStream(file_type, codec, **kwargs)
+    chunk = first
+    while chunk and not upload.failed:
+        upload.feed(chunk)
+        chunk = stream.read(INSPECT_CHUNK_SIZE)
+    return upload.finish()
+
+
+def inspect_path(path: str, file_type: Optional[str] = None, **kwargs) -> InspectionResult:
+    """Inspect a file on disk; the type and gzip compression follow its name by default."""
+    from .file_utils import split_file_name
+    name_type, codec = split_file_name(path)
+    with open(path, "rb") as f:
+        return inspect_stream(f, file_type or name_type, codec, **kwargs)
+
@@ -0,0 +1,248 @@
+import csv
+import json
+import os
+import threading
+import multiprocessing
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+from .inspector import REQUIRED_FIELDS, CsvInspector, InspectionResult, JsonInspector, NdjsonInspector
+
+logger = logging.getLogger(__name__)
+
+# Worker processes used to validate large uploads
+PARALLEL_VALIDATION_WORKERS = int(os.getenv("PARALLEL_VALIDATION_WORKERS", str(os.cpu_count() or 1)))
+
+# Payloads smaller than this are validated in the calling thread
+PARALLEL_VALIDATION_MIN_SIZE = int(os.getenv("PARALLEL_VALIDATION_MIN_SIZE", str(8 * 1024 * 1024)))
+
+# Ranges per worker; more than one keeps the workers busy when ranges finish unevenly
+RANGES_PER_WORKER = 4
+MIN_RANGE_SIZE = 1024 * 1024
+
+# Bytes of a JSON payload inspected to decide whether it holds one object per line
+JSON_PROBE_SIZE = 64 * 1024
+
+class RangeResult(NamedTuple):
+    """Inspection result for one byte range of a payload."""
+    inspection: InspectionResult
+    builder: Any  # filled by row_builder, if one was given
+    splittable: bool = True  # False when the range cannot be validated in isolation
+    trailing_comma: bool = False  # JSON only: the range's last object ends with a comma
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Return the shared validation pool, starting it on first use. Workers are
+    spawned rather than forked, since the server process runs threads.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PARALLEL_VALIDATION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_process_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def split_ranges(data: bytes, start: int, end: int, count: int) -> List[Tuple[int, int]]:
+    """
+    Split data[start:end] into about count ranges that end at line
+    boundaries. A boundary inside a quoted CSV field (an odd number of
+    quote characters since the previous boundary) is moved to a later line.
+    """
+    target = max(MIN_RANGE_SIZE, (end - start) // max(count, 1) + 1)
+    ranges = []
+    position = start
+    while position < end:
+        cut = min(position + target, end)
+        while cut < end:
+            newline = data.find(b"\n", cut, end)
+            if newline < 0:
+                cut = end
+                break
+            cut = newline + 1
+            if data.count(b'"', position, cut) % 2 == 0:
+                break
+        ranges.append((position, cut))
+        position = cut
+    return ranges
+
+
+def validate_csv_range(chunk: bytes, headers: List[str], row_builder: Optional[Callable] = None) -> RangeResult:
+    """Inspect the CSV data rows in one range. Runs in a worker process."""
+    builder = row_builder() if row_builder else None
+    inspector = CsvInspector(headers=headers, on_row=builder.add if builder else None, max_malformed=1)
+    try:
+        inspector.feed(chunk.decode("utf-8"))
+    except UnicodeDecodeError:
+        return RangeResult(inspector.result, builder, splittable=False)
+    result = inspector.finish()
+    # Let the sequential validator report parse errors with its usual message
+    return RangeResult(result, builder, splittable=result.error is None)
+
+
+def validate_json_range(chunk: bytes, row_builder: Optional[Callable] = None) -> RangeResult:
+    """
+    Inspect one range of a top-level JSON array laid out with one object
+    per line. Runs in a worker process.
+    """
+    builder = row_builder() if row_builder else None
+    inspector = JsonInspector(on_row=builder.add if builder else None, max_malformed=1)
+    trailing_comma = False
+    try:
+        for line in chunk.decode("utf-8").split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            if inspector.result.rows_seen and not trailing_comma:
+                # Objects must be comma separated
+                return RangeResult(inspector.result, builder, splittable=False)
+            trailing_comma = line.endswith(",")
+            item = json.loads(line[:-1] if trailing_comma else line)
+            if not isinstance(item, dict):
+                return RangeResult(inspector.result, builder, splittable=False)
+            inspector.add_item(item)
+            if inspector.failed:
+                break
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return RangeResult(inspector.result, builder, splittable=False)
+    return RangeResult(inspector.result, builder, trailing_comma=trailing_comma)
+
+
+def validate_ndjson_range(chunk: bytes, row_builder: Optional[Callable] = None) -> RangeResult:
+    """Inspect the lines of one NDJSON range. Runs in a worker process."""
+    builder = row_builder() if row_builder else None
+    inspector = NdjsonInspector(on_row=builder.add if builder else None, max_malformed=1)
+    try:
+        inspector.feed(chunk.decode("utf-8"))
+    except UnicodeDecodeError:
+        return RangeResult(inspector.result, builder, splittable=False)
+    return RangeResult(inspector.finish(), builder)
+
+
+def merge_results(results: List[RangeResult]) -> Tuple[tuple[bool, str, int, int], Any]:
+    """
+    Merge range results in file order. The first malformed row wins and its
+    row number is made global by adding the rows of the ranges before it.
+    Returns the validation tuple and the merged row builder.
+    """
+    sample_ids = set()
+    genes = set()
+    rows_before = 0
+    for result in results:
+        inspection = result.inspection
+        if inspection.malformed_rows:
+            row, message = inspection.malformed_rows[0]
+            return (False, f"Row {rows_before + row}: {message}", 0, 0), None
+        sample_ids |= inspection.sample_ids
+        genes |= inspection.genes
+        rows_before += inspection.rows_seen
+    if rows_before == 0:
+        return (False, "File contains no data rows", 0, 0), None
+
+    builder = None
+    for result in results:
+        if result.builder is not None:
+            builder = result.builder if builder is None else builder.extend(result.builder)
+    return (True, "", len(sample_ids), len(genes)), builder
+
+
+def _csv_headers(data: bytes) -> Tuple[Optional[List[str]], int]:
+    """Return the header row, if it has the required columns, and the offset of the first data row."""
+    header_end = data.find(b"\n")
+    header_end = len(data) if header_end < 0 else header_end + 1
+    try:
+        header = next(csv.reader([data[:header_end].decode("utf-8")]), [])
+    except (csv.Error, UnicodeDecodeError):
+        return None, header_end
+    if not set(REQUIRED_FIELDS).issubset(header):
+        return None, header_end
+    return header, header_end
+
+
+def _json_body(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Return the byte range between the brackets of a top-level array, if the
+    array appears to hold one object per line.
+    """
+    # Strip surrounding whitespace without copying the whole payload
+    head = data[:JSON_PROBE_SIZE]
+    tail = data[-JSON_PROBE_SIZE:]
+    start = len(head) - len(head.lstrip())
+    end = len(data) - (len(tail) - len(tail.rstrip()))
+    if end - start < 2 or data[start:start + 1] != b"[" or data[end - 1:end] != b"]":
+        return None
+    # Cheap layout check on the first object before shipping ranges to the pool
+    first = data[start + 1:min(end - 1, start + 1 + JSON_PROBE_SIZE)].lstrip()
+    newline = first.find(b"\n")
+    if newline < 0:
+        return None
+    first = first[:newline].strip()
+    try:
+        if not isinstance(json.loads(first[:-1] if first.endswith(b",") else first), dict):
+            return None
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    return start + 1, end - 1
+
+
+def validate_parallel(
+    file_type: str,
+    data: bytes,
+    executor: Optional[Executor] = None,
+    workers: Optional[int] = None,
+    row_builder: Optional[Callable] = None
+) -> Optional[Tuple[tuple[bool, str, int, int], Any]]:
+    """
+    Validate a CSV, JSON or NDJSON payload by splitting it at line boundaries into
+    byte ranges that are inspected in a process pool. Returns the same
+    (is_valid, error_message, sample_count, gene_count) tuple as the
+    sequential validators, together with the rows collected by row_builder
+    (a picklable factory for an object with add() and extend()), or None
+    when the payload cannot be split safely (a bad header, JSON that is not
+    one object per line, or a parse error). The caller then falls back to
+    the sequential inspector, which reports the error with its usual message.
+    """
+    executor = executor or get_process_pool()
+    workers = workers or PARALLEL_VALIDATION_WORKERS
+    if file_type == "csv":
+        headers, body_start = _csv_headers(data)
+        if headers is None:
+            return None
+        ranges = split_ranges(data, body_start, len(data), workers * RANGES_PER_WORKER)
+        futures = [executor.submit(validate_csv_range, data[start:end], headers, row_builder) for start, end in ranges]
+    elif file_type == "json":
+        body = _json_body(data)
+        if body is None:
+            return None
+        ranges = split_ranges(data, body[0], body[1], workers * RANGES_PER_WORKER)
+        futures = [executor.submit(validate_json_range, data[start:end], row_builder) for start, end in ranges]
+    elif file_type == "ndjson":
+        ranges = split_ranges(data, 0, len(data), workers * RANGES_PER_WORKER)
+        futures = [executor.submit(validate_ndjson_range, data[start:end], row_builder) for start, end in ranges]
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+    results = [future.result() for future in futures]
+    if not all(result.splittable for result in results):
+        return None
+    if file_type == "json":
+        # Every object but the last must be followed by a comma
+        filled = [result for result in results if result.inspection.rows_seen]
+        if any(not result.trailing_comma for result in filled[:-1]) or (filled and filled[-1].trailing_comma):
+            return None
+    return merge_results(results)
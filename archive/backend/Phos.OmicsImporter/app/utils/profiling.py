@@ -0,0 +1,91 @@
+"""
+ASGI hook of the request profiler. The sampler itself lives in
+app/utils/sampling.py, shared with the ai-engine.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import tempfile
+import threading
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool as _run_in_threadpool
+from starlette.datastructures import Headers
+
+from .sampling import (
+    PROFILE_HEADER, PROFILE_ID_HEADER, PROFILE_TOKEN_HEADER, PROFILING_ENABLED, Profile, ProfileStore, profile_trigger,
+    sampler,
+)
+
+logger = logging.getLogger(__name__)
+
+PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(tempfile.gettempdir(), "omics-profiles"))
+
+store = ProfileStore(PROFILING_DIR)
+
+# The profile of the request being handled, so work it hands to the thread pool is sampled too
+current_profile: contextvars.ContextVar[Optional[Profile]] = contextvars.ContextVar("current_profile", default=None)
+
+
+async def run_in_threadpool(func, *args, **kwargs):
+    """fastapi.concurrency.run_in_threadpool that samples the worker thread when the request is being profiled."""
+    profile = current_profile.get()
+    if profile is None:
+        return await _run_in_threadpool(func, *args, **kwargs)
+
+    def profiled():
+        with profile.attached():
+            return func(*args, **kwargs)
+
+    return await _run_in_threadpool(profiled)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests that send X-Profile with a valid X-Profile-Token, or a
+    PROFILING_SAMPLE_RATE share of all requests. The event loop thread is
+    only sampled while the request's own task is running on it; thread-pool
+    work is sampled through run_in_threadpool. Process-pool validation runs
+    in other processes and shows up as the wait for it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILING_ENABLED:
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+        trigger = profile_trigger(headers.get(PROFILE_HEADER), headers.get(PROFILE_TOKEN_HEADER))
+        if trigger is None:
+            return await self.app(scope, receive, send)
+
+        profile = Profile(headers.get("x-request-id"), f"{scope['method']} {scope['path']}", trigger)
+        loop, task = asyncio.get_running_loop(), asyncio.current_task()
+        profile.attach(threading.get_ident(), lambda: asyncio.current_task(loop) is task)
+        if not sampler.start(profile):
+            return await self.app(scope, receive, send)
+
+        status = None
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (PROFILE_ID_HEADER.lower().encode(), profile.id.encode())]}
+            await send(message)
+
+        reset = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            current_profile.reset(reset)
+            sampler.stop(profile)
+            try:
+                meta = await _run_in_threadpool(store.save, profile, status)
+                if meta:
+                    logger.info(f"Profiled {profile.label} ({trigger}): {profile.samples} samples as {profile.id}")
+            except OSError as e:
+                logger.warning(f"Could not store profile {profile.id}: {e}")
@@ -0,0 +1,292 @@
+"""
+Sampling profiler core: which requests to profile, per-request stack
+samples, the sampler thread and the on-disk profile store.
+
+The sampler is framework-free, stdlib-only and Python 3.9 compatible,
+because both services use it: the OmicsImporter through the ASGI
+middleware in app/utils/profiling.py, and the ai-engine through the Flask
+hooks in ai-engine/profiling.py. The ai-engine image cannot reach this
+directory, so the ai-engine keeps a verbatim copy of this file as
+ai-engine/profiling_sampler.py. Fix sampler bugs here, not in either hook,
+and copy the file over; the two must stay identical.
+"""
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Off unless set; the sampler thread is only started once a request is profiled
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False").lower() == "true"
+
+# Required in X-Profile-Token to force a profile and to list or download profiles; both are refused while empty
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+
+# Share of requests profiled without the header, 0.0 - 1.0
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0.0"))
+
+# Seconds between stack samples
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.01"))
+
+# Share of one core the sampler may use; the interval widens to stay under it
+PROFILING_MAX_OVERHEAD = float(os.getenv("PROFILING_MAX_OVERHEAD", "0.02"))
+
+# Requests profiled at once; further requests run unprofiled
+PROFILING_MAX_CONCURRENT = int(os.getenv("PROFILING_MAX_CONCURRENT", "2"))
+
+# A profile stops sampling after this many seconds
+PROFILING_MAX_SECONDS = float(os.getenv("PROFILING_MAX_SECONDS", "60"))
+
+# Frames kept per stack, from the innermost
+PROFILING_MAX_DEPTH = int(os.getenv("PROFILING_MAX_DEPTH", "96"))
+
+# Stored profiles; the oldest are deleted past either limit
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "200"))
+PROFILING_MAX_BYTES = int(os.getenv("PROFILING_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Largest single profile; its least frequent stacks are dropped to fit
+PROFILING_MAX_PROFILE_BYTES = int(os.getenv("PROFILING_MAX_PROFILE_BYTES", str(2 * 1024 * 1024)))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,80}$")
+
+
+def token_valid(token: Optional[str]) -> bool:
+    return bool(PROFILING_TOKEN) and token is not None and hmac.compare_digest(token, PROFILING_TOKEN)
+
+
+def profile_trigger(header: Optional[str], token: Optional[str]) -> Optional[str]:
+    """Why a request should be profiled ('header' or 'sampled'), or None."""
+    if not PROFILING_ENABLED:
+        return None
+    if header and header.lower() not in ("0", "false") and token_valid(token):
+        return "header"
+    if PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+def _frame_name(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{os.path.basename(code.co_filename)}:{name}".replace(";", ":").replace(" ", "_")
+
+
+class Profile:
+    """Stack samples of the threads working on one request."""
+
+    def __init__(self, request_id: Optional[str], label: str, trigger: str):
+        request_id = request_id if request_id and _ID_PATTERN.match(request_id) else uuid.uuid4().hex
+        self.started_at = datetime.now(timezone.utc)
+        self.id = f"{self.started_at:%Y%m%dT%H%M%S%f}-{request_id}"
+        self.request_id = request_id
+        self.label = label
+        self.trigger = trigger
+        self.stacks: Counter = Counter()  # innermost-first tuple of code objects -> samples
+        self.samples = 0
+        self.truncated = False
+        self._started = time.perf_counter()
+        self.seconds = 0.0
+        # thread id -> whether the thread is on this request right now (None: always)
+        self._threads: Dict[int, Optional[Callable[[], bool]]] = {}
+
+    def attach(self, thread_id: int, owns: Optional[Callable[[], bool]] = None) -> None:
+        self._threads[thread_id] = owns
+
+    def detach(self, thread_id: int) -> None:
+        self._threads.pop(thread_id, None)
+
+    @contextmanager
+    def attached(self) -> Iterator[None]:
+        """Sample the calling thread while the block runs."""
+        thread_id = threading.get_ident()
+        self.attach(thread_id)
+        try:
+            yield
+        finally:
+            self.detach(thread_id)
+
+    def sample(self, frames: dict, max_depth: int) -> bool:
+        """Record the current stack of each attached thread; False once the profile has run too long."""
+        if time.perf_counter() - self._started > PROFILING_MAX_SECONDS:
+            self.truncated = True
+            return False
+        for thread_id, owns in list(self._threads.items()):
+            frame = frames.get(thread_id)
+            if frame is None or (owns is not None and not owns()):
+                continue
+            stack = []
+            while frame is not None and len(stack) < max_depth:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            self.stacks[tuple(stack)] += 1
+            self.samples += 1
+        return True
+
+    def finish(self) -> None:
+        self.seconds = time.perf_counter() - self._started
+
+    def collapsed(self, max_bytes: int = PROFILING_MAX_PROFILE_BYTES) -> Tuple[str, int]:
+        """
+        Folded stacks, root first, one 'frame;frame;frame count' line per
+        stack, as flamegraph.pl and speedscope read them. Returns the text and
+        the samples dropped to stay under max_bytes.
+        """
+        lines, size, dropped = [], 0, 0
+        for stack, count in self.stacks.most_common():
+            line = ";".join(_frame_name(code) for code in reversed(stack)) + f" {count}\n"
+            if size + len(line) > max_bytes:
+                dropped += count
+                continue
+            lines.append(line)
+            size += len(line)
+        return "".join(lines), dropped
+
+
+class Sampler:
+    """
+    One daemon thread sampling every active profile. The CPU time of each
+    pass is measured and the sleep after it stretched so sampling stays
+    under max_overhead of a core, however deep the stacks or many the threads.
+    """
+
+    def __init__(self, interval: float = PROFILING_INTERVAL, max_overhead: float = PROFILING_MAX_OVERHEAD,
+                 max_concurrent: int = PROFILING_MAX_CONCURRENT, max_depth: int = PROFILING_MAX_DEPTH):
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.max_concurrent = max_concurrent
+        self.max_depth = max_depth
+        self._profiles: List[Profile] = []
+        self._wake = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profile: Profile) -> bool:
+        """Begin sampling a profile; False when max_concurrent profiles are already running."""
+        with self._wake:
+            if len(self._profiles) >= self.max_concurrent:
+                return False
+            self._profiles.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+        return True
+
+    def stop(self, profile: Profile) -> None:
+        with self._wake:
+            if profile in self._profiles:
+                self._profiles.remove(profile)
+        profile.finish()
+
+    def _run(self) -> None:
+        while True:
+            with self._wake:
+                while not self._profiles:
+                    self._wake.wait()
+                profiles = list(self._profiles)
+            started = time.thread_time()
+            frames = sys._current_frames()
+            expired = [profile for profile in profiles if not profile.sample(frames, self.max_depth)]
+            del frames
+            if expired:
+                with self._wake:
+                    self._profiles = [profile for profile in self._profiles if profile not in expired]
+            spent = time.thread_time() - started
+            time.sleep(max(self.interval, spent / self.max_overhead - spent))
+
+
+class ProfileStore:
+    """Profiles on local disk: <id>.collapsed with a <id>.json of metadata beside it."""
+
+    def __init__(self, directory: str, max_files: int = PROFILING_MAX_FILES,
+                 max_bytes: int = PROFILING_MAX_BYTES):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def save(self, profile: Profile, status: Optional[int] = None) -> Optional[dict]:
+        """Write a finished profile and prune the oldest past the limits. Profiles without samples are not kept."""
+        if not profile.samples:
+            return None
+        text, dropped = profile.collapsed()
+        meta = {
+            "id": profile.id,
+            "request_id": profile.request_id,
+            "label": profile.label,
+            "trigger": profile.trigger,
+            "status": status,
+            "started_at": profile.started_at.isoformat(),
+            "duration_ms": round(profile.seconds * 1000, 1),
+            "samples": profile.samples,
+            "dropped_samples": dropped,
+            "truncated": profile.truncated,
+        }
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{profile.id}.collapsed"), "w") as f:
+                f.write(text)
+            with open(os.path.join(self.directory, f"{profile.id}.json"), "w") as f:
+                json.dump(meta, f)
+            self._prune()
+        return meta
+
+    def _prune(self) -> None:
+        profiles = self._profile_ids()  # oldest first, since ids start with the time
+        sizes = {profile_id: sum(self._size(profile_id, ext) for ext in (".collapsed", ".json")) for profile_id in profiles}
+        total = sum(sizes.values())
+        while profiles and (len(profiles) > self.max_files or total > self.max_bytes):
+            oldest = profiles.pop(0)
+            total -= sizes[oldest]
+            for ext in (".collapsed", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, oldest + ext))
+                except FileNotFoundError:
+                    pass
+
+    def _size(self, profile_id: str, ext: str) -> int:
+        try:
+            return os.path.getsize(os.path.join(self.directory, profile_id + ext))
+        except OSError:
+            return 0
+
+    def _profile_ids(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(".json")] for name in names if name.endswith(".json"))
+
+    def list(self) -> List[dict]:
+        """Metadata of the stored profiles, newest first."""
+        profiles = []
+        for profile_id in reversed(self._profile_ids()):
+            try:
+                with open(os.path.join(self.directory, f"{profile_id}.json")) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # pruned or half-written meanwhile
+        return profiles
+
+    def path(self, profile_id: str) -> Optional[str]:
+        """The collapsed-stack file of a profile, or None."""
+        if not _ID_PATTERN.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.collapsed")
+        return path if os.path.exists(path) else None
+
+
+sampler = Sampler()
@@ -0,0 +1,40 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class StageTimer:
+    """
+    Wall-clock time spent in named stages of a request or job, reported as
+    a Server-Timing header so clients and benchmarks can see where it went.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}  # stage name -> seconds, in first-seen order
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def header(self) -> str:
+        """Render as a Server-Timing header value (durations in milliseconds)."""
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items())
+
+    def summary(self) -> str:
+        return " ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.stages.items())
+
+
+def parse_server_timing(value: str) -> Dict[str, float]:
+    """Parse a Server-Timing header into {stage: milliseconds}."""
+    timings = {}
+    for metric in value.split(","):
+        name, _, params = metric.strip().partition(";")
+        for param in params.split(";"):
+            key, _, duration = param.strip().partition("=")
+            if key == "dur" and name:
+                timings[name] = float(duration)
+    return timings
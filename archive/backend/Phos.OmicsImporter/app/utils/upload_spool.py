@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import logging
+from typing import AsyncIterator, Iterator
+from .profiling import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Chunks of resumable uploads are spooled here until the upload is completed
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "omics-uploads"))
+
+# Largest chunk a client may PUT in one request
+MAX_CHUNK_SIZE = int(os.getenv("UPLOAD_MAX_CHUNK_SIZE", str(64 * 1024 * 1024)))
+
+
+class ChunkTooLargeError(Exception):
+    """Raised when a chunk exceeds MAX_CHUNK_SIZE."""
+
+
+def upload_dir(upload_id: str) -> str:
+    return os.path.join(UPLOAD_SPOOL_DIR, upload_id)
+
+
+def chunk_path(upload_id: str, chunk_index: int) -> str:
+    return os.path.join(upload_dir(upload_id), f"{chunk_index:08d}.part")
+
+
+async def write_chunk(upload_id: str, chunk_index: int, stream: AsyncIterator[bytes]) -> int:
+    """
+    Write a chunk body to the spool and return its size.
+    The chunk is written to a temporary file and renamed into place, so
+    parallel or repeated PUTs of the same chunk never expose partial data.
+    File writes run in the threadpool.
+    """
+    directory = upload_dir(upload_id)
+    await run_in_threadpool(os.makedirs, directory, exist_ok=True)
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for data in stream:
+                size += len(data)
+                if size > MAX_CHUNK_SIZE:
+                    raise ChunkTooLargeError(f"Chunk exceeds {MAX_CHUNK_SIZE} bytes")
+                await run_in_threadpool(f.write, data)
+        await run_in_threadpool(os.replace, tmp_path, chunk_path(upload_id, chunk_index))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return size
+
+
+def read_chunk(upload_id: str, chunk_index: int) -> bytes:
+    with open(chunk_path(upload_id, chunk_index), "rb") as f:
+        return f.read()
+
+
+def iter_chunks(upload_id: str, chunk_count: int) -> Iterator[bytes]:
+    """Yield the spooled chunks 0..chunk_count-1 in order."""
+    for chunk_index in range(chunk_count):
+        yield read_chunk(upload_id, chunk_index)
+
+
+def remove_upload(upload_id: str) -> None:
+    shutil.rmtree(upload_dir(upload_id), ignore_errors=True)
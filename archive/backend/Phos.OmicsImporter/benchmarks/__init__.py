@@ -0,0 +1 @@
+# Phos.OmicsImporter.benchmarks package
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Time and working memory of the normalization stage on a large dense matrix.
+
+Writes a synthetic count matrix straight into the matrix store (building it
+row by row through MatrixBuilder would dominate the run), then builds each
+layer and reports its wall time and peak NumPy working memory as traced by
+tracemalloc. Pages of the memory-mapped input and output are file-backed
+and not counted; the peak should stay near NORMALIZATION_MEMORY_BUDGET.
+
+    python -m benchmarks.normalization --samples 10000 --genes 20000 --budget-mb 256
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+
+def write_dense_matrix(file_id: int, samples: int, genes: int, chunk_rows: int = 256) -> None:
+    from app.services import matrix_store as store
+
+    directory = store.matrix_dir(file_id)
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(0)
+    matrix = np.lib.format.open_memmap(
+        os.path.join(directory, store.DENSE_FILE), mode="w+", dtype=np.float32, shape=(samples, genes)
+    )
+    gene_means = rng.lognormal(3, 1.5, size=genes)
+    for start in range(0, samples, chunk_rows):
+        stop = min(start + chunk_rows, samples)
+        matrix[start:stop] = rng.poisson(gene_means, size=(stop - start, genes))
+    matrix.flush()
+    del matrix
+    with open(os.path.join(directory, store.SAMPLES_FILE), "w") as f:
+        f.writelines(f"SAMPLE{s:05d}\n" for s in range(samples))
+    with open(os.path.join(directory, store.GENES_FILE), "w") as f:
+        f.writelines(f"GENE{g:06d}\n" for g in range(genes))
+    with open(os.path.join(directory, store.META_FILE), "w") as f:
+        json.dump({"format": store.FORMAT_DENSE, "shape": [samples, genes], "nnz": samples * genes, "dtype": "float32"}, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunked normalization layers")
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--genes", type=int, default=20000)
+    parser.add_argument("--budget-mb", type=int, default=256)
+    parser.add_argument("--layers", default="cpm+log1p,zscore,quantile")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    os.environ.setdefault("MATRIX_STORE_DIR", tempfile.mkdtemp(prefix="omics-matrices-bench-"))
+    os.environ["NORMALIZATION_MEMORY_BUDGET"] = str(args.budget_mb * 1024 * 1024)
+    from app.services.normalization import normalize_matrix, rows_per_chunk
+
+    started = time.perf_counter()
+    write_dense_matrix(0, args.samples, args.genes)
+    print(f"matrix {args.samples}x{args.genes} written in {time.perf_counter() - started:.1f}s, "
+          f"{rows_per_chunk(args.genes)} rows per chunk")
+
+    results = {"samples": args.samples, "genes": args.genes, "budget_mb": args.budget_mb, "layers": {}}
+    for layer in args.layers.split(","):
+        tracemalloc.start()
+        started = time.perf_counter()
+        normalize_matrix(0, [layer])
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results["layers"][layer] = {"seconds": round(elapsed, 2), "peak_mb": round(peak / 2 ** 20, 1)}
+        print(f"{layer:<24} {elapsed:8.1f}s  peak {peak / 2 ** 20:8.1f} MiB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Validation throughput benchmark for large omics payloads.
+
+Validates one synthetic payload sequentially and then in byte ranges
+across process pools of increasing size, reporting MB/s and the speedup
+over the sequential validator:
+
+    python -m benchmarks.parallel_validation --size-mb 512 --workers 1,2,4,8
+"""
+import argparse
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+def make_payload(file_type: str, size_mb: int, samples: int) -> bytes:
+    """Build a long-format payload of roughly size_mb megabytes."""
+    target = size_mb * 1024 * 1024
+    parts = ["sample_id,gene,value\n" if file_type == "csv" else "[\n"]
+    size = len(parts[0])
+    i = 0
+    while size < target:
+        sample, gene, value = f"SAMPLE{i % samples:05d}", f"GENE{i // samples:06d}", (i * 7919) % 100000 / 100.0
+        if file_type == "csv":
+            line = f"{sample},{gene},{value}\n"
+        else:
+            line = json.dumps({"sample_id": sample, "gene": gene, "value": value}) + ",\n"
+        parts.append(line)
+        size += len(line)
+        i += 1
+    if file_type == "json":
+        parts[-1] = parts[-1].rstrip(",\n") + "\n]\n"
+    return "".join(parts).encode()
+
+
+def timed(fn, *args) -> tuple:
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure parallel validation throughput")
+    parser.add_argument("--file-type", choices=("csv", "json"), default="csv")
+    parser.add_argument("--size-mb", type=int, default=256, help="payload size in megabytes")
+    parser.add_argument("--samples", type=int, default=1000, help="distinct samples in the payload")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma-separated pool sizes")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    from app.api.import_router import validate_csv_structure, validate_json_structure
+    from app.utils.parallel_validation import validate_parallel
+
+    data = make_payload(args.file_type, args.size_mb, args.samples)
+    megabytes = len(data) / (1024 * 1024)
+    sequential = validate_csv_structure if args.file_type == "csv" else validate_json_structure
+    expected, baseline = timed(lambda: sequential(data.decode("utf-8")))
+    results = [{
+        "mode": "sequential",
+        "workers": 1,
+        "seconds": round(baseline, 3),
+        "mb_per_second": round(megabytes / baseline, 1),
+        "speedup": 1.0,
+    }]
+
+    for workers in (int(w) for w in args.workers.split(",")):
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            # Start the workers before timing
+            list(executor.map(abs, range(workers)))
+            (result, _), elapsed = timed(validate_parallel, args.file_type, data, executor, workers)
+        if result != expected:
+            raise SystemExit(f"Parallel result {result} differs from sequential {expected}")
+        results.append({
+            "mode": "parallel",
+            "workers": workers,
+            "seconds": round(elapsed, 3),
+            "mb_per_second": round(megabytes / elapsed, 1),
+            "speedup": round(baseline / elapsed, 2),
+        })
+
+    report = {"file_type": args.file_type, "size_mb": round(megabytes, 1), "cpu_count": multiprocessing.cpu_count(), "results": results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
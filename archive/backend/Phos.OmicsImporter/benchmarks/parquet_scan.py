@@ -0,0 +1,90 @@
+"""
+Scan cost of the Parquet stage versus re-reading CSV text.
+
+Builds one synthetic import, writes its Parquet partition, and times the
+queries analysts typically run: a full load, a projected load, and a
+single-gene lookup with predicate pushdown.
+
+    python -m benchmarks.parquet_scan --samples 500 --genes 20000
+"""
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+
+
+def make_csv(samples: int, genes: int) -> bytes:
+    lines = ["sample_id,gene,value"]
+    for s in range(samples):
+        for g in range(genes):
+            lines.append(f"SAMPLE{s:05d},GENE{g:06d},{(s * 7919 + g) % 100000 / 100.0}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CSV and Parquet scan cost")
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--genes", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    os.environ.setdefault("PARQUET_STORE_URI", tempfile.mkdtemp(prefix="omics-parquet-bench-"))
+    import pandas as pd
+    import pyarrow.dataset as ds
+    from app.services.matrix_store import MatrixBuilder
+    from app.services.parquet_store import open_dataset, write_parquet
+    from app.utils.file_utils import iter_omics_rows
+
+    payload = make_csv(args.samples, args.genes)
+    builder = MatrixBuilder().add_rows(iter_omics_rows(io.StringIO(payload.decode()), "csv"))
+    write_parquet(0, builder)
+    dataset = open_dataset()
+    gene = f"GENE{args.genes // 2:06d}"
+    only_file = ds.field("file_id") == 0
+
+    scenarios = {
+        "full_load": (
+            lambda: pd.read_csv(io.BytesIO(payload)),
+            lambda: dataset.to_table(filter=only_file).to_pandas(),
+        ),
+        "project_value": (
+            lambda: pd.read_csv(io.BytesIO(payload), usecols=["value"]),
+            lambda: dataset.to_table(columns=["value"], filter=only_file).to_pandas(),
+        ),
+        "single_gene": (
+            lambda: (lambda df: df[df["gene"] == gene])(pd.read_csv(io.BytesIO(payload))),
+            lambda: dataset.to_table(columns=["sample_id", "value"], filter=only_file & (ds.field("gene") == gene)).to_pandas(),
+        ),
+    }
+    results = []
+    for name, (csv_scan, parquet_scan) in scenarios.items():
+        csv_seconds = best_of(args.repeat, csv_scan)
+        parquet_seconds = best_of(args.repeat, parquet_scan)
+        results.append({
+            "scenario": name,
+            "csv_seconds": round(csv_seconds, 4),
+            "parquet_seconds": round(parquet_seconds, 4),
+            "parquet_fraction": round(parquet_seconds / csv_seconds, 3),
+        })
+
+    report = {"rows": args.samples * args.genes, "csv_bytes": len(payload), "results": results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
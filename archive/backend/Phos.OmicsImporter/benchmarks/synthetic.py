@@ -0,0 +1,141 @@
+"""
+Deterministic synthetic omics files for benchmarks.
+
+The same seed and parameters always produce the same bytes, so runs on
+different commits import identical payloads. Values are negative binomial
+counts around a per-gene mean, like RNA-seq.
+
+    python -m benchmarks.synthetic --samples 200 --genes 5000 --format ndjson \\
+        --sparsity 0.3 --error-rate 0.001 --gzip -o data.ndjson.gz
+"""
+import argparse
+import gzip
+import json
+from typing import Iterator, NamedTuple
+
+import numpy as np
+
+FORMATS = ("csv", "json", "ndjson")
+
+# Malformed rows produced at error_rate: (description, sample_id, gene, value)
+ERROR_KINDS = ("bad_value", "empty_sample", "missing_value")
+
+
+class SyntheticSpec(NamedTuple):
+    samples: int = 100
+    genes: int = 1000
+    file_format: str = "csv"
+    sparsity: float = 0.0  # share of sample x gene cells left out
+    error_rate: float = 0.0  # share of rows that are malformed
+    seed: int = 0
+    tag: str = ""  # prefix for sample ids, to make otherwise equal files distinct
+
+    @property
+    def file_name(self) -> str:
+        return f"synthetic_{self.samples}x{self.genes}.{self.file_format}"
+
+
+def iter_rows(spec: SyntheticSpec, rows_per_block: int = 100000) -> Iterator[tuple]:
+    """
+    Yield (sample_id, gene, value) in sample-major order. value is a float,
+    or a string/None for malformed rows.
+    """
+    rng = np.random.default_rng(spec.seed)
+    gene_means = rng.lognormal(2.0, 1.5, size=spec.genes)
+    genes = [f"GENE{g:06d}" for g in range(spec.genes)]
+    samples_per_block = max(1, rows_per_block // max(spec.genes, 1))
+    for start in range(0, spec.samples, samples_per_block):
+        stop = min(start + samples_per_block, spec.samples)
+        shape = (stop - start, spec.genes)
+        counts = rng.negative_binomial(5, 5 / (5 + gene_means), size=shape)
+        keep = rng.random(shape) >= spec.sparsity
+        errors = rng.random(shape) < spec.error_rate
+        kinds = rng.integers(0, len(ERROR_KINDS), size=shape)
+        for i in range(shape[0]):
+            sample_id = f"{spec.tag}SAMPLE{start + i:06d}"
+            for g in np.flatnonzero(keep[i]).tolist():
+                if errors[i, g]:
+                    kind = ERROR_KINDS[kinds[i, g]]
+                    if kind == "bad_value":
+                        yield sample_id, genes[g], "n/a"
+                    elif kind == "empty_sample":
+                        yield "", genes[g], float(counts[i, g])
+                    else:
+                        yield sample_id, genes[g], None
+                else:
+                    yield sample_id, genes[g], float(counts[i, g])
+
+
+def _csv_lines(spec: SyntheticSpec) -> Iterator[str]:
+    yield "sample_id,gene,value\n"
+    for sample_id, gene, value in iter_rows(spec):
+        yield f"{sample_id},{gene},{'' if value is None else value}\n"
+
+
+def _json_lines(spec: SyntheticSpec) -> Iterator[str]:
+    # One object per line, the layout parallel validation can split
+    yield "[\n"
+    first = True
+    for sample_id, gene, value in iter_rows(spec):
+        item = {"sample_id": sample_id, "gene": gene}
+        if value is not None:
+            item["value"] = value
+        yield ("" if first else ",\n") + json.dumps(item)
+        first = False
+    yield "\n]\n"
+
+
+def _ndjson_lines(spec: SyntheticSpec) -> Iterator[str]:
+    for sample_id, gene, value in iter_rows(spec):
+        item = {"sample_id": sample_id, "gene": gene}
+        if value is not None:
+            item["value"] = value
+        yield json.dumps(item) + "\n"
+
+
+def iter_text(spec: SyntheticSpec) -> Iterator[str]:
+    if spec.file_format == "csv":
+        return _csv_lines(spec)
+    if spec.file_format == "json":
+        return _json_lines(spec)
+    if spec.file_format == "ndjson":
+        return _ndjson_lines(spec)
+    raise ValueError(f"Unsupported format: {spec.file_format}")
+
+
+def generate(spec: SyntheticSpec, compress: bool = False) -> bytes:
+    """Return the whole payload; gzip with a fixed mtime, so bytes stay reproducible."""
+    data = "".join(iter_text(spec)).encode()
+    return gzip.compress(data, mtime=0) if compress else data
+
+
+def write(spec: SyntheticSpec, path: str, compress: bool = False) -> int:
+    """Stream a payload to disk without holding it in memory; returns its size."""
+    opener = (lambda: gzip.GzipFile(path, "wb", mtime=0)) if compress else (lambda: open(path, "wb"))
+    with opener() as f:
+        for text in iter_text(spec):
+            f.write(text.encode())
+    with open(path, "rb") as f:
+        return f.seek(0, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a deterministic synthetic omics file")
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--genes", type=int, default=1000)
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--sparsity", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("-o", "--output", help="defaults to synthetic_<samples>x<genes>.<format>[.gz]")
+    args = parser.parse_args()
+
+    spec = SyntheticSpec(args.samples, args.genes, args.format, args.sparsity, args.error_rate, args.seed)
+    path = args.output or spec.file_name + (".gz" if args.gzip else "")
+    size = write(spec, path, args.gzip)
+    print(f"wrote {path} ({size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Store raw payloads compressed
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('omics_raw', sa.Column('content_codec', sa.String(length=16), nullable=False, server_default='identity'))
+    op.add_column('omics_raw', sa.Column('raw_size', sa.BigInteger(), nullable=True))
+    op.add_column('omics_raw', sa.Column('stored_size', sa.BigInteger(), nullable=True))
+
+    # Existing rows keep their UTF-8 text as uncompressed bytes (codec "identity")
+    op.alter_column(
+        'omics_raw',
+        'file_content',
+        type_=sa.LargeBinary(),
+        existing_type=sa.Text(),
+        existing_nullable=False,
+        postgresql_using="convert_to(file_content, 'UTF8')",
+    )
+    op.execute(
+        "UPDATE omics_raw SET raw_size = octet_length(file_content), "
+        "stored_size = octet_length(file_content)"
+    )
+
+
+def downgrade():
+    # Decompress rows in place so they can be converted back to text
+    from app.utils.compression import decompress
+
+    # One payload at a time: only the ids are read up front
+    conn = op.get_bind()
+    ids = conn.execute(sa.text(
+        "SELECT id FROM omics_raw WHERE content_codec <> 'identity' ORDER BY id"
+    )).scalars().all()
+    for row_id in ids:
+        content, codec = conn.execute(
+            sa.text("SELECT file_content, content_codec FROM omics_raw WHERE id = :id"), {"id": row_id}
+        ).one()
+        conn.execute(
+            sa.text("UPDATE omics_raw SET file_content = :content, content_codec = 'identity' WHERE id = :id"),
+            {"content": decompress(content, codec), "id": row_id},
+        )
+    op.alter_column(
+        'omics_raw',
+        'file_content',
+        type_=sa.Text(),
+        existing_type=sa.LargeBinary(),
+        existing_nullable=False,
+        postgresql_using="convert_from(file_content, 'UTF8')",
+    )
+    op.drop_column('omics_raw', 'stored_size')
+    op.drop_column('omics_raw', 'raw_size')
+    op.drop_column('omics_raw', 'content_codec')
@@ -0,0 +1,55 @@
+"""Add content hash and idempotency key for deduplicated imports
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import hashlib
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    from app.utils.compression import iter_decompressed
+
+    op.add_column('omics_raw', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.add_column('omics_raw', sa.Column('idempotency_key', sa.String(length=255), nullable=True))
+
+    # Backfill hashes; older duplicates already in the table keep a NULL hash.
+    # Payloads are fetched one at a time: only the ids are read up front
+    conn = op.get_bind()
+    seen = set()
+    ids = conn.execute(sa.text("SELECT id FROM omics_raw ORDER BY id")).scalars().all()
+    for row_id in ids:
+        content, codec = conn.execute(
+            sa.text("SELECT file_content, content_codec FROM omics_raw WHERE id = :id"), {"id": row_id}
+        ).one()
+        hasher = hashlib.sha256()
+        for chunk in iter_decompressed(content, codec):
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        conn.execute(
+            sa.text("UPDATE omics_raw SET content_sha256 = :digest WHERE id = :id"),
+            {"digest": digest, "id": row_id},
+        )
+
+    op.create_index(op.f('ix_omics_raw_content_sha256'), 'omics_raw', ['content_sha256'], unique=True)
+    op.create_index(op.f('ix_omics_raw_idempotency_key'), 'omics_raw', ['idempotency_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_omics_raw_idempotency_key'), table_name='omics_raw')
+    op.drop_index(op.f('ix_omics_raw_content_sha256'), table_name='omics_raw')
+    op.drop_column('omics_raw', 'idempotency_key')
+    op.drop_column('omics_raw', 'content_sha256')
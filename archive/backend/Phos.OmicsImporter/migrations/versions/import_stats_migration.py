@@ -0,0 +1,65 @@
+"""Add per-file, per-gene and per-sample summary statistics
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing imports get statistics with: python -m app.services.pipeline --all
+    op.create_table(
+        'omics_file_stats',
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('sample_count', sa.Integer(), nullable=False),
+        sa.Column('gene_count', sa.Integer(), nullable=False),
+        sa.Column('value_count', sa.BigInteger(), nullable=False),
+        sa.Column('missing_rate', sa.Float(), nullable=True),
+        sa.Column('mean', sa.Float(), nullable=True),
+        sa.Column('variance', sa.Float(), nullable=True),
+        sa.Column('min', sa.Float(), nullable=True),
+        sa.Column('max', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('file_id')
+    )
+    op.create_table(
+        'omics_gene_stats',
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('gene', sa.String(length=255), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('missing_rate', sa.Float(), nullable=False),
+        sa.Column('mean', sa.Float(), nullable=True),
+        sa.Column('variance', sa.Float(), nullable=True),
+        sa.Column('min', sa.Float(), nullable=True),
+        sa.Column('max', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('file_id', 'gene')
+    )
+    op.create_table(
+        'omics_sample_stats',
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('sample_id', sa.String(length=255), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('missing_rate', sa.Float(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('mean', sa.Float(), nullable=True),
+        sa.Column('variance', sa.Float(), nullable=True),
+        sa.Column('min', sa.Float(), nullable=True),
+        sa.Column('max', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('file_id', 'sample_id')
+    )
+
+
+def downgrade():
+    op.drop_table('omics_sample_stats')
+    op.drop_table('omics_gene_stats')
+    op.drop_table('omics_file_stats')
@@ -0,0 +1,29 @@
+"""Add composite indexes for paginated import listing
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset pagination needs every row to have a created_at
+    op.execute("UPDATE omics_raw SET created_at = now() WHERE created_at IS NULL")
+    op.create_index('ix_omics_raw_created_at_id', 'omics_raw', ['created_at', 'id'], unique=False)
+    op.create_index('ix_omics_raw_processed_created_at_id', 'omics_raw', ['processed', 'created_at', 'id'], unique=False)
+    op.create_index('ix_omics_raw_file_type_created_at_id', 'omics_raw', ['file_type', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_omics_raw_file_type_created_at_id', table_name='omics_raw')
+    op.drop_index('ix_omics_raw_processed_created_at_id', table_name='omics_raw')
+    op.drop_index('ix_omics_raw_created_at_id', table_name='omics_raw')
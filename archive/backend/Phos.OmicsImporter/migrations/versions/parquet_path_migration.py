@@ -0,0 +1,25 @@
+"""Record the Parquet partition of each import
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing imports get a partition with: python -m app.services.pipeline --all
+    op.add_column('omics_raw', sa.Column('parquet_path', sa.String(length=1024), nullable=True))
+
+
+def downgrade():
+    op.drop_column('omics_raw', 'parquet_path')
@@ -0,0 +1,46 @@
+"""Add omics feature sets and per-patient feature vectors
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing imports get feature vectors with: python -m app.services.pipeline --all
+    op.create_table(
+        'omics_feature_sets',
+        sa.Column('feature_set', sa.String(length=64), nullable=False),
+        sa.Column('source_layer', sa.String(length=255), nullable=False),
+        sa.Column('panels', sa.Text(), nullable=False),
+        sa.Column('feature_names', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('feature_set')
+    )
+    op.create_table(
+        'omics_patient_features',
+        sa.Column('feature_set', sa.String(length=64), nullable=False),
+        sa.Column('patient_id', sa.String(length=255), nullable=False),
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('sample_count', sa.Integer(), nullable=False),
+        sa.Column('features', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('feature_set', 'patient_id', 'file_id')
+    )
+    op.create_index('ix_omics_patient_features_file_id', 'omics_patient_features', ['file_id'])
+
+
+def downgrade():
+    op.drop_index('ix_omics_patient_features_file_id', table_name='omics_patient_features')
+    op.drop_table('omics_patient_features')
+    op.drop_table('omics_feature_sets')
@@ -0,0 +1,148 @@
+"""Partition omics_raw by month and prepare it for payload archiving
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+RAW_COLUMNS = (
+    "id, file_name, file_type, file_content, content_codec, raw_size, stored_size, content_sha256, "
+    "idempotency_key, sample_count, gene_count, created_at, processed, parquet_path, payload_uri, archived_at"
+)
+
+LISTING_INDEXES = (
+    ('ix_omics_raw_created_at_id', ['created_at', 'id']),
+    ('ix_omics_raw_processed_created_at_id', ['processed', 'created_at', 'id']),
+    ('ix_omics_raw_file_type_created_at_id', ['file_type', 'created_at', 'id']),
+)
+
+
+def create_raw_indexes():
+    op.create_index(op.f('ix_omics_raw_id'), 'omics_raw', ['id'], unique=False)
+    op.create_index(op.f('ix_omics_raw_content_sha256'), 'omics_raw', ['content_sha256'], unique=False)
+    op.create_index(op.f('ix_omics_raw_idempotency_key'), 'omics_raw', ['idempotency_key'], unique=False)
+    for name, columns in LISTING_INDEXES:
+        op.create_index(name, 'omics_raw', columns, unique=False)
+
+
+def drop_raw_indexes(table):
+    for name, _ in LISTING_INDEXES:
+        op.drop_index(name, table_name=table)
+    op.drop_index(op.f('ix_omics_raw_idempotency_key'), table_name=table)
+    op.drop_index(op.f('ix_omics_raw_content_sha256'), table_name=table)
+    op.drop_index(op.f('ix_omics_raw_id'), table_name=table)
+
+
+def upgrade():
+    # A partitioned table can only enforce uniqueness per partition, so the
+    # dedupe keys move to their own table
+    op.create_table(
+        'omics_import_keys',
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('kind', 'key')
+    )
+    op.create_index('ix_omics_import_keys_file_id', 'omics_import_keys', ['file_id'])
+    op.execute(
+        "INSERT INTO omics_import_keys (kind, key, file_id, created_at) "
+        "SELECT 'sha256', content_sha256, id, created_at FROM omics_raw WHERE content_sha256 IS NOT NULL"
+    )
+    op.execute(
+        "INSERT INTO omics_import_keys (kind, key, file_id, created_at) "
+        "SELECT 'idempotency', idempotency_key, id, created_at FROM omics_raw WHERE idempotency_key IS NOT NULL"
+    )
+
+    op.execute("UPDATE omics_raw SET created_at = now() WHERE created_at IS NULL")
+    with op.batch_alter_table('omics_raw') as batch:
+        batch.add_column(sa.Column('payload_uri', sa.String(length=1024), nullable=True))
+        batch.add_column(sa.Column('archived_at', sa.DateTime(), nullable=True))
+        batch.alter_column('file_content', existing_type=sa.LargeBinary(), nullable=True)
+        batch.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        op.drop_index(op.f('ix_omics_raw_idempotency_key'), table_name='omics_raw')
+        op.drop_index(op.f('ix_omics_raw_content_sha256'), table_name='omics_raw')
+        op.create_index(op.f('ix_omics_raw_content_sha256'), 'omics_raw', ['content_sha256'], unique=False)
+        op.create_index(op.f('ix_omics_raw_idempotency_key'), 'omics_raw', ['idempotency_key'], unique=False)
+        return
+
+    from app.db.partitions import DEFAULT_PARTITION, ensure_partitions
+
+    # Rebuild omics_raw as a table range-partitioned on created_at. Ids keep
+    # coming from the existing sequence; the primary key has to include the
+    # partition key.
+    op.rename_table('omics_raw', 'omics_raw_legacy')
+    op.execute("ALTER TABLE omics_raw_legacy RENAME CONSTRAINT omics_raw_pkey TO omics_raw_legacy_pkey")
+    drop_raw_indexes('omics_raw_legacy')
+    op.execute("""
+        CREATE TABLE omics_raw (
+            id integer NOT NULL DEFAULT nextval('omics_raw_id_seq'),
+            file_name varchar(255) NOT NULL,
+            file_type varchar(50) NOT NULL,
+            file_content bytea,
+            content_codec varchar(16) NOT NULL DEFAULT 'identity',
+            raw_size bigint,
+            stored_size bigint,
+            content_sha256 varchar(64),
+            idempotency_key varchar(255),
+            sample_count integer,
+            gene_count integer,
+            created_at timestamp without time zone NOT NULL,
+            processed integer,
+            parquet_path varchar(1024),
+            payload_uri varchar(1024),
+            archived_at timestamp without time zone,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE omics_raw_id_seq OWNED BY omics_raw.id")
+    op.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF omics_raw DEFAULT")
+    oldest = conn.execute(sa.text("SELECT min(created_at) FROM omics_raw_legacy")).scalar()
+    ensure_partitions(conn, start=oldest.date() if oldest else None)
+
+    op.execute(f"INSERT INTO omics_raw ({RAW_COLUMNS}) SELECT {RAW_COLUMNS} FROM omics_raw_legacy")
+    op.drop_table('omics_raw_legacy')
+    create_raw_indexes()
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name == 'postgresql':
+        # Fold the partitions back into a plain table
+        op.rename_table('omics_raw', 'omics_raw_partitioned')
+        drop_raw_indexes('omics_raw_partitioned')
+        op.execute(
+            "CREATE TABLE omics_raw (LIKE omics_raw_partitioned INCLUDING DEFAULTS, "
+            "CONSTRAINT omics_raw_pkey PRIMARY KEY (id))"
+        )
+        op.execute("ALTER SEQUENCE omics_raw_id_seq OWNED BY omics_raw.id")
+        op.execute(f"INSERT INTO omics_raw ({RAW_COLUMNS}) SELECT {RAW_COLUMNS} FROM omics_raw_partitioned")
+        op.drop_table('omics_raw_partitioned')
+        create_raw_indexes()
+
+    # Archived payloads have to be restored before file_content can be NOT NULL again
+    op.drop_index(op.f('ix_omics_raw_idempotency_key'), table_name='omics_raw')
+    op.drop_index(op.f('ix_omics_raw_content_sha256'), table_name='omics_raw')
+    with op.batch_alter_table('omics_raw') as batch:
+        batch.alter_column('file_content', existing_type=sa.LargeBinary(), nullable=False)
+        batch.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+        batch.drop_column('archived_at')
+        batch.drop_column('payload_uri')
+    op.create_index(op.f('ix_omics_raw_content_sha256'), 'omics_raw', ['content_sha256'], unique=True)
+    op.create_index(op.f('ix_omics_raw_idempotency_key'), 'omics_raw', ['idempotency_key'], unique=True)
+
+    op.drop_index('ix_omics_import_keys_file_id', table_name='omics_import_keys')
+    op.drop_table('omics_import_keys')
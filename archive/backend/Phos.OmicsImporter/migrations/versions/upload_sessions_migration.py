@@ -0,0 +1,49 @@
+"""Add chunked upload session tables
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'omics_upload_sessions',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('file_name', sa.String(length=255), nullable=False),
+        sa.Column('file_type', sa.String(length=50), nullable=False),
+        sa.Column('upload_codec', sa.String(length=16), nullable=True),
+        sa.Column('idempotency_key', sa.String(length=255), nullable=True),
+        sa.Column('total_chunks', sa.Integer(), nullable=True),
+        sa.Column('validated_chunks', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('file_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'omics_upload_chunks',
+        sa.Column('upload_id', sa.String(length=36), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('received_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['upload_id'], ['omics_upload_sessions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('upload_id', 'chunk_index')
+    )
+
+
+def downgrade():
+    op.drop_table('omics_upload_chunks')
+    op.drop_table('omics_upload_sessions')
@@ -0,0 +1,36 @@
+"""Add gene and sample keyed value index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'omics_values',
+        sa.Column('gene', sa.String(length=255), nullable=False),
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('sample_id', sa.String(length=255), nullable=False),
+        sa.Column('value', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('gene', 'file_id', 'sample_id')
+    )
+    op.create_index('ix_omics_values_sample_id_file_id_gene', 'omics_values', ['sample_id', 'file_id', 'gene'], unique=False)
+    op.create_index('ix_omics_values_file_id', 'omics_values', ['file_id'], unique=False)
+    # Files imported before this revision are indexed with: python -m app.services.pipeline --all
+
+
+def downgrade():
+    op.drop_index('ix_omics_values_file_id', table_name='omics_values')
+    op.drop_index('ix_omics_values_sample_id_file_id_gene', table_name='omics_values')
+    op.drop_table('omics_values')
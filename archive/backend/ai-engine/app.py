@@ -4,17 +4,16 @@ import logging
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 
-# Import AI engine modules
-try:
-    from health_score_model import calculate_health_score
-    from risk_model import predict_risk
-    from metrics import calculate_metrics
-except ImportError:
-    logging.warning("Could not import one or more AI modules. Some endpoints may not function correctly.")
+from telemetry import instrument_app
+from profiling import profile_requests
+from startup import WarmupPending, warmup, register as register_startup
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
+instrument_app(app)
+profile_requests(app)
+register_startup(app)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -33,6 +32,9 @@ try:
 except Exception as e:
     logger.error(f"Error loading configuration: {str(e)}")
 
+# Import the AI engine modules (pandas, sklearn, models) in the background, or first when AI_ENGINE_LAZY_STARTUP is false
+warmup.start()
+
 # Health check endpoint
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -46,8 +48,11 @@ def health_score():
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
+        calculate_health_score = warmup.resolve('health_score_model', 'calculate_health_score')
         result = calculate_health_score(data)
         return jsonify({"health_score": result}), 200
+    except WarmupPending as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
     except Exception as e:
         logger.error(f"Error calculating health score: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -59,8 +64,11 @@ def risk_prediction():
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
+        predict_risk = warmup.resolve('risk_model', 'predict_risk')
         result = predict_risk(data)
         return jsonify({"risk_prediction": result}), 200
+    except WarmupPending as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
     except Exception as e:
         logger.error(f"Error predicting risk: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -72,8 +80,11 @@ def metrics():
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
+        calculate_metrics = warmup.resolve('metrics', 'calculate_metrics')
         result = calculate_metrics(data)
         return jsonify({"metrics": result}), 200
+    except WarmupPending as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
     except Exception as e:
         logger.error(f"Error calculating metrics: {str(e)}")
         return jsonify({"error": str(e)}), 500
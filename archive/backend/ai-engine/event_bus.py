@@ -0,0 +1,313 @@
+"""
+Platform event bus backed by Redis Streams consumer groups.
+
+Events keep the pub/sub channel names (events:<eventtype>, e.g.
+events:userregisteredevent), but each channel is also a stream, so events
+wait for subscribers that are down or slow instead of being lost:
+
+- consumers read in batches with XREADGROUP ... COUNT and acknowledge each
+  batch with a single pipelined XACK;
+- entries left pending by a crashed consumer are taken over with XAUTOCLAIM
+  once they have been idle for EVENT_CLAIM_IDLE_MS;
+- entries that cannot be decoded, or are still unacknowledged after
+  EVENT_MAX_DELIVERIES deliveries, are moved to <channel>:dead and
+  acknowledged, so one poison entry cannot wedge the group;
+- streams are trimmed to about EVENT_STREAM_MAXLEN entries on every XADD.
+
+Payloads are encoded with event_codec (compact MessagePack for registered
+event types, JSON otherwise); consumers decode either. Delivery is
+at-least-once: a batch whose handler raises stays pending and is
+redelivered until the delivery limit, so handlers must tolerate duplicates. With mirror_pubsub the
+publisher also PUBLISHes each event as JSON, for subscribers still on plain
+pub/sub.
+Requires redis-py and Redis 6.2+ (XAUTOCLAIM).
+"""
+import os
+import json
+import time
+import socket
+import logging
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import redis
+
+import event_codec
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+
+# Approximate length each stream is trimmed to (MAXLEN ~)
+EVENT_STREAM_MAXLEN = int(os.getenv('EVENT_STREAM_MAXLEN', '100000'))
+
+# Entries read per XREADGROUP and acknowledged per XACK
+EVENT_BATCH_SIZE = int(os.getenv('EVENT_BATCH_SIZE', '100'))
+
+# How long XREADGROUP blocks waiting for new entries
+EVENT_BLOCK_MS = int(os.getenv('EVENT_BLOCK_MS', '1000'))
+
+# Pending entries idle this long belong to a crashed consumer and are reclaimed
+EVENT_CLAIM_IDLE_MS = int(os.getenv('EVENT_CLAIM_IDLE_MS', '60000'))
+
+# Deliveries after which an entry that is still unacknowledged is dead-lettered; 0 retries forever
+EVENT_MAX_DELIVERIES = int(os.getenv('EVENT_MAX_DELIVERIES', '5'))
+
+# Suffix of the stream holding a channel's dead-lettered entries, e.g. events:userregisteredevent:dead
+DEAD_LETTER_SUFFIX = ':dead'
+
+# Stream field holding the encoded payload
+DATA_FIELD = b'data'
+
+# Payload encoding on streams: 'binary' (event_codec) or 'json'. Pub/Sub mirrors are always JSON.
+EVENT_BUS_CODEC = os.getenv('EVENT_BUS_CODEC', 'binary')
+
+CHANNEL_PREFIX = 'events:'
+
+
+def channel_for(event_type: Union[str, type]) -> str:
+    """Channel (and stream key) of an event type: events:<type name, lower case>."""
+    name = event_type if isinstance(event_type, str) else event_type.__name__
+    return name if name.startswith(CHANNEL_PREFIX) else CHANNEL_PREFIX + name.lower()
+
+
+class Event(NamedTuple):
+    channel: str
+    id: str  # stream entry id
+    data: dict
+
+
+class Rejected(NamedTuple):
+    """A stream entry that will not be handed to a handler."""
+    channel: str
+    id: str
+    data: Optional[bytes]  # raw payload; None for an entry trimmed while pending
+    reason: str
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _stream_entries(response):
+    """(stream, entries) pairs of an XREADGROUP reply, whatever redis-py and protocol version shaped it."""
+    items = response.items() if isinstance(response, dict) else (response or [])
+    for channel, entries in items:
+        if entries and isinstance(entries[0], list):  # RESP3 replies wrap the entry list
+            entries = entries[0]
+        yield channel, entries
+
+
+def _parse_entries(channel, entries) -> Tuple[List[Event], List[Rejected]]:
+    """Decode stream entries; those that cannot be decoded are returned as rejected."""
+    channel = _decode(channel)
+    events, rejected = [], []
+    for entry_id, fields in entries:
+        entry_id = _decode(entry_id)
+        if fields is None:  # trimmed away while pending
+            rejected.append(Rejected(channel, entry_id, None, 'trimmed while pending'))
+            continue
+        raw = fields.get(DATA_FIELD, fields.get('data'))
+        try:
+            data = event_codec.decode(raw)
+            if not isinstance(data, dict):
+                raise ValueError(f"payload is a {type(data).__name__}, not an object")
+        except Exception as e:
+            rejected.append(Rejected(channel, entry_id, raw or b'', f"undecodable payload: {e}"))
+            continue
+        events.append(Event(channel, entry_id, data))
+    return events, rejected
+
+
+class StreamEventBus:
+    """Publishes platform events to Redis streams."""
+
+    def __init__(self, client: Optional[redis.Redis] = None, url: str = REDIS_URL,
+                 maxlen: Optional[int] = EVENT_STREAM_MAXLEN, mirror_pubsub: bool = False,
+                 codec: str = EVENT_BUS_CODEC):
+        self.client = client or redis.Redis.from_url(url)
+        self.maxlen = maxlen
+        self.mirror_pubsub = mirror_pubsub
+        self.codec = codec
+
+    def _add(self, pipe, channel: str, payload: dict) -> None:
+        message = event_codec.encode(channel, payload) if self.codec == 'binary' else json.dumps(payload)
+        pipe.xadd(channel, {DATA_FIELD: message}, maxlen=self.maxlen, approximate=True)
+        if self.mirror_pubsub:
+            pipe.publish(channel, message if self.codec == 'json' else json.dumps(payload))
+
+    def publish(self, event_type: Union[str, type], payload: dict) -> str:
+        """Append one event; returns its stream entry id."""
+        return self.publish_many(event_type, [payload])[0]
+
+    def publish_many(self, event_type: Union[str, type], payloads: Iterable[dict]) -> List[str]:
+        """Append several events in one round trip; returns their entry ids."""
+        channel = channel_for(event_type)
+        pipe = self.client.pipeline(transaction=False)
+        for payload in payloads:
+            self._add(pipe, channel, payload)
+        results = pipe.execute()
+        step = 2 if self.mirror_pubsub else 1
+        return [_decode(entry_id) for entry_id in results[::step]]
+
+    def consumer(self, event_types: Sequence[Union[str, type]], group: str,
+                 name: Optional[str] = None, **options) -> 'StreamConsumer':
+        return StreamConsumer(self.client, event_types, group, name, **options)
+
+
+class StreamConsumer:
+    """
+    One member of a consumer group reading one or more event streams. Every
+    group gets every event; within a group each event goes to one consumer.
+    """
+
+    def __init__(self, client: redis.Redis, event_types: Sequence[Union[str, type]], group: str,
+                 name: Optional[str] = None, batch_size: int = EVENT_BATCH_SIZE,
+                 block_ms: int = EVENT_BLOCK_MS, claim_idle_ms: int = EVENT_CLAIM_IDLE_MS,
+                 max_deliveries: int = EVENT_MAX_DELIVERIES, start_id: str = '$'):
+        self.client = client
+        self.channels = [channel_for(event_type) for event_type in event_types]
+        self.group = group
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+        self._claim_cursors = {channel: '0-0' for channel in self.channels}
+        self.ensure_groups(start_id)
+
+    def ensure_groups(self, start_id: str = '$') -> None:
+        """Create the group on every stream (and the stream itself) if missing."""
+        for channel in self.channels:
+            try:
+                self.client.xgroup_create(channel, self.group, id=start_id, mkstream=True)
+            except redis.ResponseError as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+
+    def read(self, count: Optional[int] = None, block_ms: Optional[int] = None) -> List[Event]:
+        """Read the next batch of new events across all streams."""
+        response = self.client.xreadgroup(
+            self.group, self.name, {channel: '>' for channel in self.channels},
+            count=count or self.batch_size, block=self.block_ms if block_ms is None else block_ms
+        )
+        events, rejected = [], []
+        for channel, entries in _stream_entries(response):
+            parsed, bad = _parse_entries(channel, entries)
+            events.extend(parsed)
+            rejected.extend(bad)
+        self.dead_letter(rejected)
+        return events
+
+    def reclaim(self, count: Optional[int] = None) -> List[Event]:
+        """
+        Take over entries other consumers left pending for longer than
+        claim_idle_ms, resuming each stream's scan where the last call stopped.
+        Entries already delivered more than max_deliveries times are
+        dead-lettered instead.
+        """
+        claimed = []
+        for channel in self.channels:
+            response = self.client.xautoclaim(
+                channel, self.group, self.name, self.claim_idle_ms,
+                start_id=self._claim_cursors[channel], count=count or self.batch_size
+            )
+            self._claim_cursors[channel] = _decode(response[0])
+            if response[1]:
+                claimed.append((channel, response[1]))
+        if not claimed:
+            return []
+
+        deliveries = self._delivery_counts(claimed) if self.max_deliveries > 0 else {}
+        events, rejected = [], []
+        for channel, entries in claimed:
+            retry = []
+            for entry_id, fields in entries:
+                times = deliveries.get((channel, _decode(entry_id)), 0)
+                if times > self.max_deliveries and fields is not None:
+                    raw = fields.get(DATA_FIELD, fields.get('data'))
+                    rejected.append(Rejected(channel, _decode(entry_id), raw, f"still unacknowledged after {times - 1} deliveries"))
+                else:
+                    retry.append((entry_id, fields))
+            parsed, bad = _parse_entries(channel, retry)
+            events.extend(parsed)
+            rejected.extend(bad)
+        self.dead_letter(rejected)
+        return events
+
+    def _delivery_counts(self, claimed) -> Dict[Tuple[str, str], int]:
+        """Times each claimed entry has been delivered, from XPENDING, in one round trip."""
+        keys = []
+        pipe = self.client.pipeline(transaction=False)
+        for channel, entries in claimed:
+            for entry_id, _ in entries:
+                pipe.xpending_range(channel, self.group, min=entry_id, max=entry_id, count=1)
+                keys.append((channel, _decode(entry_id)))
+        counts = {}
+        for key, pending in zip(keys, pipe.execute()):
+            if pending:
+                counts[key] = pending[0]['times_delivered']
+        return counts
+
+    def dead_letter(self, rejected: Sequence[Rejected]) -> None:
+        """
+        Copy rejected entries to their channel's dead-letter stream and
+        acknowledge them, in one round trip, so they are not redelivered.
+        """
+        if not rejected:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for entry in rejected:
+            if entry.data is not None:
+                pipe.xadd(entry.channel + DEAD_LETTER_SUFFIX, {
+                    DATA_FIELD: entry.data, b'id': entry.id, b'group': self.group, b'reason': entry.reason
+                }, maxlen=EVENT_STREAM_MAXLEN, approximate=True)
+            pipe.xack(entry.channel, self.group, entry.id)
+        pipe.execute()
+        for entry in rejected:
+            if entry.data is None:
+                logger.warning(f"Acknowledged {entry.channel} {entry.id}: {entry.reason}")
+            else:
+                logger.error(f"Dead-lettered {entry.channel} {entry.id} for {self.group}: {entry.reason}")
+
+    def ack(self, events: Sequence[Event]) -> int:
+        """Acknowledge a batch: one XACK per stream, in a single round trip."""
+        by_channel: Dict[str, List[str]] = {}
+        for event in events:
+            by_channel.setdefault(event.channel, []).append(event.id)
+        if not by_channel:
+            return 0
+        pipe = self.client.pipeline(transaction=False)
+        for channel, ids in by_channel.items():
+            pipe.xack(channel, self.group, *ids)
+        return sum(pipe.execute())
+
+    def pending(self) -> int:
+        """Entries delivered to this group but not yet acknowledged."""
+        return sum(self.client.xpending(channel, self.group)['pending'] for channel in self.channels)
+
+    def run(self, handler: Callable[[List[Event]], None], stop: Optional[Callable[[], bool]] = None,
+            reclaim_interval: float = 5.0) -> None:
+        """
+        Hand batches to handler and acknowledge each batch once it returns.
+        A batch whose handler raises stays pending and is redelivered through
+        reclaim, here or on another consumer, until its entries reach
+        max_deliveries and are dead-lettered.
+        """
+        last_reclaim = 0.0
+        while not (stop and stop()):
+            events = []
+            if time.monotonic() - last_reclaim >= reclaim_interval:
+                events = self.reclaim()
+                last_reclaim = time.monotonic()
+                if events:
+                    logger.info(f"Reclaimed {len(events)} pending events for {self.group}/{self.name}")
+            if not events:
+                events = self.read()
+            if not events:
+                continue
+            try:
+                handler(events)
+            except Exception as e:
+                logger.error(f"Event handler failed on a batch of {len(events)}; leaving it pending: {e}")
+                continue
+            self.ack(events)
@@ -0,0 +1,179 @@
+"""
+Compact binary encoding for event bus payloads.
+
+Event types are registered with a schema: an id, a version and an ordered
+field list. Encoded events are a version byte followed by a MessagePack
+array [schema id, schema version, field values..., extra fields], so keys
+are not repeated in every message, UUIDs travel as 16 raw bytes and naive
+UTC timestamps as MessagePack timestamps.
+
+Decoding yields the same dict shape the JSON path produced (UUIDs and
+timestamps as strings), unless native=True. Messages that start with '{'
+are legacy JSON and are still decoded, so producers and consumers can be
+upgraded independently.
+
+Schemas evolve by registering a new version with the same id; decoders
+keep every registered version, and encoders write the latest.
+"""
+import json
+import uuid
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Tuple, Union
+
+import msgpack
+
+logger = logging.getLogger(__name__)
+
+# First byte of a binary frame; JSON payloads start with '{'
+CODEC_VERSION = 1
+
+# Field kinds
+STRING = 'str'
+UUID = 'uuid'
+TIMESTAMP = 'timestamp'
+ANY = 'any'  # anything MessagePack can carry: numbers, bools, lists, maps
+
+
+class EventSchema(NamedTuple):
+    event_type: str
+    schema_id: int
+    version: int
+    fields: Tuple[Tuple[str, str], ...]  # (name, kind), in wire order
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(name for name, _ in self.fields)
+
+
+class EventCodecError(ValueError):
+    pass
+
+
+_schemas_by_type: Dict[str, EventSchema] = {}
+_schemas_by_id: Dict[Tuple[int, int], EventSchema] = {}
+
+
+def register_schema(event_type: str, schema_id: int, version: int,
+                    fields: Sequence[Union[str, Tuple[str, str]]]) -> EventSchema:
+    """Register (a version of) an event type's schema. Bare field names are of kind ANY."""
+    schema = EventSchema(
+        event_type, schema_id, version,
+        tuple((f, ANY) if isinstance(f, str) else tuple(f) for f in fields)
+    )
+    existing = _schemas_by_id.get((schema_id, version))
+    if existing is not None and existing != schema:
+        raise EventCodecError(f"Schema {schema_id} v{version} is already registered as {existing.event_type}")
+    _schemas_by_id[(schema_id, version)] = schema
+    current = _schemas_by_type.get(event_type.lower())
+    if current is None or current.version <= version:
+        _schemas_by_type[event_type.lower()] = schema
+    return schema
+
+
+def schema_for(event_type: str) -> Optional[EventSchema]:
+    """Latest schema of an event type (class name or events:<type> channel)."""
+    return _schemas_by_type.get(event_type.lower().rsplit(':', 1)[-1])
+
+
+def _pack_value(kind: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if kind == UUID:
+        if isinstance(value, uuid.UUID):
+            return value.bytes
+        # Only canonical (lower case, hyphenated) strings are packed, so
+        # decoding gives back the same text
+        if isinstance(value, str) and len(value) == 36 and value == value.lower() \
+                and value[8] == value[13] == value[18] == value[23] == '-':
+            try:
+                return bytes.fromhex(value.replace('-', ''))
+            except ValueError:
+                pass
+        return value
+    if kind == TIMESTAMP:
+        if isinstance(value, str):
+            try:
+                parsed = datetime.fromisoformat(value)
+            except ValueError:
+                return value
+            # Packed only when isoformat() reproduces the string exactly
+            return msgpack.Timestamp.from_unix_nano(_unix_nanos(parsed)) if (
+                parsed.tzinfo is None and parsed.isoformat() == value) else value
+        if isinstance(value, datetime) and value.tzinfo is None:
+            return msgpack.Timestamp.from_unix_nano(_unix_nanos(value))
+        return value
+    return value
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _unix_nanos(value: datetime) -> int:
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 10 ** 9 + delta.microseconds * 1000
+
+
+def _unpack_value(kind: str, value: Any, native: bool) -> Any:
+    if kind == UUID and isinstance(value, bytes) and len(value) == 16:
+        if native:
+            return uuid.UUID(bytes=value)
+        text = value.hex()
+        return f"{text[:8]}-{text[8:12]}-{text[12:16]}-{text[16:20]}-{text[20:]}"
+    if kind == TIMESTAMP and isinstance(value, msgpack.Timestamp):
+        parsed = _EPOCH + timedelta(microseconds=value.to_unix_nano() // 1000)
+        return parsed if native else parsed.isoformat()
+    return value
+
+
+def encode(event_type: str, payload: dict) -> bytes:
+    """
+    Encode an event payload. Types without a registered schema, and
+    payloads MessagePack cannot carry, are encoded as JSON.
+    """
+    schema = schema_for(event_type)
+    if schema is None:
+        return json.dumps(payload).encode()
+    values = [_pack_value(kind, payload.get(name)) for name, kind in schema.fields]
+    names = schema.names
+    extra = {key: value for key, value in payload.items() if key not in names}
+    try:
+        body = msgpack.packb([schema.schema_id, schema.version, *values, extra or None], use_bin_type=True)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Falling back to JSON for {event_type}: {e}")
+        return json.dumps(payload).encode()
+    return bytes((CODEC_VERSION,)) + body
+
+
+def decode(data: Union[bytes, str], native: bool = False) -> dict:
+    """Decode a payload written by encode(), or a legacy JSON one."""
+    if isinstance(data, str) or data[:1] == b'{':
+        return json.loads(data)
+    if data[0] != CODEC_VERSION:
+        raise EventCodecError(f"Unsupported event codec version {data[0]}")
+    values = msgpack.unpackb(data[1:], raw=False, timestamp=0)
+    schema = _schemas_by_id.get((values[0], values[1]))
+    if schema is None:
+        raise EventCodecError(f"Unknown event schema {values[0]} v{values[1]}")
+    fields, extra = values[2:-1], values[-1]
+    payload = {
+        name: _unpack_value(kind, value, native)
+        for (name, kind), value in zip(schema.fields, fields) if value is not None
+    }
+    if extra:
+        payload.update(extra)
+    return payload
+
+
+# Platform events. Fields a payload leaves out travel as nil and are left out again on decode.
+register_schema('UserRegisteredEvent', 1, 1, [
+    ('userId', UUID), ('email', STRING), ('role', STRING), ('firstName', STRING), ('lastName', STRING),
+    ('registeredAt', TIMESTAMP), ('metadata', ANY),
+])
+register_schema('PatientDataChangedEvent', 2, 1, [
+    ('patientId', UUID), ('changedAt', TIMESTAMP), ('features', ANY),
+])
+register_schema('ScoreUpdatedEvent', 3, 1, [
+    ('patientId', UUID), ('scoredAt', TIMESTAMP), ('changeEvents', ANY),
+    ('healthScore', ANY), ('healthRiskLevel', STRING), ('mentalRiskScore', ANY), ('mentalRiskLevel', STRING),
+])
@@ -0,0 +1,254 @@
+"""
+Out-of-core training for CompositeHealthScoreModel.
+
+CompositeHealthScoreModel.train needs the whole history as one DataFrame,
+which preprocess_data then copies. train_out_of_core streams the training
+set from chunked Parquet or CSV files instead:
+
+1. scan: one pass fits the scaler with partial_fit, collects the categories
+   of every categorical feature, and samples values for the imputation
+   medians;
+2. transform: a second pass imputes, scales and one-hot encodes each chunk
+   straight into a float32 memory-mapped matrix, with the same columns
+   preprocess_data produces;
+3. fit: the forest is fitted on the memmap with n_jobs across all cores;
+   its worker threads share the mapped pages rather than copying them.
+
+Memory stays bounded by the chunk size plus whatever the forest itself
+needs. Each stage reports its wall-clock time and peak RSS.
+"""
+import os
+import glob
+import time
+import shutil
+import logging
+import tempfile
+import resource
+import threading
+from collections import Counter
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.preprocessing import StandardScaler
+
+logger = logging.getLogger(__name__)
+
+# Rows read per chunk
+HEALTH_TRAINING_CHUNK_ROWS = int(os.getenv('HEALTH_TRAINING_CHUNK_ROWS', '250000'))
+
+# Rows sampled per chunk for the (approximate) imputation medians
+HEALTH_TRAINING_MEDIAN_SAMPLE = int(os.getenv('HEALTH_TRAINING_MEDIAN_SAMPLE', '10000'))
+
+# Where the memory-mapped feature matrix is written; the system temp dir when empty
+HEALTH_TRAINING_WORK_DIR = os.getenv('HEALTH_TRAINING_WORK_DIR', '')
+
+# Forest worker threads; -1 uses every core
+HEALTH_TRAINING_N_JOBS = int(os.getenv('HEALTH_TRAINING_N_JOBS', '-1'))
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return None
+
+
+class StageReport(NamedTuple):
+    stage: str
+    seconds: float
+    peak_rss_mb: float
+    rows: int
+
+
+class StageMonitor:
+    """
+    Times a stage and samples RSS while it runs. Where /proc is missing the
+    peak is the process-lifetime maximum (ru_maxrss).
+    """
+
+    def __init__(self, stage: str, interval: float = 0.05):
+        self.stage = stage
+        self.interval = interval
+        self.rows = 0
+        self.report: Optional[StageReport] = None
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self._peak = max(self._peak, _rss_bytes() or 0)
+
+    def __enter__(self):
+        self._peak = _rss_bytes() or 0
+        self._done = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self._started
+        self._done.set()
+        self._sampler.join()
+        peak = max(self._peak, _rss_bytes() or 0) or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        self.report = StageReport(self.stage, round(seconds, 2), round(peak / 2 ** 20, 1), self.rows)
+        logger.info(f"{self.stage}: {self.rows} rows in {seconds:.1f}s, peak RSS {self.report.peak_rss_mb} MB")
+        return False
+
+
+def training_files(paths: Sequence[str]) -> List[str]:
+    """Expand globs and directories into the Parquet/CSV files to train on, in order."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            path = os.path.join(path, '*')
+        files.extend(sorted(f for f in glob.glob(path) if f.endswith(('.parquet', '.csv', '.csv.gz'))))
+    if not files:
+        raise ValueError(f"No Parquet or CSV training files in {list(paths)}")
+    return files
+
+
+def iter_chunks(files: Sequence[str], columns: Sequence[str],
+                chunk_rows: int = HEALTH_TRAINING_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Stream the given columns from the files, at most chunk_rows rows at a time."""
+    for path in files:
+        if path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            parquet = pq.ParquetFile(path)
+            for batch in parquet.iter_batches(batch_size=chunk_rows, columns=list(columns)):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(path, usecols=list(columns), chunksize=chunk_rows)
+
+
+def _category_label(value):
+    # Whole-number floats (integer columns that held NaN) are named like the integers get_dummies sees at predict time
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+class FeatureStats(NamedTuple):
+    rows: int
+    scaler: StandardScaler
+    medians: Dict[str, float]
+    modes: Dict[str, object]
+    categories: Dict[str, list]  # sorted, as get_dummies orders them
+
+    def columns(self, numerical: Sequence[str], categorical: Sequence[str]) -> List[str]:
+        """Output columns of preprocess_data: numerical features, then dummies without each first category."""
+        return list(numerical) + [
+            f"{feature}_{_category_label(value)}" for feature in categorical for value in self.categories[feature][1:]
+        ]
+
+
+def scan(files: Sequence[str], numerical: Sequence[str], categorical: Sequence[str],
+         chunk_rows: int = HEALTH_TRAINING_CHUNK_ROWS, median_sample: int = HEALTH_TRAINING_MEDIAN_SAMPLE,
+         seed: int = 42) -> FeatureStats:
+    """First pass: scaler statistics, categories and modes, and sampled medians."""
+    rng = np.random.default_rng(seed)
+    scaler = StandardScaler()
+    counts = {feature: Counter() for feature in categorical}
+    samples = []
+    rows = 0
+    for chunk in iter_chunks(files, list(numerical) + list(categorical), chunk_rows):
+        frame = chunk[list(numerical)].astype(np.float64)
+        scaler.partial_fit(frame)  # NaNs are ignored; fitted on a frame so it knows the feature names
+        values = frame.to_numpy()
+        picked = rng.choice(len(values), size=min(median_sample, len(values)), replace=False)
+        samples.append(values[picked])
+        for feature in categorical:
+            counts[feature].update(chunk[feature].dropna().tolist())
+        rows += len(chunk)
+    sample = np.concatenate(samples)
+    medians = dict(zip(numerical, np.nanmedian(sample, axis=0)))
+    modes = {feature: count.most_common(1)[0][0] for feature, count in counts.items() if count}
+    categories = {feature: sorted(counts[feature]) for feature in categorical}
+    return FeatureStats(rows, scaler, medians, modes, categories)
+
+
+def transform_chunk(chunk: pd.DataFrame, stats: FeatureStats, numerical: Sequence[str],
+                    categorical: Sequence[str], out: np.ndarray) -> None:
+    """preprocess_data for one chunk, with training-set medians and categories, written into out."""
+    values = chunk[list(numerical)].astype(np.float64).fillna(stats.medians)
+    out[:, :len(numerical)] = stats.scaler.transform(values)
+    column = len(numerical)
+    for feature in categorical:
+        series = chunk[feature].fillna(stats.modes.get(feature)).to_numpy()
+        for value in stats.categories[feature][1:]:
+            out[:, column] = series == value
+            column += 1
+
+
+class TrainingResult(NamedTuple):
+    estimator: object
+    scaler: StandardScaler
+    columns: List[str]
+    stages: List[StageReport]
+
+
+def train_out_of_core(files: Sequence[str], target: str, numerical: Sequence[str], categorical: Sequence[str],
+                      estimator, chunk_rows: int = HEALTH_TRAINING_CHUNK_ROWS, n_jobs: int = HEALTH_TRAINING_N_JOBS,
+                      work_dir: Optional[str] = None) -> TrainingResult:
+    """
+    Fit a clone of estimator on the training files without loading them
+    whole. The memmapped matrix lives in a scratch directory that is
+    removed afterwards.
+    """
+    files = training_files(files)
+    stages = []
+    with StageMonitor('scan') as monitor:
+        stats = scan(files, numerical, categorical, chunk_rows)
+        monitor.rows = stats.rows
+    stages.append(monitor.report)
+
+    columns = stats.columns(numerical, categorical)
+    scratch = tempfile.mkdtemp(prefix='health-training-', dir=work_dir or HEALTH_TRAINING_WORK_DIR or None)
+    try:
+        # float32 and C order is what the forest fits on, so it uses the memmap without a copy
+        X = np.lib.format.open_memmap(os.path.join(scratch, 'X.npy'), mode='w+', dtype=np.float32,
+                                      shape=(stats.rows, len(columns)))
+        y = np.lib.format.open_memmap(os.path.join(scratch, 'y.npy'), mode='w+', dtype=np.float64,
+                                      shape=(stats.rows,))
+        with StageMonitor('transform') as monitor:
+            start = 0
+            for chunk in iter_chunks(files, list(numerical) + list(categorical) + [target], chunk_rows):
+                end = start + len(chunk)
+                transform_chunk(chunk, stats, numerical, categorical, X[start:end])
+                y[start:end] = chunk[target].to_numpy(dtype=np.float64)
+                start = end
+            X.flush()
+            y.flush()
+            monitor.rows = start
+        stages.append(monitor.report)
+
+        labelled = ~np.isnan(y)
+        if not labelled.all():
+            raise ValueError(f"{int((~labelled).sum())} training rows have no {target}")
+
+        fitted = clone(estimator)
+        if 'n_jobs' in fitted.get_params():
+            fitted.set_params(n_jobs=n_jobs)
+        with StageMonitor('fit') as monitor:
+            fitted.fit(X, y)
+            monitor.rows = stats.rows
+        stages.append(monitor.report)
+        # Fitted on an array, so record the column names predict-time DataFrames are aligned to
+        fitted.feature_names_in_ = np.asarray(columns, dtype=object)
+        del X, y
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return TrainingResult(fitted, stats.scaler, columns, stages)
+
+
+def train_model(model, files: Sequence[str], target: str = 'health_score', **options):
+    """
+    CompositeHealthScoreModel.train from chunked files: the model gets the
+    fitted scaler and forest. Returns the per-stage reports.
+    """
+    result = train_out_of_core(files, target, model.numerical_features, model.categorical_features,
+                               model.model, **options)
+    model.scaler = result.scaler
+    model.model = result.estimator
+    return result.stages
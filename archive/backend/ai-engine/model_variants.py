@@ -0,0 +1,350 @@
+"""
+Reduced-precision variants of the tree models.
+
+CompositeHealthScoreModel (a random forest) and MentalHealthRiskModel
+(gradient boosting, exact or histogram) are compiled into flat node
+arrays that are evaluated for a whole batch at once with numpy. There are
+three variants:
+
+- float64: the compiled trees at full precision. It reproduces the
+  scikit-learn estimator and is the baseline for the report;
+- float32: float32 inputs, thresholds and leaf values. A threshold is
+  rounded down to the nearest float32, so a float32 input takes the same
+  branch it took in the original;
+- quantized: every input is replaced by its bin among the thresholds its
+  feature is split on, as a uint8 or uint16 code, and nodes compare bin
+  indexes. With max_bins=None no split changes. With a cap, features split
+  on more distinct thresholds share bins, which is lossy.
+
+A variant exposes predict/predict_proba, classes_ and feature_names_in_
+like the estimator it replaces, so with_estimator(model, variant) works
+wherever the model did. export_variants also reports score drift against
+the original estimator, plus latency and memory per batch size.
+"""
+import copy
+import time
+import logging
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZES = (1, 64, 1024, 16384)
+
+# Rows traversed at once; bounds the rows x trees node-index scratch arrays
+EVAL_CHUNK_ROWS = 8192
+
+
+class TreeEnsembleVariant:
+    """A tree ensemble flattened into node arrays; leaves point to themselves."""
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, tree_class, tree_depth,
+                 estimator_type, aggregate, link, baseline, scale, input_dtype, classes=None,
+                 feature_names=None, n_features=None, bins=None, name='float64'):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.tree_class = tree_class
+        self.tree_depth = tree_depth  # trees are ordered by depth
+        self._estimator_type = estimator_type
+        self.aggregate = aggregate  # 'mean' (forest) or 'sum' (boosting)
+        self.link = link  # 'identity', 'sigmoid' or 'softmax'
+        self.baseline = baseline
+        self.scale = scale
+        self.input_dtype = np.dtype(input_dtype)
+        self.bins = bins  # per-feature sorted thresholds when quantized
+        self.name = name
+        if classes is not None:
+            self.classes_ = classes
+        if feature_names is not None:
+            self.feature_names_in_ = feature_names
+        self.n_features_in_ = n_features
+        # Sums each class's trees with one matmul
+        self._class_matrix = np.eye(int(tree_class.max()) + 1)[tree_class]
+        # Step d of the traversal only moves trees deeper than d: those from _active_from[d] on
+        self._active_from = np.searchsorted(tree_depth, np.arange(int(tree_depth.max())), side='right')
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.feature, self.threshold, self.left, self.right, self.missing_left, self.value]
+        return sum(a.nbytes for a in arrays) + sum(b.nbytes for b in self.bins or [])
+
+    @property
+    def code_dtype(self) -> np.dtype:
+        return self.threshold.dtype if self.bins is not None else self.input_dtype
+
+    def encode(self, X) -> np.ndarray:
+        """Inputs as this variant compares them: cast to its dtype, or replaced by bin codes."""
+        X = np.asarray(X.to_numpy() if isinstance(X, pd.DataFrame) else X, dtype=self.input_dtype)
+        if self.bins is None:
+            return X
+        if np.isnan(X).any():
+            raise ValueError("Quantized variants need imputed inputs; got NaN")
+        codes = np.empty(X.shape, dtype=self.threshold.dtype)
+        for i, edges in enumerate(self.bins):
+            # Code = thresholds below the value, so value <= threshold k exactly when code <= k
+            codes[:, i] = np.searchsorted(edges, X[:, i], side='left')
+        return codes
+
+    def _leaf_values(self, codes: np.ndarray) -> np.ndarray:
+        # Children interleaved as [left, right] per node: one gather picks the branch
+        if getattr(self, '_children', None) is None:
+            self._children = np.column_stack([self.left, self.right]).ravel()
+        flat = np.ascontiguousarray(codes).ravel()
+        row_offsets = (np.arange(len(codes), dtype=np.int64) * codes.shape[1])[:, None]
+        nodes = np.repeat(self.roots[None, :], len(codes), axis=0)
+        has_missing = self.bins is None and self.missing_left.any()
+        for start in self._active_from:
+            active = nodes[:, start:]
+            x = flat[row_offsets + self.feature[active]]
+            go_right = x > self.threshold[active]
+            if has_missing:
+                go_right &= ~(np.isnan(x) & self.missing_left[active])
+                go_right |= np.isnan(x) & ~self.missing_left[active]
+            nodes[:, start:] = self._children[2 * active + go_right]
+        return self.value[nodes]
+
+    def raw_predict(self, X) -> np.ndarray:
+        """Aggregated tree outputs before the link, one column per class (one for regressors)."""
+        codes = self.encode(X)
+        raw = np.empty((len(codes), self._class_matrix.shape[1]), dtype=np.float64)
+        for start in range(0, len(codes), EVAL_CHUNK_ROWS):
+            leaves = self._leaf_values(codes[start:start + EVAL_CHUNK_ROWS])
+            raw[start:start + len(leaves)] = leaves @ self._class_matrix
+        if self.aggregate == 'mean':
+            raw /= len(self.roots)
+        return raw * self.scale + self.baseline
+
+    def predict_proba(self, X) -> np.ndarray:
+        raw = self.raw_predict(X)
+        if self.link == 'sigmoid':
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        raw -= raw.max(axis=1, keepdims=True)
+        probabilities = np.exp(raw)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def predict(self, X) -> np.ndarray:
+        if self._estimator_type == 'classifier':
+            return self.classes_[self.predict_proba(X).argmax(axis=1)]
+        return self.raw_predict(X)[:, 0]
+
+
+def _sklearn_tree_arrays(tree):
+    t = tree.tree_
+    if t.n_outputs != 1:
+        raise ValueError("Multi-output trees are not supported")
+    missing = getattr(t, 'missing_go_to_left', np.zeros(t.node_count, dtype=np.uint8))
+    return t.feature, t.threshold, t.children_left, t.children_right, missing, t.value[:, 0, 0], t.max_depth
+
+
+def _hist_tree_arrays(predictor):
+    nodes = predictor.nodes
+    if nodes['is_categorical'].any():
+        raise ValueError("Categorical splits are not supported")
+    leaf = nodes['is_leaf'].astype(bool)
+    left = np.where(leaf, -1, nodes['left'].astype(np.int64))
+    right = np.where(leaf, -1, nodes['right'].astype(np.int64))
+    return (nodes['feature_idx'], nodes['num_threshold'], left, right, nodes['missing_go_to_left'],
+            nodes['value'], int(nodes['depth'].max()))
+
+
+def compile_estimator(estimator) -> TreeEnsembleVariant:
+    """Flatten a fitted RandomForestRegressor, GradientBoostingClassifier or HistGradientBoostingClassifier."""
+    kind = type(estimator).__name__
+    if kind == 'RandomForestRegressor':
+        trees = [[_sklearn_tree_arrays(tree) for tree in estimator.estimators_]]
+        aggregate, link, scale, input_dtype = 'mean', 'identity', 1.0, np.float32
+    elif kind == 'GradientBoostingClassifier':
+        trees = [[_sklearn_tree_arrays(tree) for tree in estimator.estimators_[:, k]]
+                 for k in range(estimator.estimators_.shape[1])]
+        aggregate, scale, input_dtype = 'sum', estimator.learning_rate, np.float32
+        link = 'sigmoid' if len(trees) == 1 else 'softmax'
+    elif kind == 'HistGradientBoostingClassifier':
+        per_class = len(estimator._predictors[0])
+        trees = [[_hist_tree_arrays(stage[k]) for stage in estimator._predictors] for k in range(per_class)]
+        aggregate, scale, input_dtype = 'sum', 1.0, np.float64
+        link = 'sigmoid' if per_class == 1 else 'softmax'
+    else:
+        raise ValueError(f"Cannot compile {kind}")
+
+    # Concatenate every tree's nodes, shallowest tree first, offsetting child
+    # indexes; leaves loop onto themselves
+    ordered = sorted(((tree[-1], k, tree) for k, class_trees in enumerate(trees) for tree in class_trees),
+                     key=lambda entry: entry[0])
+    parts = {name: [] for name in ('feature', 'threshold', 'left', 'right', 'missing', 'value')}
+    roots, tree_class, tree_depth, offset = [], [], [], 0
+    for depth, k, (feature, threshold, left, right, missing, value, _) in ordered:
+        n = len(feature)
+        ids = np.arange(offset, offset + n)
+        leaf = np.asarray(left) < 0
+        parts['feature'].append(np.where(leaf, 0, feature))
+        parts['threshold'].append(np.where(leaf, np.inf, threshold))
+        parts['left'].append(np.where(leaf, ids, np.asarray(left) + offset))
+        parts['right'].append(np.where(leaf, ids, np.asarray(right) + offset))
+        parts['missing'].append(np.asarray(missing, dtype=bool))
+        parts['value'].append(np.asarray(value, dtype=np.float64))
+        roots.append(offset)
+        tree_class.append(k)
+        tree_depth.append(depth)
+        offset += n
+    arrays = {name: np.concatenate(values) for name, values in parts.items()}
+
+    n_features = estimator.n_features_in_
+    variant = TreeEnsembleVariant(
+        arrays['feature'].astype(np.int32), arrays['threshold'].astype(np.float64),
+        arrays['left'].astype(np.int32), arrays['right'].astype(np.int32), arrays['missing'], arrays['value'],
+        np.asarray(roots, dtype=np.int32), np.asarray(tree_class, dtype=np.int32), np.asarray(tree_depth),
+        'regressor' if kind == 'RandomForestRegressor' else 'classifier', aggregate, link,
+        np.zeros(len(trees)), scale, input_dtype, getattr(estimator, 'classes_', None),
+        getattr(estimator, 'feature_names_in_', None), n_features
+    )
+    if aggregate == 'sum':
+        # The boosting baseline (init prediction) is whatever decision_function adds to the trees
+        probe = np.zeros((1, n_features))
+        if getattr(estimator, 'feature_names_in_', None) is not None:
+            probe = pd.DataFrame(probe, columns=estimator.feature_names_in_)
+        reference = np.asarray(estimator.decision_function(probe), dtype=np.float64).reshape(1, -1)
+        variant.baseline = (reference - variant.raw_predict(probe))[0]
+    return variant
+
+
+def to_float32(variant: TreeEnsembleVariant) -> TreeEnsembleVariant:
+    """float32 inputs, thresholds and leaf values."""
+    threshold = variant.threshold.astype(np.float32)
+    # Round thresholds down, so float32 inputs split as they do against the float64 threshold
+    above = threshold.astype(np.float64) > variant.threshold
+    threshold[above] = np.nextafter(threshold[above], np.float32(-np.inf))
+    result = copy.copy(variant)
+    result.threshold = threshold
+    result.value = variant.value.astype(np.float32)
+    result.input_dtype = np.dtype(np.float32)
+    result.name = 'float32'
+    return result
+
+
+def quantize(variant: TreeEnsembleVariant, max_bins: Optional[int] = None) -> TreeEnsembleVariant:
+    """
+    Bin codes instead of values. Codes are uint8 when every feature has at
+    most 255 thresholds, uint16 otherwise; max_bins caps the thresholds per
+    feature by merging neighbouring ones (lossy).
+    """
+    split = variant.left != np.arange(len(variant.left))
+    bins = []
+    ranks = np.full(len(variant.threshold), np.iinfo(np.uint16).max, dtype=np.int64)
+    for i in range(variant.n_features_in_):
+        nodes = np.flatnonzero(split & (variant.feature == i))
+        edges = np.unique(variant.threshold[nodes])
+        if max_bins is not None and len(edges) > max_bins:
+            # Keep evenly spaced thresholds and snap every split to its nearest kept one
+            kept = edges[np.unique(np.linspace(0, len(edges) - 1, max_bins).round().astype(int))]
+            nearest = np.clip(np.searchsorted(kept, edges), 1, len(kept) - 1)
+            nearest -= (edges - kept[nearest - 1]) < (kept[nearest] - edges)
+            lookup = dict(zip(edges, kept[nearest]))
+            edges = kept
+            ranks[nodes] = np.searchsorted(edges, [lookup[t] for t in variant.threshold[nodes]])
+        else:
+            ranks[nodes] = np.searchsorted(edges, variant.threshold[nodes])
+        bins.append(edges)
+    widest = max((len(edges) for edges in bins), default=0)
+    # n thresholds give codes 0..n, and leaves need the top code to themselves
+    if widest > np.iinfo(np.uint16).max:
+        raise ValueError(f"A feature has {widest} thresholds; set max_bins to quantize")
+    code_dtype = np.uint8 if widest <= np.iinfo(np.uint8).max else np.uint16
+    # Leaves compare against the largest code, so they always "go left" onto themselves
+    ranks[~split] = np.iinfo(code_dtype).max
+    result = copy.copy(variant)
+    result.threshold = ranks.astype(code_dtype)
+    result.value = variant.value.astype(np.float32)
+    result.bins = bins
+    result.name = f"quantized_{np.dtype(code_dtype).name}" if max_bins is None else f"quantized_{max_bins}_bins"
+    return result
+
+
+def with_estimator(model, estimator):
+    """Shallow copy of a model (CompositeHealthScoreModel, MentalHealthRiskModel) predicting with estimator."""
+    variant = copy.copy(model)
+    variant.model = estimator
+    return variant
+
+
+def _outputs(estimator, X) -> np.ndarray:
+    if hasattr(estimator, 'classes_'):
+        return estimator.predict_proba(X)
+    return estimator.predict(X)
+
+
+def _median_seconds(fn, X, batch_size: int, min_seconds: float) -> float:
+    batch = X.iloc[:batch_size] if isinstance(X, pd.DataFrame) else X[:batch_size]
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < 3 or time.perf_counter() - started < min_seconds:
+        t = time.perf_counter()
+        fn(batch)
+        timings.append(time.perf_counter() - t)
+    return float(np.median(timings))
+
+
+def variant_report(estimator, variants: Sequence, X, batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES,
+                   min_seconds: float = 0.2) -> pd.DataFrame:
+    """
+    Drift and speed of each variant against the original estimator on X
+    (preprocessed rows, ideally a recent production sample).
+    """
+    reference = _outputs(estimator, X)
+    classifier = reference.ndim == 2
+    rows = []
+    for variant in [estimator, *variants]:
+        name = getattr(variant, 'name', 'sklearn')
+        outputs = reference if variant is estimator else _outputs(variant, X)
+        drift = np.abs(outputs - reference)
+        row = {
+            'variant': name,
+            'model_mb': round(getattr(variant, 'nbytes', _estimator_nbytes(estimator)) / 2 ** 20, 2),
+            'input_bytes_per_row': X.shape[1] * (np.dtype(variant.code_dtype).itemsize
+                                                 if hasattr(variant, 'code_dtype') else 8),
+            'max_abs_drift': float(drift.max()),
+            'mean_abs_drift': float(drift.mean()),
+        }
+        if classifier:
+            row['label_agreement'] = float((outputs.argmax(axis=1) == reference.argmax(axis=1)).mean())
+        predict = variant.predict_proba if classifier else variant.predict
+        for batch_size in batch_sizes:
+            seconds = _median_seconds(predict, X, batch_size, min_seconds)
+            row[f'ms_per_batch_{batch_size}'] = round(seconds * 1000, 3)
+            row[f'rows_per_sec_{batch_size}'] = round(min(batch_size, len(X)) / seconds)
+        rows.append(row)
+    return pd.DataFrame(rows).set_index('variant')
+
+
+def _estimator_nbytes(estimator) -> int:
+    import pickle
+    return len(pickle.dumps(estimator, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def build_variants(estimator, max_bins: Optional[Sequence[Optional[int]]] = (None, 255)) -> List[TreeEnsembleVariant]:
+    """The float64, float32 and quantized variants of an estimator (one quantized per max_bins entry)."""
+    compiled = compile_estimator(estimator)
+    return [compiled, to_float32(compiled)] + [quantize(compiled, bins) for bins in max_bins]
+
+
+def export_variants(model, X: pd.DataFrame, batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES,
+                    max_bins: Sequence[Optional[int]] = (None, 255)):
+    """
+    Variants of a model plus their report, measured on raw patient rows X
+    (preprocessed with the model). Returns ({variant name: model copy}, report).
+    """
+    processed = model.preprocess_data(X[model.feature_names])
+    fitted_columns = getattr(model.model, 'feature_names_in_', None)
+    if fitted_columns is not None:
+        processed = processed.reindex(columns=fitted_columns, fill_value=0)
+    variants = build_variants(model.model, max_bins)
+    report = variant_report(model.model, variants, processed, batch_sizes)
+    logger.info(f"{type(model).__name__} variants:\n{report.to_string()}")
+    return {variant.name: with_estimator(model, variant) for variant in variants}, report
@@ -0,0 +1,85 @@
+"""
+Omics-derived patient features for batch scoring.
+
+The OmicsImporter turns every import into compact per-patient feature
+vectors (marker-gene panel scores and coverage) and keeps them in its
+feature store. This module loads them as one contiguous float32 matrix, so
+scoring jobs never parse raw omics files.
+"""
+import io
+import os
+import logging
+from typing import List, NamedTuple, Optional, Sequence
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+OMICS_IMPORTER_URL = os.getenv('OMICS_IMPORTER_URL', 'http://omics-importer:8000')
+OMICS_FEATURES_TIMEOUT = float(os.getenv('OMICS_FEATURES_TIMEOUT', '30'))
+
+# Prefix of omics columns when joined to patient data, so they never collide with model inputs
+OMICS_FEATURE_PREFIX = 'omics_'
+
+
+class OmicsFeatureMatrix(NamedTuple):
+    feature_set: str
+    feature_names: List[str]
+    patient_ids: List[str]
+    file_ids: List[int]
+    matrix: np.ndarray  # float32, patients x features, NaN where missing
+
+    def to_frame(self, prefix=OMICS_FEATURE_PREFIX):
+        """Patient-indexed DataFrame view of the matrix (no copy)."""
+        return pd.DataFrame(
+            self.matrix,
+            index=pd.Index(self.patient_ids, name='patient_id'),
+            columns=[prefix + name for name in self.feature_names],
+            copy=False
+        )
+
+
+def load_feature_matrix(patient_ids: Optional[Sequence[str]] = None, feature_set: Optional[str] = None,
+                        file_ids: Optional[Sequence[int]] = None, latest: bool = True,
+                        base_url: Optional[str] = None) -> OmicsFeatureMatrix:
+    """
+    Fetch stored omics feature vectors from the OmicsImporter, one row per
+    patient (their most recent import unless latest is False).
+    """
+    params = {'format': 'npz', 'latest': str(latest).lower()}
+    if patient_ids is not None:
+        params['patients'] = ','.join(patient_ids)
+    if feature_set is not None:
+        params['feature_set'] = feature_set
+    if file_ids is not None:
+        params['file_ids'] = ','.join(str(file_id) for file_id in file_ids)
+    url = f"{(base_url or OMICS_IMPORTER_URL).rstrip('/')}/features/matrix?{urlencode(params)}"
+    with urlopen(url, timeout=OMICS_FEATURES_TIMEOUT) as response:
+        feature_set = response.headers.get('X-Feature-Set', feature_set)
+        payload = response.read()
+    return read_feature_matrix(payload, feature_set)
+
+
+def read_feature_matrix(payload: bytes, feature_set: Optional[str] = None) -> OmicsFeatureMatrix:
+    with np.load(io.BytesIO(payload), allow_pickle=False) as arrays:
+        result = OmicsFeatureMatrix(
+            feature_set=feature_set,
+            feature_names=arrays['feature_names'].tolist(),
+            patient_ids=arrays['patient_ids'].tolist(),
+            file_ids=arrays['file_ids'].tolist(),
+            matrix=np.ascontiguousarray(arrays['matrix'], dtype=np.float32)
+        )
+    logger.info(f"Loaded omics features {result.matrix.shape} for feature set {result.feature_set}")
+    return result
+
+
+def join_omics_features(patients: pd.DataFrame, features: OmicsFeatureMatrix,
+                        patient_column: str = 'patient_id') -> pd.DataFrame:
+    """
+    Append omics feature columns to a batch of patient records. Patients
+    without omics data get NaN features.
+    """
+    return patients.join(features.to_frame(), on=patient_column)
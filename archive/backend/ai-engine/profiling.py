@@ -0,0 +1,104 @@
+"""
+Opt-in sampling profiler for ai-engine requests.
+
+With PROFILING_ENABLED, a request is profiled when it sends X-Profile with
+a valid X-Profile-Token, or at random for a PROFILING_SAMPLE_RATE share of
+requests. A background thread then samples the stack of the thread handling
+the request every PROFILING_INTERVAL seconds (widening the interval to keep
+its own CPU use under PROFILING_MAX_OVERHEAD), and the samples are stored as
+folded stacks under PROFILING_DIR, named by time and X-Request-ID:
+
+    curl -H 'X-Profile: 1' -H "X-Profile-Token: $TOKEN" -H 'X-Request-ID: slow-1' ...
+    curl -H "X-Profile-Token: $TOKEN" localhost/debug/profiles
+    curl -H "X-Profile-Token: $TOKEN" localhost/debug/profiles/<id> | flamegraph.pl > slow.svg
+
+The response of a profiled request carries its X-Profile-Id. At most
+PROFILING_MAX_CONCURRENT requests are profiled at once, each for at most
+PROFILING_MAX_SECONDS, and the oldest profiles are deleted once
+PROFILING_MAX_FILES or PROFILING_MAX_BYTES is exceeded. Samples are taken
+between bytecodes, so time inside one long native call (an sklearn fit or
+predict) is attributed to the Python line that made it.
+
+Only the Flask hooks are here. The sampler is profiling_sampler.py, a
+verbatim copy of the OmicsImporter's app/utils/sampling.py; change that
+file and copy it over rather than editing the copy.
+"""
+import os
+import logging
+import tempfile
+import threading
+
+from profiling_sampler import (
+    PROFILE_HEADER, PROFILE_ID_HEADER, PROFILE_TOKEN_HEADER, PROFILING_ENABLED, PROFILING_TOKEN,
+    Profile, ProfileStore, profile_trigger, sampler, token_valid,
+)
+
+logger = logging.getLogger(__name__)
+
+PROFILING_DIR = os.getenv('PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'ai-engine-profiles'))
+
+store = ProfileStore(PROFILING_DIR)
+
+
+def profile_requests(app, path: str = '/debug/profiles'):
+    """
+    Profile requests of a Flask app, and serve the stored profiles on GET
+    path (a list, newest first) and GET path/<id> (folded stacks), both
+    behind X-Profile-Token.
+    """
+    if not PROFILING_ENABLED:
+        return app
+    from flask import Response, abort, g, jsonify, request
+
+    @app.before_request
+    def _start_profile():
+        trigger = profile_trigger(request.headers.get(PROFILE_HEADER), request.headers.get(PROFILE_TOKEN_HEADER))
+        if trigger is None:
+            return
+        profile = Profile(request.headers.get('X-Request-ID'), f'{request.method} {request.path}', trigger)
+        profile.attach(threading.get_ident())
+        if sampler.start(profile):
+            g.profile = profile
+
+    @app.after_request
+    def _tag_profiled_response(response):
+        profile = g.get('profile')
+        if profile is not None:
+            response.headers[PROFILE_ID_HEADER] = profile.id
+            g.profile_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _save_profile(exc):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return
+        sampler.stop(profile)
+        try:
+            if store.save(profile, g.pop('profile_status', 500)):
+                logger.info(f"Profiled {profile.label} ({profile.trigger}): {profile.samples} samples as {profile.id}")
+        except OSError as e:
+            logger.warning(f"Could not store profile {profile.id}: {e}")
+
+    def _require_token():
+        if not PROFILING_TOKEN:
+            abort(404)
+        if not token_valid(request.headers.get(PROFILE_TOKEN_HEADER)):
+            abort(403)
+
+    @app.route(path, methods=['GET'])
+    def list_profiles():
+        _require_token()
+        return jsonify(store.list()), 200
+
+    @app.route(f'{path}/<profile_id>', methods=['GET'])
+    def download_profile(profile_id):
+        _require_token()
+        profile_path = store.path(profile_id)
+        if profile_path is None:
+            abort(404)
+        with open(profile_path) as f:
+            return Response(f.read(), mimetype='text/plain',
+                            headers={'Content-Disposition': f'attachment; filename="{profile_id}.collapsed"'})
+
+    return app
@@ -0,0 +1,163 @@
+"""
+Faster training modes for MentalHealthRiskModel.
+
+MentalHealthRiskModel.train fits an exact-split GradientBoostingClassifier
+from scratch, which scales with rows x trees x features on a single core.
+fit_hist swaps in a HistGradientBoostingClassifier instead:
+
+- features are binned into at most 255 buckets, so finding a split costs
+  the same whatever the row count;
+- boosting stops once the loss on a held-out validation split has not
+  improved for RISK_HIST_N_ITER_NO_CHANGE iterations;
+- trees are built on all cores (OpenMP; cap with OMP_NUM_THREADS).
+
+refresh continues a fitted histogram model on newly labelled rows with
+warm_start, adding up to RISK_REFRESH_ITER trees rather than retraining on
+the full history. The scaler fitted at training time is kept, so the
+thresholds of the earlier trees stay valid.
+
+Both operate on the frame MentalHealthRiskModel.preprocess_data produces,
+so predict() and the scoring worker use the result unchanged.
+"""
+import os
+import time
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
+from sklearn.metrics import accuracy_score, balanced_accuracy_score, f1_score, log_loss
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on boosting iterations; early stopping usually ends well before
+RISK_HIST_MAX_ITER = int(os.getenv('RISK_HIST_MAX_ITER', '500'))
+
+RISK_HIST_LEARNING_RATE = float(os.getenv('RISK_HIST_LEARNING_RATE', '0.1'))
+
+# Share of the training rows held out to decide when to stop
+RISK_HIST_VALIDATION_FRACTION = float(os.getenv('RISK_HIST_VALIDATION_FRACTION', '0.1'))
+
+# Iterations without validation improvement before boosting stops
+RISK_HIST_N_ITER_NO_CHANGE = int(os.getenv('RISK_HIST_N_ITER_NO_CHANGE', '10'))
+
+# Trees a refresh may add on top of the fitted model
+RISK_REFRESH_ITER = int(os.getenv('RISK_REFRESH_ITER', '50'))
+
+TRAINING_MODES = ('exact', 'hist')
+
+
+def make_hist_classifier(**params) -> HistGradientBoostingClassifier:
+    """Histogram GBDT with early stopping on a validation split; params override the defaults."""
+    defaults = dict(
+        max_iter=RISK_HIST_MAX_ITER,
+        learning_rate=RISK_HIST_LEARNING_RATE,
+        early_stopping=True,
+        validation_fraction=RISK_HIST_VALIDATION_FRACTION,
+        n_iter_no_change=RISK_HIST_N_ITER_NO_CHANGE,
+        random_state=42
+    )
+    defaults.update(params)
+    return HistGradientBoostingClassifier(**defaults)
+
+
+def fit_estimator(X, y, mode: str = 'hist', estimator=None, **params):
+    """
+    Fit a classifier on already preprocessed features. mode 'exact' fits a
+    clone of estimator (or a GradientBoostingClassifier built from params),
+    'hist' a histogram GBDT.
+    """
+    if mode not in TRAINING_MODES:
+        raise ValueError(f"Unknown training mode {mode!r}; expected one of {TRAINING_MODES}")
+    if mode == 'exact':
+        estimator = clone(estimator) if estimator is not None else GradientBoostingClassifier(**{'random_state': 42, **params})
+    else:
+        estimator = make_hist_classifier(**params)
+    started = time.perf_counter()
+    estimator.fit(X, y)
+    logger.info(
+        f"Fitted {type(estimator).__name__} on {len(y)} rows in {time.perf_counter() - started:.1f}s"
+        + (f" ({estimator.n_iter_} iterations)" if mode == 'hist' else '')
+    )
+    return estimator
+
+
+def refresh_estimator(estimator: HistGradientBoostingClassifier, X, y,
+                      extra_iter: int = RISK_REFRESH_ITER) -> HistGradientBoostingClassifier:
+    """
+    Continue boosting a fitted histogram model on new rows (warm start).
+    The rows must cover every class the model knows: mix a sample of
+    earlier rows into small batches of new labels.
+    """
+    if not isinstance(estimator, HistGradientBoostingClassifier):
+        raise ValueError(f"Only histogram models can be refreshed, not {type(estimator).__name__}; retrain with fit_hist")
+    classes = np.unique(y)
+    if not np.array_equal(classes, estimator.classes_):
+        raise ValueError(f"Refresh data has classes {classes.tolist()}, the model {estimator.classes_.tolist()}")
+    fitted_iter = estimator.n_iter_
+    estimator.set_params(warm_start=True, max_iter=fitted_iter + extra_iter)
+    started = time.perf_counter()
+    estimator.fit(X, y)
+    logger.info(
+        f"Refreshed on {len(y)} rows in {time.perf_counter() - started:.1f}s: "
+        f"{fitted_iter} -> {estimator.n_iter_} iterations"
+    )
+    return estimator
+
+
+def _processed(model, X: pd.DataFrame) -> pd.DataFrame:
+    """Preprocess with the model's fitted scaler, aligned to the columns its estimator was fitted on."""
+    processed = model.preprocess_data(X[model.feature_names])
+    fitted_columns = getattr(model.model, 'feature_names_in_', None)
+    if fitted_columns is not None:
+        processed = processed.reindex(columns=fitted_columns, fill_value=0)
+    return processed
+
+
+def fit_hist(model, X_train: pd.DataFrame, y_train, **params):
+    """MentalHealthRiskModel.train with a histogram GBDT; returns the model."""
+    model.scaler.fit(X_train[model.numerical_features])
+    model.model = fit_estimator(model.preprocess_data(X_train[model.feature_names]), y_train, 'hist', **params)
+    return model
+
+
+def refresh(model, X_new: pd.DataFrame, y_new, extra_iter: int = RISK_REFRESH_ITER):
+    """Add trees fitted on newly labelled rows to a model trained with fit_hist; returns the model."""
+    model.model = refresh_estimator(model.model, _processed(model, X_new), y_new, extra_iter)
+    return model
+
+
+def evaluate(estimator, X, y) -> Dict[str, float]:
+    """Holdout metrics reported for every training mode."""
+    probabilities = estimator.predict_proba(X)
+    predicted = estimator.classes_[probabilities.argmax(axis=1)]
+    return {
+        'accuracy': round(accuracy_score(y, predicted), 4),
+        'balanced_accuracy': round(balanced_accuracy_score(y, predicted), 4),
+        'macro_f1': round(f1_score(y, predicted, average='macro'), 4),
+        'log_loss': round(log_loss(y, probabilities, labels=estimator.classes_), 4),
+    }
+
+
+def compare(model, X_train: pd.DataFrame, y_train, X_test: pd.DataFrame, y_test,
+            hist_params: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Train the exact GBDT (a clone of the model's, when it has one) and a
+    histogram GBDT on the same rows; returns fit time and holdout metrics
+    side by side, one row per mode.
+    """
+    model.scaler.fit(X_train[model.numerical_features])
+    train = model.preprocess_data(X_train[model.feature_names])
+    test = model.preprocess_data(X_test[model.feature_names]).reindex(columns=train.columns, fill_value=0)
+    current = model.model if isinstance(model.model, GradientBoostingClassifier) else None
+    rows = {}
+    for mode in TRAINING_MODES:
+        started = time.perf_counter()
+        if mode == 'exact':
+            estimator = fit_estimator(train, y_train, mode, estimator=current)
+        else:
+            estimator = fit_estimator(train, y_train, mode, **(hist_params or {}))
+        rows[mode] = {'fit_seconds': round(time.perf_counter() - started, 2), **evaluate(estimator, test, y_test)}
+    return pd.DataFrame.from_dict(rows, orient='index').rename_axis('mode')
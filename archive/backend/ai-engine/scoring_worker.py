@@ -0,0 +1,324 @@
+"""
+Event-driven scoring worker.
+
+Subscribes to PatientDataChangedEvent on the event bus and recomputes
+scores only for the patients whose data changed:
+
+- events are debounced per patient, so a burst of changes to one patient
+  is scored once, SCORING_DEBOUNCE_SECONDS after the last change (and no
+  later than SCORING_MAX_DELAY_SECONDS after the first);
+- due patients are scored together, up to SCORING_BATCH_SIZE at a time,
+  with one vectorized pass of CompositeHealthScoreModel and
+  MentalHealthRiskModel each;
+- a ScoreUpdatedEvent is published per patient, and the patient's events
+  are acknowledged only after that, so a crashed worker's patients are
+  reclaimed and rescored by another.
+
+    python scoring_worker.py --redis-url redis://localhost:6379/0
+
+Patient features come from a loader: a callable taking the due patients
+(patient id -> their change events) and returning a patient-indexed
+DataFrame. The default merges the `features` carried by each patient's
+events, later values winning, and with SCORING_OMICS_FEATURES joins each
+patient's latest omics feature vector from the OmicsImporter as omics_*
+columns. Patients no model has the features for are acknowledged without
+a ScoreUpdatedEvent.
+"""
+import os
+import time
+import logging
+import argparse
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import telemetry
+from event_bus import Event, StreamEventBus, REDIS_URL
+from omics_features import join_omics_features, load_feature_matrix
+
+logger = logging.getLogger(__name__)
+
+PATIENT_DATA_CHANGED = 'PatientDataChangedEvent'
+SCORE_UPDATED = 'ScoreUpdatedEvent'
+
+SCORING_GROUP = os.getenv('SCORING_GROUP', 'scoring-worker')
+
+# Quiet period after a patient's last change before they are scored
+SCORING_DEBOUNCE_SECONDS = float(os.getenv('SCORING_DEBOUNCE_SECONDS', '5'))
+
+# A patient that keeps changing is still scored this long after the first change
+SCORING_MAX_DELAY_SECONDS = float(os.getenv('SCORING_MAX_DELAY_SECONDS', '30'))
+
+# Patients scored per vectorized model pass
+SCORING_BATCH_SIZE = int(os.getenv('SCORING_BATCH_SIZE', '500'))
+
+HEALTH_SCORE_MODEL_PATH = os.getenv('HEALTH_SCORE_MODEL_PATH', 'models/composite_health_score.joblib')
+MENTAL_RISK_MODEL_PATH = os.getenv('MENTAL_RISK_MODEL_PATH', 'models/mental_health_risk.joblib')
+
+# Join the OmicsImporter's per-patient feature vectors (omics_* columns) to every batch
+SCORING_OMICS_FEATURES = os.getenv('SCORING_OMICS_FEATURES', 'true').lower() not in ('0', 'false', 'no')
+
+# Port of the worker's GET /metrics endpoint; 0 disables it
+SCORING_METRICS_PORT = int(os.getenv('SCORING_METRICS_PORT', '9108'))
+
+RISK_LEVELS = np.array(['low', 'moderate', 'high', 'critical'])
+
+# Score of each risk level, as in utils.metrics.calculate_risk_score
+RISK_LEVEL_WEIGHTS = np.array([12.5, 37.5, 62.5, 87.5])
+
+DOMAINS = ('cardiovascular', 'metabolic', 'respiratory', 'mental')
+
+
+def _model_input(model, frame: pd.DataFrame) -> pd.DataFrame:
+    """Preprocess a batch and align its one-hot columns with those the estimator was fitted on."""
+    processed = model.preprocess_data(frame[model.feature_names])
+    fitted_columns = getattr(model.model, 'feature_names_in_', None)
+    if fitted_columns is not None:
+        processed = processed.reindex(columns=fitted_columns, fill_value=0)
+    return processed
+
+
+def health_risk_levels(scores: np.ndarray) -> np.ndarray:
+    """Vectorized CompositeHealthScoreModel._score_to_risk_level."""
+    return np.select([scores >= 80, scores >= 60, scores >= 40], ['low', 'moderate', 'high'], 'critical')
+
+
+def predict_health_scores(model, frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    CompositeHealthScoreModel.predict for a whole batch: one estimator call,
+    blended with the weighted domain scores the same way.
+    """
+    name = type(model).__name__
+    with telemetry.model_stage(name, 'preprocess', len(frame)):
+        X = _model_input(model, frame)
+    with telemetry.model_stage(name, 'inference'):
+        model_scores = model.model.predict(X)
+    with telemetry.model_stage(name, 'postprocess'):
+        weighted = sum(frame[f'{domain}_score'].to_numpy(dtype=float) * model.domain_weights[domain] for domain in DOMAINS)
+        scores = np.clip(0.7 * model_scores + 0.3 * weighted, 0, 100)
+        return pd.DataFrame(
+            {'health_score': np.round(scores, 1), 'health_risk_level': health_risk_levels(scores)},
+            index=frame.index
+        )
+
+
+def predict_mental_risk(model, frame: pd.DataFrame) -> pd.DataFrame:
+    """MentalHealthRiskModel.predict for a whole batch: one predict_proba call."""
+    name = type(model).__name__
+    with telemetry.model_stage(name, 'preprocess', len(frame)):
+        X = _model_input(model, frame)
+    with telemetry.model_stage(name, 'inference'):
+        probabilities = model.model.predict_proba(X)
+    with telemetry.model_stage(name, 'postprocess'):
+        classes = np.asarray(model.model.classes_, dtype=int)
+        scores = np.clip(probabilities @ RISK_LEVEL_WEIGHTS[classes], 0, 100)
+        return pd.DataFrame(
+            {'mental_risk_score': np.round(scores, 1), 'mental_risk_level': RISK_LEVELS[classes[probabilities.argmax(axis=1)]]},
+            index=frame.index
+        )
+
+
+def score_patients(frame: pd.DataFrame, health_model=None, mental_model=None) -> pd.DataFrame:
+    """
+    Score a patient-indexed batch with each model. A model only sees the
+    patients that have all of its features; the others get NaN.
+    """
+    results = pd.DataFrame(index=frame.index)
+    for model, predict in ((health_model, predict_health_scores), (mental_model, predict_mental_risk)):
+        if model is None:
+            continue
+        missing = [f for f in model.feature_names if f not in frame.columns]
+        if missing:
+            logger.warning(f"{type(model).__name__}: no patient has {missing}; skipping")
+            continue
+        complete = frame[model.feature_names].notna().all(axis=1)
+        if complete.any():
+            results = results.join(predict(model, frame[complete]))
+    return results
+
+
+class PendingPatient(NamedTuple):
+    first_seen: float
+    last_seen: float
+    events: List[Event]
+
+
+class PatientDebouncer:
+    """Collects change events per patient until the patient has been quiet long enough."""
+
+    def __init__(self, debounce: float = SCORING_DEBOUNCE_SECONDS, max_delay: float = SCORING_MAX_DELAY_SECONDS):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.pending: Dict[str, PendingPatient] = {}
+
+    def add(self, patient_id: str, event: Event, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        current = self.pending.get(patient_id)
+        if current is None:
+            self.pending[patient_id] = PendingPatient(now, now, [event])
+        else:
+            current.events.append(event)
+            self.pending[patient_id] = current._replace(last_seen=now)
+
+    def due(self, now: Optional[float] = None, limit: Optional[int] = None) -> Dict[str, List[Event]]:
+        """Remove and return the patients ready to score, longest waiting first."""
+        now = time.monotonic() if now is None else now
+        ready = [
+            patient_id for patient_id, p in self.pending.items()
+            if now - p.last_seen >= self.debounce or now - p.first_seen >= self.max_delay
+        ]
+        ready.sort(key=lambda patient_id: self.pending[patient_id].first_seen)
+        return {patient_id: self.pending.pop(patient_id).events for patient_id in ready[:limit]}
+
+    def next_due_in(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the next patient is due, or None when nothing is pending."""
+        if not self.pending:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(
+            min(p.last_seen + self.debounce, p.first_seen + self.max_delay) for p in self.pending.values()
+        ) - now)
+
+    def __len__(self):
+        return len(self.pending)
+
+
+def features_from_events(patients: Dict[str, List[Event]]) -> pd.DataFrame:
+    """Default loader: merge the features carried by each patient's events, later values winning."""
+    rows = {}
+    for patient_id, events in patients.items():
+        merged = {}
+        for event in sorted(events, key=lambda e: tuple(int(part) for part in e.id.split('-'))):
+            merged.update(event.data.get('features') or {})
+        rows[patient_id] = merged
+    return pd.DataFrame.from_dict(rows, orient='index').rename_axis('patient_id')
+
+
+def features_with_omics(patients: Dict[str, List[Event]]) -> pd.DataFrame:
+    """
+    Loader: the event features joined with each patient's latest omics
+    feature vector, fetched for the whole batch in one request. Patients
+    without omics data get NaN; the batch is scored without omics columns
+    when the OmicsImporter cannot be reached.
+    """
+    frame = features_from_events(patients)
+    try:
+        omics = load_feature_matrix(patient_ids=list(frame.index))
+    except Exception as e:
+        logger.warning(f"Scoring {len(frame)} patients without omics features: {e}")
+        return frame
+    return join_omics_features(frame, omics)
+
+
+def load_models(health_path: str = HEALTH_SCORE_MODEL_PATH, mental_path: str = MENTAL_RISK_MODEL_PATH):
+    from health_score_model import CompositeHealthScoreModel
+    from risk_model import MentalHealthRiskModel
+    return CompositeHealthScoreModel(health_path), MentalHealthRiskModel(mental_path)
+
+
+class ScoringWorker:
+    """Consumes patient change events and publishes recomputed scores."""
+
+    def __init__(self, bus: StreamEventBus, health_model=None, mental_model=None,
+                 loader: Optional[Callable[[Dict[str, List[Event]]], pd.DataFrame]] = None,
+                 group: str = SCORING_GROUP, consumer_name: Optional[str] = None,
+                 batch_size: int = SCORING_BATCH_SIZE, debouncer: Optional[PatientDebouncer] = None,
+                 **consumer_options):
+        self.bus = bus
+        self.health_model = health_model
+        self.mental_model = mental_model
+        self.loader = loader or (features_with_omics if SCORING_OMICS_FEATURES else features_from_events)
+        self.batch_size = batch_size
+        self.debouncer = debouncer if debouncer is not None else PatientDebouncer()
+        self.consumer = bus.consumer([PATIENT_DATA_CHANGED], group, consumer_name, start_id='0', **consumer_options)
+        self.stats = {'events': 0, 'patients_scored': 0, 'batches': 0, 'failed_batches': 0}
+
+    def collect(self, events: Sequence[Event], now: Optional[float] = None) -> None:
+        for event in events:
+            patient_id = event.data.get('patientId')
+            if patient_id is None:
+                logger.warning(f"Ignoring {event.channel} {event.id} without a patientId")
+                self.consumer.ack([event])
+                continue
+            self.debouncer.add(str(patient_id), event, now)
+            self.stats['events'] += 1
+
+    def score_due(self, now: Optional[float] = None) -> int:
+        """Score every patient that is due, batch by batch. Returns the patients scored."""
+        scored = 0
+        while True:
+            patients = self.debouncer.due(now, self.batch_size)
+            if not patients:
+                return scored
+            events = [event for patient_events in patients.values() for event in patient_events]
+            try:
+                started = time.perf_counter()
+                frame = self.loader(patients)
+                scores = score_patients(frame, self.health_model, self.mental_model)
+                self.publish(scores, patients)
+            except Exception as e:
+                # Left unacknowledged; reclaimed and retried after the claim timeout, up to EVENT_MAX_DELIVERIES times
+                logger.error(f"Scoring a batch of {len(patients)} patients failed: {e}")
+                self.stats['failed_batches'] += 1
+                return scored
+            self.consumer.ack(events)
+            scored += len(patients)
+            self.stats['patients_scored'] += len(patients)
+            self.stats['batches'] += 1
+            logger.info(f"Scored {len(patients)} patients from {len(events)} events "
+                        f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def publish(self, scores: pd.DataFrame, patients: Dict[str, List[Event]]) -> None:
+        scored_at = datetime.utcnow().isoformat()
+        payloads = []
+        for patient_id, row in scores.iterrows():
+            payload = {'patientId': patient_id, 'scoredAt': scored_at, 'changeEvents': len(patients[patient_id])}
+            if pd.notna(row.get('health_score')):
+                payload['healthScore'] = float(row['health_score'])
+                payload['healthRiskLevel'] = row['health_risk_level']
+            if pd.notna(row.get('mental_risk_score')):
+                payload['mentalRiskScore'] = float(row['mental_risk_score'])
+                payload['mentalRiskLevel'] = row['mental_risk_level']
+            if 'healthScore' in payload or 'mentalRiskScore' in payload:
+                payloads.append(payload)
+        if payloads:
+            self.bus.publish_many(SCORE_UPDATED, payloads)
+
+    def run(self, stop: Optional[Callable[[], bool]] = None, reclaim_interval: float = 30.0) -> None:
+        last_reclaim = 0.0
+        while not (stop and stop()):
+            if time.monotonic() - last_reclaim >= reclaim_interval:
+                self.collect(self.consumer.reclaim())
+                last_reclaim = time.monotonic()
+            wait = self.debouncer.next_due_in()
+            block_ms = self.consumer.block_ms if wait is None else int(min(wait * 1000, self.consumer.block_ms))
+            self.collect(self.consumer.read(block_ms=max(block_ms, 1)))
+            telemetry.set_queue_depth('scoring_debounce', len(self.debouncer))
+            self.score_due()
+            telemetry.set_queue_depth('scoring_debounce', len(self.debouncer))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore patients when their data changes")
+    parser.add_argument('--redis-url', default=REDIS_URL)
+    parser.add_argument('--group', default=SCORING_GROUP)
+    parser.add_argument('--consumer', help="consumer name; host and pid by default")
+    parser.add_argument('--health-model', default=HEALTH_SCORE_MODEL_PATH)
+    parser.add_argument('--mental-model', default=MENTAL_RISK_MODEL_PATH)
+    parser.add_argument('--metrics-port', type=int, default=SCORING_METRICS_PORT, help="0 disables GET /metrics")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.metrics_port:
+        telemetry.serve(args.metrics_port)
+    health_model, mental_model = load_models(args.health_model, args.mental_model)
+    worker = ScoringWorker(StreamEventBus(url=args.redis_url), health_model, mental_model,
+                           group=args.group, consumer_name=args.consumer)
+    logger.info(f"Scoring worker {worker.consumer.name} listening on {worker.consumer.channels}")
+    worker.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Deferred start-up for the ai-engine API.
+
+The model modules pull in pandas, sklearn and joblib, which takes seconds
+on a cold container. With AI_ENGINE_LAZY_STARTUP (the default) app.py
+only imports Flask and stdlib modules, serves /health straight away, and
+a background thread does the rest:
+
+1. imports: each module in AI_ENGINE_WARMUP_MODULES, timed per imported
+   module the way `python -X importtime` reports it;
+2. models: the model classes are instrumented for telemetry, and a
+   module-level warmup() is called where a module defines one (e.g. to
+   load its fitted model).
+
+/ready answers 503 until warm-up has finished, and keeps answering 503
+(status "failed") if a module in AI_ENGINE_REQUIRED_MODULES could not be
+imported or warmed up. Prediction endpoints
+resolve their functions through resolve(), which waits up to
+AI_ENGINE_WARMUP_WAIT seconds before giving up with WarmupPending.
+GET /health/startup reports the phases and the slowest imports;
+?format=importtime returns the full breakdown as text.
+"""
+import os
+import sys
+import time
+import logging
+import builtins
+import threading
+import importlib.util
+from typing import Dict, List, NamedTuple, Optional
+
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Serve /health before the model modules are imported; false imports them before the app starts serving
+AI_ENGINE_LAZY_STARTUP = os.getenv('AI_ENGINE_LAZY_STARTUP', 'true').lower() not in ('0', 'false', 'no')
+
+# Imported by the warm-up, in order
+AI_ENGINE_WARMUP_MODULES = [
+    name.strip() for name in os.getenv('AI_ENGINE_WARMUP_MODULES', 'health_score_model,risk_model,metrics').split(',')
+    if name.strip()
+]
+
+# Modules the service cannot serve without; /ready stays 503 if any of them fails to import or warm up
+AI_ENGINE_REQUIRED_MODULES = [
+    name.strip() for name in os.getenv('AI_ENGINE_REQUIRED_MODULES', 'health_score_model,risk_model').split(',')
+    if name.strip()
+]
+
+# Seconds a prediction request waits for the warm-up before it is answered with 503
+AI_ENGINE_WARMUP_WAIT = float(os.getenv('AI_ENGINE_WARMUP_WAIT', '10'))
+
+# Model classes instrumented once their module is imported
+MODEL_CLASSES = {
+    'health_score_model': 'CompositeHealthScoreModel',
+    'risk_model': 'MentalHealthRiskModel',
+}
+
+_started = time.perf_counter()
+
+
+class WarmupPending(Exception):
+    """The warm-up has not finished importing what a request needs."""
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_seconds: float
+    cumulative_seconds: float
+    depth: int
+
+
+class ImportTimer:
+    """
+    Times the imports made by one thread, like -X importtime: one record
+    per newly imported module, in completion order, with the time spent
+    in it excluding (self) and including (cumulative) the imports it made.
+    Modules already in sys.modules are not recorded.
+    """
+
+    def __init__(self):
+        self.records: List[ImportRecord] = []
+        self._thread = threading.get_ident()
+        self._stack: List[float] = []  # child time accumulated per open import
+        self._original = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if threading.get_ident() != self._thread:
+            return self._original(name, globals, locals, fromlist, level)
+        try:
+            absolute = importlib.util.resolve_name('.' * level + name, (globals or {}).get('__package__')) if level else name
+        except (ImportError, ValueError):
+            absolute = name
+        if absolute in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        self._stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - started
+            children = self._stack.pop()
+            self.records.append(ImportRecord(absolute, cumulative - children, cumulative, len(self._stack)))
+            if self._stack:
+                self._stack[-1] += cumulative
+
+    def __enter__(self):
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self._original
+        return False
+
+    def format(self) -> str:
+        """The records as -X importtime prints them (microseconds)."""
+        lines = ['import time: self [us] | cumulative | imported package']
+        for record in self.records:
+            lines.append(f'import time: {record.self_seconds * 1e6:>9.0f} | {record.cumulative_seconds * 1e6:>10.0f} | '
+                         f'{"  " * record.depth}{record.module}')
+        return '\n'.join(lines) + '\n'
+
+
+class Warmup:
+    """Runs the warm-up phases once, in a background thread or inline."""
+
+    def __init__(self, module_names: List[str] = AI_ENGINE_WARMUP_MODULES,
+                 required_modules: List[str] = AI_ENGINE_REQUIRED_MODULES):
+        self.module_names = module_names
+        self.required_modules = required_modules
+        self.status = 'pending'
+        self.phases: Dict[str, float] = {}
+        self.modules: Dict[str, object] = {}
+        self.errors: Dict[str, str] = {}
+        self.imports: Optional[ImportTimer] = None
+        self.ready_seconds: Optional[float] = None  # since the process imported this module
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self, background: bool = AI_ENGINE_LAZY_STARTUP) -> 'Warmup':
+        with self._lock:
+            if self.status != 'pending':
+                return self
+            self.status = 'warming'
+        if background:
+            threading.Thread(target=self.run, name='warmup', daemon=True).start()
+        else:
+            self.run()
+        return self
+
+    def _phase(self, name: str, started: float) -> None:
+        self.phases[name] = time.perf_counter() - started
+        telemetry.set_startup_seconds(name, self.phases[name])
+
+    def run(self) -> None:
+        completed = False
+        try:
+            started = time.perf_counter()
+            with ImportTimer() as timer:
+                for name in self.module_names:
+                    try:
+                        __import__(name)  # not importlib.import_module, which bypasses the timer
+                        self.modules[name] = sys.modules[name]
+                    except Exception as e:
+                        self.errors[name] = f'{type(e).__name__}: {e}'
+                        logger.warning(f"Could not import {name}: {e}. Endpoints that need it will fail.")
+            self.imports = timer
+            self._phase('imports', started)
+
+            started = time.perf_counter()
+            for name, module in self.modules.items():
+                class_name = MODEL_CLASSES.get(name)
+                if class_name and hasattr(module, class_name):
+                    telemetry.instrument_model_class(getattr(module, class_name))
+                if callable(getattr(module, 'warmup', None)):
+                    try:
+                        module.warmup()
+                    except Exception as e:
+                        self.errors[name] = f'warmup: {type(e).__name__}: {e}'
+                        logger.error(f"Warm-up of {name} failed: {e}")
+            self._phase('models', started)
+            completed = True
+        finally:
+            self.ready_seconds = time.perf_counter() - _started
+            telemetry.set_startup_seconds('ready', self.ready_seconds)
+            failed = self.failed_modules
+            self.status = 'ready' if completed and not failed else 'failed'
+            self._done.set()
+            logger.info(f"Warm-up finished {self.ready_seconds:.2f}s after start "
+                        f"({', '.join(f'{name} {seconds:.2f}s' for name, seconds in self.phases.items())})")
+            if self.status == 'failed':
+                logger.error(f"Not ready: required modules failed: {', '.join(failed) or 'warm-up aborted'}")
+
+    @property
+    def failed_modules(self) -> List[str]:
+        """Required modules that could not be imported or warmed up."""
+        return [name for name in self.required_modules if name not in self.modules or name in self.errors]
+
+    @property
+    def ready(self) -> bool:
+        """Warm-up has finished and every required module is usable."""
+        return self._done.is_set() and self.status == 'ready'
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def resolve(self, module: str, attribute: str, timeout: float = AI_ENGINE_WARMUP_WAIT):
+        """
+        An attribute of a warmed-up module, waiting up to timeout for the
+        warm-up. Raises WarmupPending while it is still running and
+        ImportError when the module could not be imported.
+        """
+        if not self._done.wait(timeout):
+            raise WarmupPending(f"ai-engine is still starting up; {module} is not loaded yet")
+        if module not in self.modules:
+            raise ImportError(f"{module} is not available: {self.errors.get(module, 'not in AI_ENGINE_WARMUP_MODULES')}")
+        return getattr(self.modules[module], attribute)
+
+    def report(self, slowest: int = 20) -> dict:
+        records = self.imports.records if self.imports else []
+        return {
+            'status': self.status,
+            'lazy': AI_ENGINE_LAZY_STARTUP,
+            'uptime_seconds': round(time.perf_counter() - _started, 3),
+            'ready_seconds': None if self.ready_seconds is None else round(self.ready_seconds, 3),
+            'phases': {name: round(seconds, 3) for name, seconds in self.phases.items()},
+            'required_modules': self.required_modules,
+            'failed_modules': self.failed_modules if self._done.is_set() else [],
+            'errors': self.errors,
+            'imported_modules': len(records),
+            'slowest_imports': [
+                {'module': r.module, 'self_ms': round(r.self_seconds * 1000, 1),
+                 'cumulative_ms': round(r.cumulative_seconds * 1000, 1)}
+                for r in sorted(records, key=lambda r: r.self_seconds, reverse=True)[:slowest]
+            ],
+        }
+
+
+warmup = Warmup()
+
+
+def register(app):
+    """Add /ready and /health/startup to a Flask app."""
+    from flask import Response, jsonify, request
+
+    @app.route('/ready', methods=['GET'])
+    def readiness_check():
+        if warmup.ready:
+            return jsonify({"status": "ready", "service": "ai-engine"}), 200
+        body = {"status": warmup.status, "service": "ai-engine"}
+        if warmup.status == 'failed':
+            body["failed_modules"] = {name: warmup.errors.get(name, 'not imported') for name in warmup.failed_modules}
+        return jsonify(body), 503
+
+    @app.route('/health/startup', methods=['GET'])
+    def startup_report():
+        if request.args.get('format') == 'importtime':
+            return Response(warmup.imports.format() if warmup.imports else '', mimetype='text/plain')
+        return jsonify(warmup.report()), 200
+
+    return app
@@ -0,0 +1,404 @@
+"""
+Performance telemetry for the ai-engine, exported in the Prometheus text
+format on GET /metrics.
+
+    from telemetry import instrument_app, instrument_model_class
+    instrument_app(app)
+    instrument_model_class(CompositeHealthScoreModel)
+
+HTTP (instrument_app), labelled by route template, method and status:
+
+- ai_engine_http_requests_total
+- ai_engine_http_request_duration_seconds
+- ai_engine_http_request_size_bytes / ai_engine_http_response_size_bytes
+- ai_engine_http_requests_in_flight
+
+Models (instrument_model_class, or model_stage around code that calls the
+estimator directly, like the scoring worker), labelled by model and stage:
+
+- ai_engine_model_stage_duration_seconds, stage being preprocess
+  (preprocess_data), inference (the rest of predict) or postprocess
+  (recommendations, explanations, contributing factors, ...)
+- ai_engine_model_batch_rows: rows per preprocess_data call
+- ai_engine_queue_depth, labelled by queue
+- ai_engine_startup_seconds, labelled by warm-up phase (startup.py)
+
+The metrics are plain counters and fixed-bucket histograms kept in
+process, with a lock per labelled series: recording an observation is a
+dict lookup, a bisect and an increment, a few microseconds. Route labels
+are the URL rule, never the raw path, so the series stay bounded.
+"""
+import os
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Set to false to turn the /metrics endpoint and all recording off
+AI_ENGINE_METRICS_ENABLED = os.getenv('AI_ENGINE_METRICS_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; from cached lookups to slow batch predictions
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Bytes; from empty bodies to large batch payloads
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Rows per model call; 1 is a single-patient API request
+ROW_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+# Methods timed as the postprocess stage of predict, where a model has them
+POSTPROCESS_METHODS = (
+    '_generate_recommendations', '_generate_explanation', '_identify_anomalies', '_calculate_trends',
+    '_identify_contributing_factors', '_calculate_condition_risks',
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._cache: Dict[tuple, object] = {}  # label values as passed -> series
+        self._lock = threading.Lock()
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        """The series for these label values, created on first use."""
+        series = self._cache.get(values)
+        if series is None:
+            key = tuple(str(value) for value in values)
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {key}")
+            with self._lock:
+                series = self._cache[values] = self._series.setdefault(key, self._new_series())
+        return series
+
+    def _samples(self, key: Tuple[str, ...], series) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for key, series in sorted(self._series.items()):
+            lines.extend(self._samples(key, series))
+        return lines
+
+
+class _Value:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_series(self):
+        return _Value()
+
+    def _samples(self, key, series):
+        yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_number(series.value)}'
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+
+class _HistogramSeries:
+    __slots__ = ('buckets', 'counts', 'sum', '_lock')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets)
+
+    def _samples(self, key, series):
+        with series._lock:
+            counts, total = list(series.counts), series.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = 'le="' + _format_number(bound) + '"'
+            yield f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}'
+        labels = _format_labels(self.labelnames, key)
+        yield f'{self.name}_sum{labels} {total!r}'
+        yield f'{self.name}_count{labels} {cumulative}'
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'ai_engine_http_requests_total', 'HTTP requests handled', ('route', 'method', 'status')))
+HTTP_DURATION = REGISTRY.register(Histogram(
+    'ai_engine_http_request_duration_seconds', 'HTTP request latency', ('route', 'method', 'status')))
+HTTP_REQUEST_SIZE = REGISTRY.register(Histogram(
+    'ai_engine_http_request_size_bytes', 'HTTP request body size', ('route', 'method'), SIZE_BUCKETS))
+HTTP_RESPONSE_SIZE = REGISTRY.register(Histogram(
+    'ai_engine_http_response_size_bytes', 'HTTP response body size', ('route', 'method'), SIZE_BUCKETS))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    'ai_engine_http_requests_in_flight', 'HTTP requests being handled', ('route',)))
+MODEL_STAGE_DURATION = REGISTRY.register(Histogram(
+    'ai_engine_model_stage_duration_seconds', 'Model time per call, by stage', ('model', 'stage')))
+MODEL_BATCH_ROWS = REGISTRY.register(Histogram(
+    'ai_engine_model_batch_rows', 'Rows per model call', ('model',), ROW_BUCKETS))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'ai_engine_queue_depth', 'Items waiting in a work queue', ('queue',)))
+STARTUP_SECONDS = REGISTRY.register(Gauge(
+    'ai_engine_startup_seconds', 'Seconds spent in each start-up phase', ('phase',)))
+
+
+def render() -> str:
+    """Every metric in the Prometheus text format."""
+    return REGISTRY.render()
+
+
+def observe_model_stage(model: str, stage: str, seconds: float, rows: Optional[int] = None) -> None:
+    if not AI_ENGINE_METRICS_ENABLED:
+        return
+    MODEL_STAGE_DURATION.labels(model, stage).observe(seconds)
+    if rows is not None:
+        MODEL_BATCH_ROWS.labels(model).observe(rows)
+
+
+@contextmanager
+def model_stage(model: str, stage: str, rows: Optional[int] = None):
+    """Time a block as one stage of a model call."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_model_stage(model, stage, time.perf_counter() - started, rows)
+
+
+def set_queue_depth(queue: str, depth: int) -> None:
+    if AI_ENGINE_METRICS_ENABLED:
+        QUEUE_DEPTH.labels(queue).set(depth)
+
+
+def set_startup_seconds(phase: str, seconds: float) -> None:
+    if AI_ENGINE_METRICS_ENABLED:
+        STARTUP_SECONDS.labels(phase).set(seconds)
+
+
+# predict() calls in progress on this thread, so nested stages are attributed to them
+_calls = threading.local()
+
+
+class _PredictCall:
+    __slots__ = ('stages', 'active')
+
+    def __init__(self):
+        self.stages = {'preprocess': 0.0, 'postprocess': 0.0}
+        self.active = None
+
+
+def _timed_predict(name: str, predict):
+    def wrapper(self, *args, **kwargs):
+        call = _PredictCall()
+        outer = getattr(_calls, 'current', None)
+        _calls.current = call
+        started = time.perf_counter()
+        try:
+            return predict(self, *args, **kwargs)
+        finally:
+            total = time.perf_counter() - started
+            _calls.current = outer
+            if AI_ENGINE_METRICS_ENABLED:
+                for stage, seconds in call.stages.items():
+                    MODEL_STAGE_DURATION.labels(name, stage).observe(seconds)
+                MODEL_STAGE_DURATION.labels(name, 'inference').observe(total - sum(call.stages.values()))
+    wrapper.__wrapped__ = predict
+    wrapper.__name__, wrapper.__doc__ = predict.__name__, predict.__doc__
+    return wrapper
+
+
+def _timed_stage(name: str, stage: str, method, counts_rows: bool = False):
+    def wrapper(self, *args, **kwargs):
+        call = getattr(_calls, 'current', None)
+        if call is not None and call.active is not None:
+            return method(self, *args, **kwargs)  # nested in a stage already being timed
+        if call is not None:
+            call.active = stage
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - started
+            rows = len(args[0]) if counts_rows and args and hasattr(args[0], '__len__') else None
+            if call is not None:
+                call.active = None
+                call.stages[stage] += seconds
+                if rows is not None and AI_ENGINE_METRICS_ENABLED:
+                    MODEL_BATCH_ROWS.labels(name).observe(rows)
+            else:
+                observe_model_stage(name, stage, seconds, rows)
+    wrapper.__wrapped__ = method
+    wrapper.__name__, wrapper.__doc__ = method.__name__, method.__doc__
+    return wrapper
+
+
+def instrument_model_class(cls, name: Optional[str] = None):
+    """
+    Time predict, preprocess_data and the postprocess methods of a model
+    class. The class is patched in place, once; pickled models are
+    unaffected. Returns the class.
+    """
+    if getattr(cls, '_telemetry_instrumented', False):
+        return cls
+    name = name or cls.__name__
+    if hasattr(cls, 'preprocess_data'):
+        cls.preprocess_data = _timed_stage(name, 'preprocess', cls.preprocess_data, counts_rows=True)
+    for method in POSTPROCESS_METHODS:
+        if hasattr(cls, method):
+            setattr(cls, method, _timed_stage(name, 'postprocess', getattr(cls, method)))
+    if hasattr(cls, 'predict'):
+        cls.predict = _timed_predict(name, cls.predict)
+    cls._telemetry_instrumented = True
+    return cls
+
+
+def _route_label(request) -> str:
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def instrument_app(app, path: str = '/metrics'):
+    """Record every request of a Flask app and serve the metrics on GET path."""
+    if not AI_ENGINE_METRICS_ENABLED:
+        return app
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_request_timer():
+        current = request._get_current_object()
+        route = _route_label(current)
+        HTTP_IN_FLIGHT.labels(route).inc()
+        # started, route, method, status: unhandled exceptions skip after_request, and Flask answers them with a 500
+        g.telemetry = [time.perf_counter(), route, current.method, 500]
+        HTTP_REQUEST_SIZE.labels(route, current.method).observe(current.content_length or 0)
+
+    @app.after_request
+    def _record_response(response):
+        state = g.get('telemetry')
+        if state is not None:
+            state[3] = response.status_code
+            size = response.content_length  # None for streamed responses
+            if size is not None:
+                HTTP_RESPONSE_SIZE.labels(state[1], state[2]).observe(size)
+        return response
+
+    @app.teardown_request
+    def _record_request(exc):
+        state = g.pop('telemetry', None)
+        if state is None:
+            return  # a before_request hook failed before ours ran
+        started, route, method, status = state
+        HTTP_IN_FLIGHT.labels(route).dec()
+        HTTP_REQUESTS.labels(route, method, status).inc()
+        HTTP_DURATION.labels(route, method, status).observe(time.perf_counter() - started)
+
+    @app.route(path, methods=['GET'])
+    def prometheus_metrics():
+        return Response(render(), mimetype=None, content_type=CONTENT_TYPE)
+
+    return app
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int, host: str = '0.0.0.0') -> Optional[ThreadingHTTPServer]:
+    """GET /metrics on its own port, from a daemon thread; for processes without a Flask app."""
+    if not AI_ENGINE_METRICS_ENABLED:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f"Serving metrics on {host}:{port}/metrics")
+    return server
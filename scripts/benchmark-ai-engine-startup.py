@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+AI Engine Startup Benchmark
+Starts the ai-engine Flask app (app.py) repeatedly and measures, from
+process launch:
+
+- healthy: GET /health first answers 200;
+- ready: GET /ready first answers 200 (the background warm-up is done);
+- first prediction: the first POST to --endpoint not answered with 503.
+
+Modes:
+
+- lazy: AI_ENGINE_LAZY_STARTUP=true (the default), /health is served
+  while pandas, sklearn and the model modules are imported;
+- eager: AI_ENGINE_LAZY_STARTUP=false, everything is imported before the
+  app starts serving, as app.py did before;
+- lazy-cold: lazy with an empty bytecode cache (a fresh
+  PYTHONPYCACHEPREFIX), like an image built without precompiled .pyc files.
+
+    python scripts/benchmark-ai-engine-startup.py --runs 5 --json startup.json
+
+    # Regression check: exit 1 when a median is slower than the saved report allows
+    python scripts/benchmark-ai-engine-startup.py --baseline startup.json --tolerance 0.25
+
+The slowest imports of the warm-up (from GET /health/startup) are printed
+after the timings.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+# app.py lives in the ai-engine
+AI_ENGINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "archive", "backend", "ai-engine")
+
+MODES = ("lazy", "eager", "lazy-cold")
+METRICS = ("healthy", "ready", "first_prediction")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def status_of(url, body=None, timeout=30.0):
+    """HTTP status of a GET (or a JSON POST when body is given); None while nothing listens."""
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"} if body else {})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None
+
+
+def poll(check, started, deadline, interval=0.005):
+    """Seconds since started at which check() first returned a value other than None."""
+    while time.perf_counter() < deadline:
+        result = check()
+        if result is not None:
+            return time.perf_counter() - started, result
+        time.sleep(interval)
+    raise TimeoutError("the ai-engine did not answer in time")
+
+
+def run_once(mode, args):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = {k: v for k, v in os.environ.items() if k != "ASPNETCORE_ENVIRONMENT"}
+    env.update(PORT=str(port), AI_ENGINE_LAZY_STARTUP="false" if mode == "eager" else "true", PYTHONUNBUFFERED="1")
+    cache_dir = None
+    if mode == "lazy-cold":
+        cache_dir = tempfile.mkdtemp(prefix="ai-engine-pycache-")
+        env["PYTHONPYCACHEPREFIX"] = cache_dir
+    body = json.dumps(args.payload).encode()
+
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "app.py"], cwd=AI_ENGINE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = started + args.timeout
+    try:
+        healthy, _ = poll(lambda: True if status_of(f"{base}/health", timeout=1.0) == 200 else None, started, deadline)
+
+        def prediction():
+            status = status_of(f"{base}{args.endpoint}", body)
+            return None if status in (None, 503) else status
+
+        first_prediction, prediction_status = poll(prediction, started, deadline)
+        ready, _ = poll(lambda: True if status_of(f"{base}/ready", timeout=1.0) == 200 else None, started, deadline)
+        with urllib.request.urlopen(f"{base}/health/startup", timeout=5) as response:
+            startup = json.load(response)
+    finally:
+        process.terminate()
+        process.wait()
+        if cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    return {"healthy": healthy, "ready": ready, "first_prediction": first_prediction,
+            "prediction_status": prediction_status, "startup": startup}
+
+
+def summarize(runs):
+    summary = {}
+    for metric in METRICS:
+        values = [run[metric] for run in runs]
+        summary[metric] = {"median": round(statistics.median(values), 3),
+                           "min": round(min(values), 3), "max": round(max(values), 3)}
+    summary["prediction_status"] = sorted({run["prediction_status"] for run in runs})
+    return summary
+
+
+def regressions(report, baseline, tolerance, slack):
+    found = []
+    for mode, summary in report["modes"].items():
+        previous = baseline.get("modes", {}).get(mode)
+        if previous is None:
+            continue
+        for metric in METRICS:
+            allowed = previous[metric]["median"] * (1 + tolerance) + slack
+            if summary[metric]["median"] > allowed:
+                found.append(f"{mode} {metric}: {summary[metric]['median']:.3f}s > {allowed:.3f}s "
+                             f"(baseline {previous[metric]['median']:.3f}s)")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ai-engine time to healthy and to first prediction")
+    parser.add_argument("--runs", type=int, default=5, help="process starts per mode")
+    parser.add_argument("--modes", type=lambda value: value.split(","), default=list(MODES))
+    parser.add_argument("--endpoint", default="/api/health-score", help="prediction endpoint POSTed to")
+    parser.add_argument("--payload", type=json.loads, default={"patient_id": "benchmark"},
+                        help="JSON body of the prediction request")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds a start may take")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--baseline", help="earlier --json report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown over the baseline median")
+    parser.add_argument("--slack", type=float, default=0.05, help="seconds allowed on top of the tolerance")
+    args = parser.parse_args()
+
+    print("📊 AI Engine Startup Benchmark")
+    print("=" * 40)
+    print(f"   {args.runs} starts per mode, POST {args.endpoint}, {os.cpu_count()} CPUs")
+    print(f"   {'mode':<11}{'healthy':>10}{'ready':>10}{'1st pred':>10}   status")
+    report = {"runs": args.runs, "endpoint": args.endpoint, "modes": {}}
+    last_startup = {}
+    for mode in args.modes:
+        runs = [run_once(mode, args) for _ in range(args.runs)]
+        summary = summarize(runs)
+        report["modes"][mode] = summary
+        last_startup[mode] = runs[-1]["startup"]
+        print(f"   {mode:<11}" + "".join(f"{summary[metric]['median']:>9.3f}s" for metric in METRICS)
+              + f"   {', '.join(map(str, summary['prediction_status']))}")
+
+    startup = last_startup.get("lazy") or next(iter(last_startup.values()))
+    report["slowest_imports"] = startup["slowest_imports"]
+    if startup["errors"]:
+        print(f"   warm-up errors: {startup['errors']}")
+    print(f"   slowest imports ({startup['imported_modules']} modules, imports phase "
+          f"{startup['phases'].get('imports', 0):.3f}s):")
+    for record in startup["slowest_imports"][:10]:
+        print(f"     {record['self_ms']:>8.1f} ms self {record['cumulative_ms']:>9.1f} ms cumulative  {record['module']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f), args.tolerance, args.slack)
+        for line in found:
+            print(f"   ❌ regression: {line}")
+        if found:
+            sys.exit(1)
+        print("   ✅ no regression against the baseline")
+
+
+if __name__ == "__main__":
+    main()
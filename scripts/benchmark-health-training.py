@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Composite Health Score Model Training Benchmark
+Trains the CompositeHealthScoreModel forest two ways on the same chunked
+Parquet files, and reports wall-clock time and peak RSS per stage:
+
+- out-of-core: the ai-engine health_training pipeline (scan with
+  partial_fit, transform into a memmap, fit with n_jobs);
+- in-memory: what CompositeHealthScoreModel.train does today, reading every
+  file into one DataFrame, fitting the scaler, then preprocess_data
+  (a copy plus get_dummies) before fitting.
+
+    # 2M synthetic patients in 8 files
+    python scripts/benchmark-health-training.py --rows 2000000 --files 8
+
+    # Reuse generated files, out-of-core only
+    python scripts/benchmark-health-training.py --data-dir /data/health-bench --modes out-of-core
+
+Each mode runs in its own spawned process, so peaks are not inherited from
+the other mode or from data generation. Both modes also report R^2 on a
+holdout file.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# The pipeline lives in the ai-engine
+AI_ENGINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "archive", "backend", "ai-engine")
+sys.path.append(AI_ENGINE_DIR)
+
+from health_training import StageMonitor, train_out_of_core  # noqa: E402
+
+CATEGORICAL = ["gender_code", "physical_activity_level", "sleep_quality", "diet_quality", "smoking_status"]
+NUMERICAL = [
+    "cardiovascular_score", "metabolic_score", "respiratory_score", "mental_score",
+    "cardiovascular_trend", "metabolic_trend", "respiratory_trend", "mental_trend",
+    "age", "chronic_condition_count", "medication_adherence", "preventive_care_compliance",
+    "social_support_score", "stress_level",
+]
+TARGET = "health_score"
+WEIGHTS = {"cardiovascular": 0.30, "metabolic": 0.25, "respiratory": 0.20, "mental": 0.25}
+
+
+def synthetic_patients(rows, seed):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        f"{domain}_score": np.clip(rng.normal(70, 15, rows), 0, 100) for domain in WEIGHTS
+    })
+    for domain in WEIGHTS:
+        frame[f"{domain}_trend"] = rng.normal(0, 3, rows)
+    frame["age"] = rng.integers(18, 95, rows)
+    frame["chronic_condition_count"] = rng.poisson(1.2, rows)
+    frame["medication_adherence"] = np.clip(rng.beta(5, 1.5, rows), 0, 1)
+    frame["preventive_care_compliance"] = np.clip(rng.beta(3, 2, rows), 0, 1)
+    frame["social_support_score"] = np.clip(rng.normal(3.2, 1.0, rows), 0, 5)
+    frame["stress_level"] = np.clip(rng.normal(5, 2, rows), 0, 10)
+    frame["gender_code"] = rng.integers(0, 3, rows)
+    for feature in ("physical_activity_level", "sleep_quality", "diet_quality"):
+        frame[feature] = rng.integers(0, 4, rows)
+    frame["smoking_status"] = rng.choice(3, rows, p=[0.7, 0.2, 0.1])
+    weighted = sum(frame[f"{domain}_score"] * weight for domain, weight in WEIGHTS.items())
+    frame[TARGET] = np.clip(
+        weighted + 0.8 * sum(frame[f"{domain}_trend"] for domain in WEIGHTS) - 2.5 * frame["chronic_condition_count"]
+        + 6 * frame["medication_adherence"] + 1.5 * frame["physical_activity_level"] - 4 * frame["smoking_status"]
+        - 0.6 * frame["stress_level"] + rng.normal(0, 4, rows), 0, 100
+    )
+    # A few gaps, so imputation is exercised
+    for feature in ("stress_level", "sleep_quality"):
+        frame.loc[rng.random(rows) < 0.01, feature] = np.nan
+    return frame
+
+
+def generate(data_dir, rows, files, seed):
+    os.makedirs(data_dir, exist_ok=True)
+    per_file = -(-rows // files)
+    for i in range(files):
+        path = os.path.join(data_dir, f"part-{i:04d}.parquet")
+        if not os.path.exists(path):
+            synthetic_patients(min(per_file, rows - i * per_file), seed + i).to_parquet(path, index=False)
+    holdout = os.path.join(data_dir, "holdout.parquet")
+    if not os.path.exists(holdout):
+        synthetic_patients(100_000, seed - 1).to_parquet(holdout, index=False)
+    return sorted(os.path.join(data_dir, f) for f in os.listdir(data_dir) if f.startswith("part-")), holdout
+
+
+def make_forest(options):
+    from sklearn.ensemble import RandomForestRegressor
+    return RandomForestRegressor(n_estimators=options["trees"], max_depth=options["max_depth"],
+                                 min_samples_leaf=5, n_jobs=options["n_jobs"], random_state=42)
+
+
+def in_memory_preprocess(frame, scaler):
+    """CompositeHealthScoreModel.preprocess_data."""
+    df = frame.copy()
+    for feature in NUMERICAL:
+        if df[feature].isnull().any():
+            df[feature] = df[feature].fillna(df[feature].median())
+    for feature in CATEGORICAL:
+        if df[feature].isnull().any():
+            df[feature] = df[feature].fillna(df[feature].mode()[0])
+    df[NUMERICAL] = scaler.transform(df[NUMERICAL])
+    return pd.get_dummies(df, columns=CATEGORICAL, drop_first=True)
+
+
+def run_in_memory(options, files, holdout):
+    from sklearn.preprocessing import StandardScaler
+    stages = []
+    with StageMonitor("read") as monitor:
+        frame = pd.concat([pd.read_parquet(path) for path in files], ignore_index=True)
+        monitor.rows = len(frame)
+    stages.append(monitor.report)
+    features, y = frame[NUMERICAL + CATEGORICAL], frame[TARGET].to_numpy()
+    with StageMonitor("preprocess") as monitor:
+        scaler = StandardScaler().fit(features[NUMERICAL])
+        X = in_memory_preprocess(features, scaler)
+        monitor.rows = len(X)
+    stages.append(monitor.report)
+    with StageMonitor("fit") as monitor:
+        forest = make_forest(options).fit(X, y)
+        monitor.rows = len(X)
+    stages.append(monitor.report)
+    test = pd.read_parquet(holdout)
+    X_test = in_memory_preprocess(test[NUMERICAL + CATEGORICAL], scaler).reindex(columns=X.columns, fill_value=0)
+    return stages, forest.score(X_test, test[TARGET])
+
+
+def run_out_of_core(options, files, holdout):
+    result = train_out_of_core(files, TARGET, NUMERICAL, CATEGORICAL, make_forest(options),
+                               chunk_rows=options["chunk_rows"], n_jobs=options["n_jobs"],
+                               work_dir=options["work_dir"])
+    test = pd.read_parquet(holdout)
+    X_test = in_memory_preprocess(test[NUMERICAL + CATEGORICAL], result.scaler)
+    return result.stages, result.estimator.score(X_test.reindex(columns=result.columns, fill_value=0), test[TARGET])
+
+
+def run_mode(mode, options, files, holdout, results):
+    runner = run_out_of_core if mode == "out-of-core" else run_in_memory
+    stages, r2 = runner(options, files, holdout)
+    results.put((mode, [stage._asdict() for stage in stages], round(float(r2), 4)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CompositeHealthScoreModel training pipelines")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--files", type=int, default=8, help="Parquet files the rows are split across")
+    parser.add_argument("--data-dir", help="where the synthetic files are generated (kept); a temp dir when omitted")
+    parser.add_argument("--modes", type=lambda value: value.split(","), default=["out-of-core", "in-memory"])
+    parser.add_argument("--chunk-rows", type=int, default=250_000)
+    parser.add_argument("--trees", type=int, default=50)
+    parser.add_argument("--max-depth", type=int, default=12)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--work-dir", help="where the out-of-core memmap is written")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="health-bench-")
+    files, holdout = generate(data_dir, args.rows, args.files, args.seed)
+    options = {"trees": args.trees, "max_depth": args.max_depth, "n_jobs": args.n_jobs,
+               "chunk_rows": args.chunk_rows, "work_dir": args.work_dir}
+
+    print("📊 Composite Health Score Model Training Benchmark")
+    print("=" * 40)
+    print(f"   {args.rows} rows in {len(files)} files, {args.trees} trees, max depth {args.max_depth}, "
+          f"n_jobs {args.n_jobs} ({os.cpu_count()} CPUs)")
+    print(f"   {'mode':<13}{'stage':<12}{'seconds':>9}{'peak RSS MB':>13}{'rows':>11}")
+    context = multiprocessing.get_context("spawn")
+    report = {"rows": args.rows, "files": len(files), "trees": args.trees, "max_depth": args.max_depth, "modes": {}}
+    for mode in args.modes:
+        results = context.Queue()
+        process = context.Process(target=run_mode, args=(mode, options, files, holdout, results))
+        process.start()
+        mode, stages, r2 = results.get()
+        process.join()
+        for stage in stages:
+            print(f"   {mode:<13}{stage['stage']:<12}{stage['seconds']:>9.2f}{stage['peak_rss_mb']:>13.1f}{stage['rows']:>11}")
+        print(f"   {mode:<13}{'total':<12}{sum(s['seconds'] for s in stages):>9.2f}"
+              f"{max(s['peak_rss_mb'] for s in stages):>13.1f}   holdout R^2 {r2}")
+        report["modes"][mode] = {"stages": stages, "holdout_r2": r2}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
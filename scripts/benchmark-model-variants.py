@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Model Variant Report
+Trains CompositeHealthScoreModel's forest and MentalHealthRiskModel's
+gradient boosting (exact and histogram) on synthetic patients. It then
+exports their float64, float32 and quantized variants with the ai-engine
+model_variants module, and reports each variant's score drift against the
+scikit-learn model, model size, input bytes per row and latency at several
+batch sizes.
+
+    python scripts/benchmark-model-variants.py
+    python scripts/benchmark-model-variants.py --batch-sizes 1,256,4096 --max-bins none,255,63 --json variants.json
+
+Synthetic patients come from the training benchmarks next to this script.
+For a deployment decision, run model_variants.export_variants on the
+production model with a recent sample of its inputs instead.
+"""
+
+import argparse
+import json
+import os
+import runpy
+import sys
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+AI_ENGINE_DIR = os.path.join(SCRIPTS_DIR, "..", "archive", "backend", "ai-engine")
+sys.path.append(AI_ENGINE_DIR)
+
+from model_variants import build_variants, variant_report  # noqa: E402
+
+
+def load_script(name):
+    return runpy.run_path(os.path.join(SCRIPTS_DIR, name), run_name=name)
+
+
+def health_models(args):
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.preprocessing import StandardScaler
+    bench = load_script("benchmark-health-training.py")
+    frame = bench["synthetic_patients"](args.rows + args.sample_rows, args.seed)
+    features = frame[bench["NUMERICAL"] + bench["CATEGORICAL"]]
+    scaler = StandardScaler().fit(features[bench["NUMERICAL"]])
+    X = bench["in_memory_preprocess"](features, scaler).astype(np.float64)
+    y = frame[bench["TARGET"]].to_numpy()
+    forest = RandomForestRegressor(n_estimators=args.trees, max_depth=12, min_samples_leaf=5, n_jobs=-1,
+                                   random_state=42).fit(X.iloc[:args.rows], y[:args.rows])
+    yield "CompositeHealthScoreModel (random forest)", forest, X.iloc[args.rows:]
+
+
+def risk_models(args):
+    from sklearn.ensemble import GradientBoostingClassifier
+    bench = load_script("benchmark-risk-training.py")
+    X, y, _ = bench["synthetic_patients"](args.rows + args.sample_rows, args.seed)
+    X = X.astype(np.float64)
+    exact = GradientBoostingClassifier(n_estimators=args.trees, max_depth=3, random_state=42)
+    yield "MentalHealthRiskModel (exact GBDT)", exact.fit(X.iloc[:args.rows], y[:args.rows]), X.iloc[args.rows:]
+    hist = bench["fit_estimator"](X.iloc[:args.rows], y[:args.rows], "hist")
+    yield "MentalHealthRiskModel (histogram GBDT)", hist, X.iloc[args.rows:]
+
+
+def print_report(title, report, batch_sizes):
+    print(f"\n   {title}")
+    header = f"   {'variant':<20}{'model MB':>9}{'B/row':>7}{'max drift':>11}{'mean drift':>11}{'agree':>7}"
+    print(header + "".join(f"{f'rows/s @{b}':>14}" for b in batch_sizes))
+    for name, row in report.iterrows():
+        agreement = f"{row['label_agreement']:.4f}" if "label_agreement" in row else "-"
+        print(f"   {name:<20}{row['model_mb']:>9.2f}{int(row['input_bytes_per_row']):>7}"
+              f"{row['max_abs_drift']:>11.2e}{row['mean_abs_drift']:>11.2e}{agreement:>7}"
+              + "".join(f"{int(row[f'rows_per_sec_{b}']):>14}" for b in batch_sizes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report float32 and quantized model variants")
+    parser.add_argument("--rows", type=int, default=100_000, help="training rows per model")
+    parser.add_argument("--sample-rows", type=int, default=20_000, help="rows drift and latency are measured on")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--batch-sizes", type=lambda value: [int(b) for b in value.split(",")],
+                        default=[1, 64, 1024, 16384])
+    parser.add_argument("--max-bins", type=lambda value: [None if b == "none" else int(b) for b in value.split(",")],
+                        default=[None, 255], help="quantized variants: 'none' is lossless, a number caps bins per feature")
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    print("📊 Model Variant Report")
+    print("=" * 40)
+    print(f"   {args.rows} training rows, drift and latency on {args.sample_rows} rows, {os.cpu_count()} CPUs")
+    reports = {}
+    for models in (health_models, risk_models):
+        for title, estimator, sample in models(args):
+            report = variant_report(estimator, build_variants(estimator, args.max_bins), sample, args.batch_sizes)
+            print_report(title, report, args.batch_sizes)
+            reports[title] = report.reset_index().to_dict(orient="records")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
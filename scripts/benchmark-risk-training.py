@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Mental Health Risk Model Training Benchmark
+Compares training time and holdout accuracy of the exact-split
+GradientBoostingClassifier MentalHealthRiskModel trains today with the
+histogram GBDT in the ai-engine risk_training module, and measures
+warm-start refresh against a full retrain.
+
+    # 100k, 1M and 5M synthetic patients; the exact model only up to 1M rows
+    python scripts/benchmark-risk-training.py
+
+    # Quick run, exact model at every size
+    python scripts/benchmark-risk-training.py --rows 20000,100000 --exact-max-rows 100000
+
+Patients are synthetic: the model's eleven features drawn from plausible
+ranges, with the risk level (low/moderate/high/critical) a noisy function of
+them. Both modes see the same raw feature matrix; trees need no scaling or
+one-hot encoding, so MentalHealthRiskModel.preprocess_data is left out.
+
+For refresh, a further 10% of rows is generated with a shifted population
+(more stress, less sleep). The fitted histogram model is then either
+refreshed on those rows plus an equal sample of earlier ones, or retrained
+on everything. Both are scored on a shifted holdout, as is the model before
+the refresh (hist_shifted).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# The training modes live in the ai-engine
+AI_ENGINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "archive", "backend", "ai-engine")
+sys.path.append(AI_ENGINE_DIR)
+
+from risk_training import evaluate, fit_estimator, refresh_estimator  # noqa: E402
+
+FEATURES = [
+    "phq9_score", "gad7_score", "sleep_quality_score", "stress_level",
+    "social_support_score", "physical_activity_level", "substance_use_score",
+    "previous_mental_health_diagnosis", "previous_treatment",
+    "age", "gender_code",
+]
+
+# Share of patients per risk level: low, moderate, high, critical
+LEVEL_SHARES = (0.55, 0.27, 0.13, 0.05)
+
+CHUNK_ROWS = 1_000_000
+
+
+def _chunk(rng, n, shift):
+    phq9 = np.clip(rng.gamma(2.0, 2.5, n) + 3 * shift, 0, 27).round()
+    gad7 = np.clip(0.6 * phq9 + rng.normal(0, 3, n), 0, 21).round()
+    stress = np.clip(rng.normal(5 + 0.1 * phq9 + shift, 2, n), 0, 10)
+    sleep = np.clip(rng.normal(7 - 0.1 * phq9 - shift, 1.5, n), 0, 10)
+    support = np.clip(rng.normal(3.2, 1.0, n), 0, 5)
+    activity = np.clip(rng.normal(5, 2, n), 0, 10)
+    substance = np.clip(rng.exponential(1.5, n), 0, 10)
+    diagnosis = (rng.random(n) < 0.1 + 0.015 * phq9).astype(np.int8)
+    treatment = (diagnosis & (rng.random(n) < 0.6)).astype(np.int8)
+    age = rng.integers(18, 90, n)
+    gender = rng.integers(0, 3, n).astype(np.int8)
+    latent = (
+        0.16 * phq9 + 0.12 * gad7 + 0.18 * stress - 0.22 * sleep - 0.35 * support - 0.08 * activity
+        + 0.25 * substance + 0.6 * diagnosis - 0.3 * treatment + 0.4 * (stress > 8) * (support < 2)
+        - 0.01 * np.abs(age - 45) + rng.logistic(0, 0.6, n)
+    )
+    frame = pd.DataFrame(dict(zip(FEATURES, (
+        phq9, gad7, sleep, stress, support, activity, substance, diagnosis, treatment, age, gender
+    ))))
+    return frame, latent
+
+
+def synthetic_patients(rows, seed, shift=0.0, cuts=None):
+    """Feature frame and risk levels 0-3. cuts are the latent thresholds; computed from the data when None."""
+    rng = np.random.default_rng(seed)
+    frames, latents = [], []
+    for start in range(0, rows, CHUNK_ROWS):
+        frame, latent = _chunk(rng, min(CHUNK_ROWS, rows - start), shift)
+        frames.append(frame)
+        latents.append(latent)
+    latent = np.concatenate(latents)
+    if cuts is None:
+        cuts = np.quantile(latent, np.cumsum(LEVEL_SHARES)[:-1])
+    return pd.concat(frames, ignore_index=True), np.searchsorted(cuts, latent).astype(np.int8), cuts
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, round(time.perf_counter() - started, 2)
+
+
+def run_size(args, rows):
+    X, y, cuts = synthetic_patients(rows, args.seed)
+    X_test, y_test, _ = synthetic_patients(args.test_rows, args.seed + 1, cuts=cuts)
+    report = {"rows": rows, "modes": {}}
+
+    hist, seconds = timed(fit_estimator, X, y, "hist", max_iter=args.max_iter)
+    report["modes"]["hist"] = {"fit_seconds": seconds, "iterations": hist.n_iter_, **evaluate(hist, X_test, y_test)}
+    print_mode(rows, "hist", report["modes"]["hist"])
+
+    if rows <= args.exact_max_rows:
+        exact, seconds = timed(fit_estimator, X, y, "exact", n_estimators=args.exact_estimators,
+                               max_depth=args.exact_max_depth)
+        report["modes"]["exact"] = {"fit_seconds": seconds, "iterations": exact.n_estimators_,
+                                    **evaluate(exact, X_test, y_test)}
+        print_mode(rows, "exact", report["modes"]["exact"])
+
+    # New labels from a shifted population: refresh on them plus a replay sample, or retrain on all
+    new_rows = max(rows // 10, 1000)
+    X_new, y_new, _ = synthetic_patients(new_rows, args.seed + 2, shift=args.shift, cuts=cuts)
+    X_shifted, y_shifted, _ = synthetic_patients(args.test_rows, args.seed + 3, shift=args.shift, cuts=cuts)
+    report["modes"]["hist_shifted"] = {"fit_seconds": 0.0, "iterations": hist.n_iter_,
+                                       **evaluate(hist, X_shifted, y_shifted)}
+    print_mode(rows, "hist_shifted", report["modes"]["hist_shifted"])
+    replay = np.random.default_rng(args.seed).choice(rows, size=min(new_rows, rows), replace=False)
+    X_refresh = pd.concat([X_new, X.iloc[replay]], ignore_index=True)
+    y_refresh = np.concatenate([y_new, y[replay]])
+    _, seconds = timed(refresh_estimator, hist, X_refresh, y_refresh, args.refresh_iter)
+    report["modes"]["hist_refresh"] = {"fit_seconds": seconds, "iterations": hist.n_iter_,
+                                       **evaluate(hist, X_shifted, y_shifted)}
+    print_mode(rows, "hist_refresh", report["modes"]["hist_refresh"])
+
+    X_all = pd.concat([X, X_new], ignore_index=True)
+    retrained, seconds = timed(fit_estimator, X_all, np.concatenate([y, y_new]), "hist", max_iter=args.max_iter)
+    report["modes"]["hist_retrain"] = {"fit_seconds": seconds, "iterations": retrained.n_iter_,
+                                       **evaluate(retrained, X_shifted, y_shifted)}
+    print_mode(rows, "hist_retrain", report["modes"]["hist_retrain"])
+    return report
+
+
+def print_mode(rows, mode, result):
+    print(f"   {rows:>9} {mode:<13}{result['fit_seconds']:>9.2f}s {result['iterations']:>6} "
+          f"{result['accuracy']:>9.4f} {result['balanced_accuracy']:>9.4f} {result['macro_f1']:>9.4f} "
+          f"{result['log_loss']:>9.4f}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MentalHealthRiskModel training modes")
+    parser.add_argument("--rows", type=lambda value: [int(rows) for rows in value.split(",")],
+                        default=[100_000, 1_000_000, 5_000_000], help="comma-separated training set sizes")
+    parser.add_argument("--test-rows", type=int, default=100_000)
+    parser.add_argument("--exact-max-rows", type=int, default=1_000_000,
+                        help="largest size the exact-split model is trained at; it grows linearly and single-core")
+    parser.add_argument("--exact-estimators", type=int, default=100)
+    parser.add_argument("--exact-max-depth", type=int, default=3)
+    parser.add_argument("--max-iter", type=int, default=500, help="histogram model iteration cap")
+    parser.add_argument("--refresh-iter", type=int, default=50, help="trees a refresh may add")
+    parser.add_argument("--shift", type=float, default=0.5, help="population shift of the newly labelled rows")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    print("📊 Mental Health Risk Model Training Benchmark")
+    print("=" * 40)
+    print(f"   CPUs: {os.cpu_count()}  test rows: {args.test_rows}  (refresh rows are scored on the shifted holdout)")
+    print(f"   {'rows':>9} {'mode':<13}{'fit':>10} {'iters':>6} {'accuracy':>9} {'bal acc':>9} {'macro f1':>9} {'log loss':>9}")
+    reports = [run_size(args, rows) for rows in args.rows]
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"cpus": os.cpu_count(), "sizes": reports}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,69 @@
 #!/usr/bin/env python3
 """
-Simple Redis Event Bus Test
-Tests the Redis Pub/Sub functionality for our event-driven architecture
+Redis Event Bus Test and Benchmark
+Tests the Redis Pub/Sub functionality for our event-driven architecture, and
+measures how much traffic it sustains.
+
+    # Pass/fail check against a local Redis
+    python scripts/test-redis-event-bus.py
+
+    # Benchmark: 4 publishers, 2 subscribers, 1 KiB events at 20k msgs/s, pipelined by 50
+    python scripts/test-redis-event-bus.py bench --publishers 4 --subscribers 2 \\
+        --size 1024 --rate 20000 --pipeline 50 --duration 10
+
+    # Same, without a redis-server: an in-process stand-in speaking the Redis protocol
+    python scripts/test-redis-event-bus.py bench --stand-in
+
+    # Streams consumer groups (ai-engine event_bus) vs Pub/Sub when subscribers restart
+    python scripts/test-redis-event-bus.py bench --transport streams --restart-after 2
+    python scripts/test-redis-event-bus.py bench --transport pubsub --restart-after 2
+
+    # Event encoding: ops/s and bytes per event, JSON vs the binary event_codec
+    python scripts/test-redis-event-bus.py codec --sizes 128,512,4096
+    python scripts/test-redis-event-bus.py bench --transport streams --codec json
+
+Each benchmark event is a UserRegisteredEvent carrying the publisher id, a
+sequence number and its send timestamp in metadata, padded to --size bytes.
+Subscribers report end-to-end latency (p50/p95/p99 and a histogram), the
+sustained delivery rate, drops (events a subscriber never received) and
+duplicates.
+With --rate the timestamp is the scheduled send time, so a publisher that
+falls behind shows up as latency rather than being hidden.
 """
 
-import redis
+import argparse
+import asyncio
 import json
+import math
+import multiprocessing
+import os
+import sys
+import threading
 import time
 import uuid
+from collections import Counter, OrderedDict
 from datetime import datetime
 
-def test_redis_event_bus():
+import redis
+
+CHANNEL = "events:userregisteredevent"
+
+# Benchmarks publish UserRegisteredEvent payloads on their own channel
+BENCH_CHANNEL = "events:benchmarkevent"
+
+# The Streams transport is measured through the ai-engine event bus library
+AI_ENGINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "archive", "backend", "ai-engine")
+
+# Histogram buckets grow by 2% per step, which bounds the percentile error
+BUCKET_GROWTH = 1.02
+
+
+def test_redis_event_bus(host='localhost', port=6379):
     print("🧪 Testing Redis Event Bus")
     print("=" * 40)
 
     # Connect to Redis
-    r = redis.Redis(host='localhost', port=6379, decode_responses=True)
+    r = redis.Redis(host=host, port=port, decode_responses=True)
 
     # Test basic connection
     try:
@@ -23,7 +71,7 @@ def test_redis_event_bus():
         print("✅ Redis connection successful")
     except Exception as e:
         print(f"❌ Redis connection failed: {e}")
-        return
+        return False
 
     # Create a test event
     test_event = {
@@ -42,7 +90,7 @@ def test_redis_event_bus():
     print(f"📤 Publishing test event: {test_event['userId']}")
 
     # Publish event to Redis
-    channel = "events:userregisteredevent"
+    channel = CHANNEL
     message = json.dumps(test_event)
 
     try:
@@ -50,7 +98,7 @@ def test_redis_event_bus():
         print(f"✅ Event published successfully (subscribers: {result})")
     except Exception as e:
         print(f"❌ Failed to publish event: {e}")
-        return
+        return False
 
     # Test subscription
     print("\n📡 Testing event subscription...")
@@ -93,16 +141,835 @@ def test_redis_event_bus():
     pubsub.unsubscribe(channel)
     pubsub.close()
 
-    print(f"\n📊 Test Results:")
-    print(f"   Events published: 2")
+    print("\n📊 Test Results:")
+    print("   Events published: 2")
     print(f"   Events received: {event_count}")
 
-    if event_count == 2:
+    # Only the second event can arrive: the first was published before subscribing
+    passed = event_count >= 1
+    if passed:
         print("✅ Redis Event Bus test PASSED")
     else:
         print("❌ Redis Event Bus test FAILED")
 
     r.close()
+    return passed
+
+
+# --- In-process stand-in -----------------------------------------------------
+
+class StandInStream:
+    """A stream with its consumer groups. Entry ids are (milliseconds, sequence)."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.last_id = (0, 0)
+        self.groups = {}  # name -> {"last": id, "pending": {id: [consumer, delivered_at_ms, deliveries]}}
+
+    def next_id(self):
+        now = int(time.time() * 1000)
+        self.last_id = (now, 0) if now > self.last_id[0] else (self.last_id[0], self.last_id[1] + 1)
+        return self.last_id
+
+
+def _format_id(entry_id):
+    return b"%d-%d" % entry_id
+
+
+def _parse_id(value):
+    if value in (b"$", b">"):
+        return value
+    ms, _, seq = value.partition(b"-")
+    return int(ms), int(seq or 0)
+
+
+class StandInRedis:
+    """
+    Just enough of a Redis server for event bus benchmarks, served by asyncio
+    on a background thread over RESP2 or RESP3: PING, PUBLISH, SUBSCRIBE and
+    UNSUBSCRIBE, plus the stream commands the Streams transport uses (XADD
+    with MAXLEN, XGROUP, XREADGROUP with COUNT and BLOCK, XACK, XAUTOCLAIM,
+    XPENDING, XLEN). Like Redis, it disconnects a Pub/Sub subscriber whose
+    pending output exceeds buffer_limit, which is what turns a slow consumer
+    into drops.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, buffer_limit=32 * 1024 * 1024):
+        self.host = host
+        self.port = port
+        self.buffer_limit = buffer_limit
+        self.channels = {}
+        self.streams = {}
+        self.disconnected_subscribers = 0
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="redis-stand-in", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        async def shutdown():
+            self._server.close()
+            for task in asyncio.all_tasks():
+                if task is not asyncio.current_task():
+                    task.cancel()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._stream_added = asyncio.Condition()
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._serve, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    @staticmethod
+    def _bulk(value):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    @classmethod
+    def _encode(cls, value, resp3):
+        if value is None:
+            return b"_\r\n" if resp3 else b"*-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, bytes):
+            return cls._bulk(value)
+        if isinstance(value, dict):
+            if resp3:
+                return b"%%%d\r\n" % len(value) + b"".join(
+                    cls._encode(k, resp3) + cls._encode(v, resp3) for k, v in value.items()
+                )
+            value = [item for pair in value.items() for item in pair]
+        return b"*%d\r\n" % len(value) + b"".join(cls._encode(item, resp3) for item in value)
+
+    async def _read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()  # inline command, as redis-cli sends
+        args = []
+        for _ in range(int(line[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def _deliver(self, channel, payload):
+        subscribers = self.channels.get(channel, {})
+        body = b"3\r\n$7\r\nmessage\r\n" + self._bulk(channel) + self._bulk(payload)
+        for writer, push in list(subscribers.items()):
+            if writer.transport.is_closing():
+                subscribers.pop(writer, None)
+                continue
+            if writer.transport.get_write_buffer_size() > self.buffer_limit:
+                self._drop_subscriber(writer)
+                continue
+            writer.write(push + body)
+        return len(subscribers)
+
+    def _drop_subscriber(self, writer):
+        for subscribers in self.channels.values():
+            subscribers.pop(writer, None)
+        self.disconnected_subscribers += 1
+        writer.transport.abort()
+
+    # Streams
+
+    @staticmethod
+    def _options(args, start, names):
+        """Split trailing [NAME value] options (upper-cased names) from args[start:]."""
+        options, i = {}, start
+        while i < len(args) and args[i].upper() in names:
+            options[args[i].upper()] = args[i + 1]
+            i += 2
+        return options, i
+
+    def _entry(self, stream, entry_id):
+        return [_format_id(entry_id), stream.entries[entry_id]]
+
+    async def _xadd(self, args):
+        key, i = args[1], 2
+        maxlen = None
+        if args[i].upper() == b"MAXLEN":
+            i += 1
+            if args[i] in (b"~", b"="):
+                i += 1
+            maxlen, i = int(args[i]), i + 1
+        stream = self.streams.setdefault(key, StandInStream())
+        entry_id = stream.next_id() if args[i] == b"*" else _parse_id(args[i])
+        stream.last_id = max(stream.last_id, entry_id)
+        stream.entries[entry_id] = list(args[i + 1:])
+        if maxlen is not None:
+            while len(stream.entries) > maxlen:
+                stream.entries.popitem(last=False)
+        async with self._stream_added:
+            self._stream_added.notify_all()
+        return _format_id(entry_id)
+
+    def _xgroup(self, args):
+        sub, key, group = args[1].upper(), args[2], args[3]
+        if sub == b"CREATE":
+            if key not in self.streams:
+                if b"MKSTREAM" not in (arg.upper() for arg in args[5:]):
+                    return ValueError(b"ERR The XGROUP subcommand requires the key to exist")
+                self.streams[key] = StandInStream()
+            stream = self.streams[key]
+            if group in stream.groups:
+                return ValueError(b"BUSYGROUP Consumer Group name already exists")
+            start = _parse_id(args[4])
+            stream.groups[group] = {"last": stream.last_id if start == b"$" else start, "pending": {}}
+            return b"OK"
+        if sub == b"DESTROY":
+            return 1 if self.streams.get(key) and self.streams[key].groups.pop(group, None) else 0
+        return ValueError(b"ERR unsupported XGROUP subcommand")
+
+    def _read_group(self, key, group, consumer, count):
+        stream = self.streams.get(key)
+        if stream is None or group not in stream.groups:
+            raise KeyError(key)
+        state = stream.groups[group]
+        entries = []
+        now = int(time.time() * 1000)
+        for entry_id in stream.entries:
+            if entry_id <= state["last"]:
+                continue
+            state["pending"][entry_id] = [consumer, now, 1]
+            state["last"] = entry_id
+            entries.append(self._entry(stream, entry_id))
+            if count and len(entries) >= count:
+                break
+        return entries
+
+    async def _xreadgroup(self, args, resp3):
+        group, consumer = args[2], args[3]
+        options, i = self._options(args, 4, (b"COUNT", b"BLOCK"))
+        if i < len(args) and args[i].upper() == b"NOACK":
+            i += 1
+        streams = args[i + 1:]
+        keys = streams[:len(streams) // 2]
+        count = int(options.get(b"COUNT", 0))
+        deadline = time.monotonic() + int(options[b"BLOCK"]) / 1000 if b"BLOCK" in options else None
+        while True:
+            try:
+                reply = {key: entries for key in keys for entries in [self._read_group(key, group, consumer, count)] if entries}
+            except KeyError as e:
+                return ValueError(b"NOGROUP No such key '%s' or consumer group '%s'" % (e.args[0], group))
+            if reply or deadline is None:
+                break
+            timeout = deadline - time.monotonic() if options[b"BLOCK"] != b"0" else None
+            if timeout is not None and timeout <= 0:
+                break
+            async with self._stream_added:
+                try:
+                    await asyncio.wait_for(self._stream_added.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        if not reply:
+            return None
+        return reply if resp3 else [[key, entries] for key, entries in reply.items()]
+
+    def _xack(self, args):
+        stream = self.streams.get(args[1])
+        state = stream.groups.get(args[2]) if stream else None
+        if state is None:
+            return 0
+        return sum(1 for entry_id in args[3:] if state["pending"].pop(_parse_id(entry_id), None))
+
+    def _xautoclaim(self, args):
+        key, group, consumer, min_idle, start = args[1], args[2], args[3], int(args[4]), _parse_id(args[5])
+        options, _ = self._options(args, 6, (b"COUNT",))
+        count = int(options.get(b"COUNT", 100))
+        stream = self.streams.get(key)
+        if stream is None or group not in stream.groups:
+            return ValueError(b"NOGROUP No such key or consumer group")
+        pending = stream.groups[group]["pending"]
+        now = int(time.time() * 1000)
+        claimed, deleted, cursor = [], [], (0, 0)
+        for entry_id in sorted(pending):
+            if entry_id < start:
+                continue
+            if len(claimed) + len(deleted) >= count:
+                cursor = entry_id
+                break
+            owner = pending[entry_id]
+            if now - owner[1] < min_idle:
+                continue
+            if entry_id not in stream.entries:
+                del pending[entry_id]
+                deleted.append(_format_id(entry_id))
+                continue
+            pending[entry_id] = [consumer, now, owner[2] + 1]
+            claimed.append(self._entry(stream, entry_id))
+        return [_format_id(cursor), claimed, deleted]
+
+    def _xpending(self, args):
+        stream = self.streams.get(args[1])
+        if stream is None or args[2] not in stream.groups:
+            return ValueError(b"NOGROUP No such key or consumer group")
+        pending = stream.groups[args[2]]["pending"]
+        if len(args) > 3:
+            # Extended form: XPENDING key group [IDLE min-idle] start end count [consumer]
+            options, i = self._options(args, 3, (b"IDLE",))
+            start, end, count = args[i], args[i + 1], int(args[i + 2])
+            consumer = args[i + 3] if len(args) > i + 3 else None
+            low = (0, 0) if start == b"-" else _parse_id(start)
+            high = (float("inf"), 0) if end == b"+" else _parse_id(end)
+            now = int(time.time() * 1000)
+            reply = []
+            for entry_id in sorted(pending):
+                owner = pending[entry_id]
+                if len(reply) >= count:
+                    break
+                if not low <= entry_id <= high or (consumer is not None and owner[0] != consumer):
+                    continue
+                if now - owner[1] < int(options.get(b"IDLE", 0)):
+                    continue
+                reply.append([_format_id(entry_id), owner[0], now - owner[1], owner[2]])
+            return reply
+        if not pending:
+            return [0, None, None, None]
+        consumers = Counter(owner[0] for owner in pending.values())
+        ids = sorted(pending)
+        return [len(pending), _format_id(ids[0]), _format_id(ids[-1]),
+                [[name, str(count).encode()] for name, count in consumers.items()]]
+
+    async def _serve(self, reader, writer):
+        subscribed = set()
+        resp3 = False
+        push = b"*"  # RESP2 arrays; RESP3 clients get push frames instead
+        try:
+            while True:
+                try:
+                    args = await self._read_command(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if not args:
+                    break
+                command = args[0].upper()
+                reply = None
+                if command == b"PUBLISH":
+                    writer.write(b":%d\r\n" % self._deliver(args[1], args[2]))
+                elif command == b"SUBSCRIBE":
+                    for channel in args[1:]:
+                        self.channels.setdefault(channel, {})[writer] = push
+                        subscribed.add(channel)
+                        writer.write(push + b"3\r\n$9\r\nsubscribe\r\n" + self._bulk(channel) + b":%d\r\n" % len(subscribed))
+                elif command == b"UNSUBSCRIBE":
+                    for channel in args[1:] or list(subscribed):
+                        self.channels.get(channel, {}).pop(writer, None)
+                        subscribed.discard(channel)
+                        writer.write(push + b"3\r\n$11\r\nunsubscribe\r\n" + self._bulk(channel) + b":%d\r\n" % len(subscribed))
+                elif command == b"XADD":
+                    reply = await self._xadd(args)
+                elif command == b"XGROUP":
+                    reply = self._xgroup(args)
+                elif command == b"XREADGROUP":
+                    reply = await self._xreadgroup(args, resp3)
+                elif command == b"XACK":
+                    reply = self._xack(args)
+                elif command == b"XAUTOCLAIM":
+                    reply = self._xautoclaim(args)
+                elif command == b"XPENDING":
+                    reply = self._xpending(args)
+                elif command == b"XLEN":
+                    reply = len(self.streams[args[1]].entries) if args[1] in self.streams else 0
+                elif command == b"HELLO":
+                    resp3 = len(args) > 1 and args[1] == b"3"
+                    push = b">" if resp3 else b"*"
+                    reply = {b"server": b"redis", b"proto": 3 if resp3 else 2}
+                elif command == b"PING":
+                    writer.write(b"+PONG\r\n")
+                elif command in (b"CLIENT", b"SELECT"):
+                    writer.write(b"+OK\r\n")
+                elif command == b"QUIT":
+                    writer.write(b"+OK\r\n")
+                    break
+                else:
+                    reply = ValueError(b"ERR unknown command '%s'" % args[0])
+
+                if isinstance(reply, ValueError):
+                    writer.write(b"-" + reply.args[0] + b"\r\n")
+                elif reply == b"OK":
+                    writer.write(b"+OK\r\n")
+                elif reply is not None or command == b"XREADGROUP":
+                    writer.write(self._encode(reply, resp3))
+                if not subscribed:
+                    await writer.drain()  # backpressure for publishers; subscribers are never paused
+        except asyncio.CancelledError:
+            pass  # stand-in shutting down
+        finally:
+            for channel in subscribed:
+                self.channels.get(channel, {}).pop(writer, None)
+            writer.close()
+
+
+# --- Benchmark -----------------------------------------------------------------
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram in microseconds; cheap to record and to merge."""
+
+    def __init__(self, buckets=None):
+        self.buckets = Counter(buckets or {})
+
+    def record(self, seconds):
+        micros = max(seconds * 1e6, 1.0)
+        self.buckets[int(math.log(micros, BUCKET_GROWTH))] += 1
+
+    def merge(self, other):
+        self.buckets.update(other.buckets)
+
+    @property
+    def count(self):
+        return sum(self.buckets.values())
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile, in milliseconds."""
+        target = math.ceil(self.count * p / 100)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return BUCKET_GROWTH ** (bucket + 1) / 1000
+        return 0.0
+
+    def rows(self):
+        """(upper bound in ms, count) per power-of-two millisecond range."""
+        ranges = Counter()
+        for bucket, count in self.buckets.items():
+            ms = BUCKET_GROWTH ** bucket / 1000
+            ranges[2 ** max(math.ceil(math.log2(ms)), -4)] += count
+        return sorted(ranges.items())
+
+
+def make_event(publisher, seq, size, sent_at):
+    event = {
+        "userId": str(uuid.UUID(int=(publisher << 64) | seq)),
+        "email": f"bench-{publisher}-{seq}@example.com",
+        "role": "Patient",
+        "firstName": "Bench",
+        "lastName": "User",
+        "registeredAt": datetime.utcfromtimestamp(sent_at).isoformat(),
+        "metadata": {"source": "event-bus-bench", "publisher": publisher, "seq": seq, "sentAt": sent_at},
+    }
+    length = len(json.dumps(event))
+    if length < size:
+        event["metadata"]["padding"] = "x" * (size - length - len(', "padding": ""'))
+    return event
+
+
+def event_bus_module():
+    """The ai-engine event bus library, which the streams transport is measured through."""
+    codec_module()
+    import event_bus
+    return event_bus
+
+
+def codec_module():
+    """
+    The ai-engine event codec, with a schema for benchmark events: the
+    UserRegisteredEvent fields, under the benchmark channel's event type.
+    """
+    if AI_ENGINE_DIR not in sys.path:
+        sys.path.append(AI_ENGINE_DIR)
+    import event_codec
+    registered = event_codec.schema_for("UserRegisteredEvent")
+    event_codec.register_schema(BENCH_CHANNEL.split(":", 1)[1], 1000, 1, registered.fields)
+    return event_codec
+
+
+def encoder(codec):
+    if codec == "json":
+        return lambda channel, event: json.dumps(event).encode()
+    return codec_module().encode
+
+
+def decoder(codec):
+    return json.loads if codec == "json" else codec_module().decode
+
+
+def run_publisher(options, publisher, start_at, results):
+    r = redis.Redis(host=options["host"], port=options["port"])
+    bus = None
+    if options["transport"] == "streams":
+        bus = event_bus_module().StreamEventBus(r, maxlen=options["maxlen"], codec=options["codec"])
+    encode = encoder(options["codec"])
+    interval = options["pipeline"] / options["rate_per_publisher"] if options["rate_per_publisher"] else 0.0
+    sent = unheard = 0
+    while time.time() < start_at:
+        time.sleep(0.001)
+    deadline = start_at + options["duration"]
+    batch = 0
+    while True:
+        scheduled = start_at + batch * interval
+        now = time.time()
+        if now >= deadline:
+            break
+        if scheduled > now:
+            time.sleep(scheduled - now)
+        # Scheduled time when rate limited, so falling behind counts as latency
+        sent_at = scheduled if interval else time.time()
+        events = [make_event(publisher, sent + i, options["size"], sent_at) for i in range(options["pipeline"])]
+        sent += len(events)
+        if bus:
+            bus.publish_many(options["channel"], events)
+        else:
+            pipe = r.pipeline(transaction=False)
+            for event in events:
+                pipe.publish(options["channel"], encode(options["channel"], event))
+            unheard += sum(1 for count in pipe.execute() if count < options["subscribers"])
+        batch += 1
+    results.put(("publisher", publisher, {"sent": sent, "unheard": unheard, "seconds": time.time() - start_at}))
+    r.close()
+
+
+class PubSubReader:
+    """Reads benchmark events over plain Pub/Sub."""
+
+    def __init__(self, options, subscriber):
+        self.client = redis.Redis(host=options["host"], port=options["port"])
+        self.channel = options["channel"]
+        self.decode = decoder(options["codec"])
+        self.connect()
+
+    def connect(self):
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(self.channel)
+        self.pubsub.get_message(timeout=1)  # wait for the subscribe confirmation
+
+    def read(self):
+        message = self.pubsub.get_message(timeout=0.1)
+        return [self.decode(message["data"])] if message else []
+
+    def ack(self):
+        pass
+
+    def crash(self):
+        """Drop the subscription; whatever is published until reconnecting is gone."""
+        self.pubsub.close()
+
+    def close(self):
+        self.pubsub.close()
+        self.client.close()
+
+
+class StreamReader:
+    """
+    Reads benchmark events through an event_bus consumer group. Every
+    subscriber has its own group, so each one gets every event, as with
+    Pub/Sub.
+    """
+
+    def __init__(self, options, subscriber):
+        self.client = redis.Redis(host=options["host"], port=options["port"])
+        self.options = options
+        self.group = f"bench-{options['run_id']}-{subscriber}"
+        self.restarts = 0
+        self.last_reclaim = 0.0
+        self.connect()
+
+    def connect(self):
+        bus = event_bus_module().StreamEventBus(self.client)
+        self.consumer = bus.consumer(
+            [self.options["channel"]], self.group, f"consumer-{self.restarts}",
+            batch_size=self.options["batch_size"], block_ms=100, claim_idle_ms=self.options["claim_idle_ms"]
+        )
+        self.batch = []
+
+    def read(self):
+        if time.monotonic() - self.last_reclaim >= self.options["claim_idle_ms"] / 1000:
+            self.batch = self.consumer.reclaim()
+            self.last_reclaim = time.monotonic()
+        if not self.batch:
+            self.batch = self.consumer.read()
+        return [event.data for event in self.batch]
+
+    def ack(self):
+        self.consumer.ack(self.batch)
+        self.batch = []
+
+    def crash(self):
+        """Take a batch and die without acknowledging it; the next consumer reclaims it."""
+        self.consumer.read()
+        self.restarts += 1
+
+    def close(self):
+        self.client.xgroup_destroy(self.options["channel"], self.group)
+        self.client.close()
+
+
+class Deliveries:
+    """Tracks which (publisher, seq) events arrived, to count drops, duplicates and reordering."""
+
+    def __init__(self):
+        self.seen = {}
+        self.next_seq = Counter()
+        self.received = self.duplicates = self.reordered = 0
+
+    def record(self, publisher, seq):
+        seen = self.seen.setdefault(publisher, bytearray())
+        if seq >= len(seen):
+            seen.extend(bytes(max(seq + 1 - len(seen), 4096)))
+        self.received += 1
+        if seen[seq]:
+            self.duplicates += 1
+            return
+        seen[seq] = 1
+        if seq < self.next_seq[publisher]:
+            self.reordered += 1
+        self.next_seq[publisher] = max(self.next_seq[publisher], seq + 1)
+
+
+def run_subscriber(options, subscriber, ready, done, results):
+    reader = (StreamReader if options["transport"] == "streams" else PubSubReader)(options, subscriber)
+    ready.release()
+
+    histogram = LatencyHistogram()
+    deliveries = Deliveries()
+    first = last = None
+    idle_since = None
+    restart_at = options["start_at"] + options["restart_after"] if options["restart_after"] else None
+    try:
+        while True:
+            if restart_at and time.time() >= restart_at:
+                restart_at = None
+                reader.crash()
+                time.sleep(options["restart_gap"])
+                reader.connect()
+            events = reader.read()
+            now = time.time()
+            if not events:
+                if done.is_set():
+                    idle_since = idle_since or now
+                    if now - idle_since >= options["drain"]:
+                        break
+                continue
+            idle_since = None
+            for event in events:
+                meta = event["metadata"]
+                histogram.record(now - meta["sentAt"])
+                deliveries.record(meta["publisher"], meta["seq"])
+            reader.ack()
+            first = first or now
+            last = now
+    except redis.ConnectionError:
+        pass  # disconnected by the server for falling behind; what is missing counts as dropped
+    results.put(("subscriber", subscriber, {
+        "received": deliveries.received, "duplicates": deliveries.duplicates, "reordered": deliveries.reordered,
+        "seconds": (last - first) if first else 0.0, "buckets": dict(histogram.buckets),
+    }))
+    try:
+        reader.close()
+    except redis.ConnectionError:
+        pass
+
+
+def benchmark(args):
+    stand_in = None
+    host, port = args.host, args.port
+    if args.stand_in:
+        stand_in = StandInRedis(buffer_limit=args.stand_in_buffer_limit).start()
+        host, port = stand_in.host, stand_in.port
+    redis.Redis(host=host, port=port).ping()
+
+    # Publishers start together, once every process has been spawned
+    start_at = time.time() + 2.0 + 0.2 * (args.publishers + args.subscribers)
+    options = {
+        "host": host, "port": port, "transport": args.transport, "channel": args.channel, "size": args.size,
+        "pipeline": args.pipeline, "duration": args.duration, "drain": args.drain,
+        "subscribers": args.subscribers, "rate_per_publisher": args.rate / args.publishers if args.rate else 0.0,
+        "maxlen": args.maxlen, "batch_size": args.batch_size, "claim_idle_ms": args.claim_idle_ms,
+        "codec": args.codec,
+        "restart_after": args.restart_after, "restart_gap": args.restart_gap,
+        "run_id": uuid.uuid4().hex[:8], "start_at": start_at,
+    }
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    ready = context.Semaphore(0)
+    done = context.Event()
+
+    subscribers = [
+        context.Process(target=run_subscriber, args=(options, i, ready, done, results)) for i in range(args.subscribers)
+    ]
+    for process in subscribers:
+        process.start()
+    for _ in subscribers:
+        if not ready.acquire(timeout=30):
+            raise RuntimeError("subscribers did not come up")
+
+    publishers = [
+        context.Process(target=run_publisher, args=(options, i, start_at, results)) for i in range(args.publishers)
+    ]
+    for process in publishers:
+        process.start()
+    for process in publishers:
+        process.join()
+    done.set()
+
+    reports = {"publisher": {}, "subscriber": {}}
+    for _ in range(args.publishers + args.subscribers):
+        kind, index, report = results.get(timeout=args.drain + 60)
+        reports[kind][index] = report
+    for process in subscribers:
+        process.join()
+    if stand_in:
+        stand_in.stop()
+    return summarize(args, reports, stand_in)
+
+
+def summarize(args, reports, stand_in=None):
+    publishers, subscribers = reports["publisher"].values(), reports["subscriber"].values()
+    sent = sum(p["sent"] for p in publishers)
+    publish_seconds = max(p["seconds"] for p in publishers)
+    histogram = LatencyHistogram()
+    for s in subscribers:
+        histogram.merge(LatencyHistogram(s["buckets"]))
+    received = sum(s["received"] for s in subscribers)
+    duplicates = sum(s["duplicates"] for s in subscribers)
+    expected = sent * args.subscribers
+    dropped = expected - (received - duplicates)
+    return {
+        "transport": args.transport,
+        "codec": args.codec,
+        "publishers": args.publishers,
+        "subscribers": args.subscribers,
+        "message_bytes": args.size,
+        "pipeline": args.pipeline,
+        "target_rate": args.rate or None,
+        "restart_after": args.restart_after or None,
+        "sent": sent,
+        "publish_rate": round(sent / publish_seconds, 1) if publish_seconds else None,
+        "delivered": received,
+        "delivery_rate": round(sum(s["received"] / s["seconds"] for s in subscribers if s["seconds"]), 1),
+        "dropped": dropped,
+        "drop_ratio": round(dropped / expected, 6) if expected else 0.0,
+        "duplicates": duplicates,
+        "reordered": sum(s["reordered"] for s in subscribers),
+        "published_to_fewer_subscribers": sum(p["unheard"] for p in publishers) if args.transport == "pubsub" else None,
+        "disconnected_subscribers": stand_in.disconnected_subscribers if stand_in else None,
+        "latency_ms": {f"p{p}": round(histogram.percentile(p), 3) for p in (50, 95, 99, 99.9)},
+        "latency_histogram_ms": histogram.rows(),
+    }
+
+
+def print_report(report):
+    print(f"📊 Event Bus Benchmark ({report['transport']}, {report['codec']})")
+    print("=" * 40)
+    print(f"   Publishers / subscribers: {report['publishers']} / {report['subscribers']}")
+    print(f"   Message size: {report['message_bytes']} bytes, pipeline {report['pipeline']}")
+    print(f"   Target rate: {report['target_rate'] or 'unlimited'} msgs/s")
+    if report["restart_after"]:
+        print(f"   Subscribers restarted after {report['restart_after']}s")
+    print(f"   Sent: {report['sent']} ({report['publish_rate']} msgs/s)")
+    print(f"   Delivered: {report['delivered']} ({report['delivery_rate']} deliveries/s across subscribers)")
+    print(f"   Dropped: {report['dropped']} ({report['drop_ratio']:.4%}), "
+          f"duplicates {report['duplicates']}, reordered {report['reordered']}")
+    latency = report["latency_ms"]
+    print(f"   Latency ms: p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  p99.9 {latency['p99.9']}")
+    rows = report["latency_histogram_ms"]
+    widest = max((count for _, count in rows), default=1)
+    for upper, count in rows:
+        print(f"   <= {upper:>9.3f} ms {count:>10}  {'#' * max(1, round(40 * count / widest))}")
+
+
+def time_ops(fn, items, min_seconds):
+    """Calls per second of fn over items, repeating the pass for at least min_seconds."""
+    calls, started = 0, time.perf_counter()
+    while True:
+        for item in items:
+            fn(item)
+        calls += len(items)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return calls / elapsed
+
+
+def codec_benchmark(args):
+    """Encode/decode throughput and encoded size of benchmark events, per codec and size."""
+    rows = []
+    for size in args.sizes:
+        events = [make_event(i % 4, i, size, time.time()) for i in range(args.events)]
+        for codec in args.codecs:
+            encode, decode = encoder(codec), decoder(codec)
+            encoded = [encode(BENCH_CHANNEL, event) for event in events]
+            assert all(decode(data) == event for data, event in zip(encoded, events)), f"{codec} round trip"
+            rows.append({
+                "codec": codec,
+                "event_bytes": size,
+                "encoded_bytes": round(sum(map(len, encoded)) / len(encoded), 1),
+                "encode_ops": round(time_ops(lambda e: encode(BENCH_CHANNEL, e), events, args.seconds)),
+                "decode_ops": round(time_ops(decode, encoded, args.seconds)),
+            })
+    return rows
+
+
+def print_codec_report(rows):
+    print("📦 Event Codec Benchmark")
+    print("=" * 40)
+    print(f"   {'codec':<8}{'size':>10}{'encoded':>10}{'encode/s':>12}{'decode/s':>12}")
+    for row in rows:
+        print(f"   {row['codec']:<8}{row['event_bytes']:>10}{row['encoded_bytes']:>10}"
+              f"{row['encode_ops']:>12}{row['decode_ops']:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test or benchmark the Redis event bus")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("test", help="publish and receive two events (default)")
+    bench = commands.add_parser("bench", help="measure throughput and end-to-end latency")
+    bench.add_argument("--transport", choices=("pubsub", "streams"), default="pubsub",
+                       help="plain Pub/Sub, or Redis Streams consumer groups through the ai-engine event_bus")
+    bench.add_argument("--publishers", type=int, default=1)
+    bench.add_argument("--subscribers", type=int, default=1)
+    bench.add_argument("--size", type=int, default=512, help="approximate message size in bytes")
+    bench.add_argument("--rate", type=float, default=0, help="total target msgs/s; 0 publishes as fast as possible")
+    bench.add_argument("--pipeline", type=int, default=1, help="messages per pipelined round trip")
+    bench.add_argument("--duration", type=float, default=5.0, help="seconds to publish for")
+    bench.add_argument("--drain", type=float, default=2.0, help="seconds a subscriber waits for stragglers")
+    bench.add_argument("--channel", default=BENCH_CHANNEL,
+                       help="streams keep what is published, so the default stays off real event channels")
+    bench.add_argument("--maxlen", type=int, default=100000, help="streams: approximate MAXLEN trim")
+    bench.add_argument("--batch-size", type=int, default=100, help="streams: XREADGROUP COUNT and XACK batch")
+    bench.add_argument("--claim-idle-ms", type=int, default=500, help="streams: idle time before pending entries are reclaimed")
+    bench.add_argument("--restart-after", type=float, default=0,
+                       help="seconds into the run at which each subscriber crashes and comes back")
+    bench.add_argument("--restart-gap", type=float, default=1.0, help="seconds a restarted subscriber is away")
+    bench.add_argument("--codec", choices=("binary", "json"), default="binary",
+                       help="payload encoding; binary is the ai-engine event_codec")
+    bench.add_argument("--stand-in", action="store_true", help="use an in-process Redis stand-in")
+    bench.add_argument("--stand-in-buffer-limit", type=int, default=32 * 1024 * 1024,
+                       help="pending bytes after which the stand-in disconnects a subscriber")
+    bench.add_argument("--json", help="also write the report to this file")
+    codec = commands.add_parser("codec", help="measure event encode/decode speed and size, JSON vs binary")
+    codec.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")], default=[128, 512, 4096],
+                       help="comma-separated approximate JSON event sizes in bytes")
+    codec.add_argument("--codecs", type=lambda value: value.split(","), default=["json", "binary"])
+    codec.add_argument("--events", type=int, default=1000, help="distinct events per size")
+    codec.add_argument("--seconds", type=float, default=1.0, help="minimum timing per measurement")
+    codec.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    if args.command == "codec":
+        report = codec_benchmark(args)
+        print_codec_report(report)
+    elif args.command == "bench":
+        report = benchmark(args)
+        print_report(report)
+    else:
+        sys.exit(0 if test_redis_event_bus(args.host, args.port) else 1)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
 
 if __name__ == "__main__":
-    test_redis_event_bus()
+    main()